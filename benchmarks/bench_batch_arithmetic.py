@@ -0,0 +1,62 @@
+"""Benchmark for the vectorized batch arithmetic API.
+
+Compares ``calculate_batch('divide', ...)`` against looping over
+``DivideCommand.execute`` for the same inputs, history recording included.
+
+Usage:
+    python benchmarks/bench_batch_arithmetic.py [--size N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import calculate_batch
+from command import DivideCommand
+from factory import DataFacade
+
+
+def bench_loop(num1, num2):
+    """Return seconds taken to divide element by element with DivideCommand."""
+    facade = DataFacade()
+    start = time.perf_counter()
+    for a, b in zip(num1.tolist(), num2.tolist()):
+        DivideCommand(facade, a, b).execute()
+    return time.perf_counter() - start
+
+
+def bench_batch(num1, num2):
+    """Return seconds taken by one calculate_batch call."""
+    facade = DataFacade()
+    start = time.perf_counter()
+    calculate_batch('divide', num1, num2, facade)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run both paths and print timings and the speedup."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = np.random.default_rng(0)
+    num1 = rng.uniform(-1000, 1000, args.size)
+    num2 = rng.integers(-10, 10, args.size).astype(np.float64)
+
+    loop = bench_loop(num1, num2)
+    batch = bench_batch(num1, num2)
+    print(f"elements:        {args.size}")
+    print(f"DivideCommand:   {loop:.3f} s ({args.size / loop:,.0f} ops/s)")
+    print(f"calculate_batch: {batch:.3f} s ({args.size / batch:,.0f} ops/s)")
+    print(f"speedup:         {loop / batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
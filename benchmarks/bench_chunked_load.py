@@ -0,0 +1,80 @@
+"""Benchmark of peak memory when reading a large history CSV.
+
+Writes a CSV of N rows, then compares the peak traced allocation (tracemalloc)
+of ``pd.read_csv`` on the whole file with streaming it through
+``DataFacade.iter_history`` at several chunk sizes.
+
+Usage:
+    python benchmarks/bench_chunked_load.py [--rows N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factory import DataFacade  # pylint: disable=wrong-import-position
+
+
+def write_history(filename, rows):
+    """Write a CSV history of ``rows`` random records."""
+    rng = np.random.default_rng(0)
+    num1 = rng.uniform(-1000, 1000, rows)
+    num2 = rng.uniform(1, 1000, rows)
+    pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-10-23') + pd.to_timedelta(np.arange(rows), unit='ms'),
+        'operation': rng.choice(['add', 'subtract', 'multiply', 'divide'], rows),
+        'num1': num1,
+        'num2': num2,
+        'result': num1 + num2,
+    }).to_csv(filename, index=False)
+
+
+def traced(func):
+    """Return (seconds, peak traced MB) for ``func``.
+
+    Time is measured on a separate untraced run since tracemalloc slows
+    allocation-heavy code down considerably.
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    """Compare whole-file and chunked reads."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'history.csv')
+        write_history(filename, args.rows)
+        print(f"file: {args.rows} rows, {os.path.getsize(filename) / 1e6:.1f} MB")
+        print(f"{'mode':<22} {'seconds':>8} {'peak MB':>9}")
+        elapsed, peak = traced(lambda: pd.read_csv(filename))
+        print(f"{'read_csv (whole)':<22} {elapsed:8.2f} {peak:9.1f}")
+        facade = DataFacade()
+        for chunksize in (10_000, 100_000):
+            def stream(size=chunksize):
+                for chunk in facade.iter_history(filename, size):
+                    chunk['result'].sum()
+            elapsed, peak = traced(stream)
+            print(f"{f'iter_history({chunksize})':<22} {elapsed:8.2f} {peak:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark of arithmetic command objects: allocation size and throughput.
+
+Compares the previous dict-based command class with the ``__slots__`` commands,
+the parametrized ArithmeticCommand and ``execute_binary`` (no command object),
+and the REPL line path through FormattedCommand with the registry handler path.
+History recording goes to a no-op sink so only the command layer is measured.
+
+For each variant tracemalloc reports the bytes one command object occupies
+(N objects kept alive, divided by N) and the traced peak while executing N
+commands; ops/s is measured in a separate untraced run.
+
+Usage:
+    python benchmarks/bench_commands.py [--ops N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import PluginManager, build_registry, process_line
+from command import AddCommand, ArithmeticCommand, FormattedCommand, execute_binary
+
+
+class NullHistory:
+    """History sink that drops records."""
+
+    def add_record(self, operation, num1, num2, result):
+        pass
+
+
+class LegacyAddCommand:
+    """AddCommand as it was before __slots__: one __dict__ per instance."""
+    operation = 'add'
+    cache = None
+
+    def __init__(self, facade, num1, num2, cache=None):
+        self.facade = facade
+        self.num1 = num1
+        self.num2 = num2
+        self.result = None
+        if cache is not None:
+            self.cache = cache
+
+    def compute(self):
+        return self.num1 + self.num2
+
+    def execute(self):
+        result = self.compute()
+        self.result = result
+        self.facade.add_record(self.operation, self.num1, self.num2, self.result)
+        return self.result
+
+
+def object_bytes(create, count):
+    """Return traced bytes per object for ``count`` objects kept alive."""
+    tracemalloc.start()
+    objects = [None] * count
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = create(i)
+    size = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def run(execute, count):
+    """Return (ops/s untraced, traced peak bytes) for ``count`` executions."""
+    start = time.perf_counter()
+    for i in range(count):
+        execute(i)
+    rate = count / (time.perf_counter() - start)
+    tracemalloc.start()
+    for i in range(count):
+        execute(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rate, peak
+
+
+def main():
+    """Print bytes per command object, peak memory and ops/s for each variant."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    history = NullHistory()
+    registry = build_registry(history, PluginManager())
+    lines = [f"add {i % 1000} 1" for i in range(1000)]
+    factory_only = build_registry(history, PluginManager())
+    factory_only.register('add', lambda tokens: FormattedCommand(
+        AddCommand(history, float(tokens[0]), float(tokens[1]))))
+
+    variants = {
+        'legacy AddCommand': (lambda i: LegacyAddCommand(history, i, 1.0),
+                              lambda i: LegacyAddCommand(history, i, 1.0).execute()),
+        'AddCommand (slots)': (lambda i: AddCommand(history, i, 1.0),
+                               lambda i: AddCommand(history, i, 1.0).execute()),
+        'ArithmeticCommand': (lambda i: ArithmeticCommand(history, 'add', i, 1.0),
+                              lambda i: ArithmeticCommand(history, 'add', i, 1.0).execute()),
+        'execute_binary': (None, lambda i: execute_binary(history, 'add', i, 1.0)),
+        'line, command objects': (lambda i: FormattedCommand(AddCommand(history, i, 1.0)),
+                                  lambda i: process_line(lines[i % 1000], factory_only)),
+        'line, handler': (None, lambda i: process_line(lines[i % 1000], registry)),
+    }
+    print(f"{args.ops:,} commands")
+    print(f"{'variant':<24} {'bytes/object':>12} {'peak KiB':>9} {'ops/s':>12}")
+    for name, (create, execute) in variants.items():
+        size = object_bytes(create, args.ops) if create else 0
+        rate, peak = run(execute, args.ops)
+        print(f"{name:<24} {size:12.0f} {peak / 1024:9.1f} {rate:12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark of AddCommand throughput from many threads sharing the HistoryManager.
+
+Runs N calculations split across 1, 2, 4, 8 and 16 threads, checks that every
+record arrived and reports the aggregate operations per second.
+
+Usage:
+    python benchmarks/bench_concurrent_history.py [--ops N]
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from command import AddCommand
+from singleton import HistoryManager
+
+
+def run(manager, threads, ops):
+    """Execute ``ops`` AddCommands over ``threads`` threads; return seconds."""
+    per_thread = ops // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        for i in range(per_thread):
+            AddCommand(manager, index, i).execute()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    expected = per_thread * threads
+    if len(manager.facade.store) != expected:
+        raise AssertionError(f"lost records: {len(manager.facade.store)} != {expected}")
+    return elapsed
+
+
+def main():
+    """Print throughput per thread count."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=320_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    manager = HistoryManager()
+    print(f"{'threads':>7} {'ops/s':>12}")
+    for threads in (1, 2, 4, 8, 16):
+        manager.clear_data()
+        elapsed = run(manager, threads, args.ops)
+        print(f"{threads:7d} {args.ops // threads * threads / elapsed:12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
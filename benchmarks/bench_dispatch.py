@@ -0,0 +1,129 @@
+"""Micro-benchmark of lines/second through the REPL dispatcher.
+
+Compares the previous sequential if/elif/startswith chain of ``calculator.main``
+(reproduced below as ``legacy_dispatch``) with the registry-based
+``calculator.process_line``. History recording is replaced by a no-op facade and
+logging is disabled so that only parsing and dispatch are measured.
+
+Usage:
+    python benchmarks/bench_dispatch.py [--lines N]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import PluginManager, build_registry, process_line
+from command import (
+    AddCommand, SubtractCommand, MultiplyCommand, DivideCommand,
+    SaveHistoryCommand, LoadHistoryCommand, ViewHistoryCommand, ClearHistoryCommand
+)
+
+
+class NullFacade:
+    """Facade that discards records."""
+    def add_record(self, operation, num1, num2, result):
+        """Discard the record."""
+
+
+def legacy_dispatch(user_input, history_manager, plugin_manager):  # pylint: disable=too-many-return-statements,too-many-branches
+    """The pre-registry dispatch chain of calculator.main, returning the output."""
+    if user_input == 'exit':
+        return None
+    if user_input == 'menu':
+        return plugin_manager.list_plugins()
+    if user_input.startswith('use_plugin '):
+        parts = user_input.split()
+        if len(parts) < 3:
+            return "Error: Invalid plugin command format. Use: use_plugin <plugin_name> <command> [args...]"
+        return f"Result: {plugin_manager.execute_command(parts[1], parts[2], *parts[3:])}"
+    if user_input == 'save_history':
+        return SaveHistoryCommand(history_manager, 'history.csv').execute()
+    if user_input == 'load_history':
+        return LoadHistoryCommand(history_manager, 'history.csv').execute()
+    if user_input == 'view_history':
+        return ViewHistoryCommand(history_manager).execute()
+    if user_input == 'clear_history':
+        return ClearHistoryCommand(history_manager).execute()
+    if user_input == 'delete_history':
+        return history_manager.clear_data()
+    if user_input.startswith('save_history_to_csv '):
+        parts = user_input.split()
+        if len(parts) != 2:
+            return "Error: Invalid save_history_to_csv command format. Use: save_history_to_csv <filename>"
+        return SaveHistoryCommand(history_manager, parts[1]).execute()
+    if user_input.startswith('load_history_from_csv '):
+        parts = user_input.split()
+        if len(parts) != 2:
+            return "Error: Invalid load_history_from_csv command format. Use: load_history_from_csv <filename>"
+        return LoadHistoryCommand(history_manager, parts[1]).execute()
+    if user_input.startswith('save_history_to_csv') or user_input.startswith('load_history_from_csv'):
+        parts = user_input.split()
+        if len(parts) != 2:
+            return f"Error: Invalid {parts[0]} command format. Use: {parts[0]} <filename>"
+    parts = user_input.split()
+    if len(parts) != 3:
+        return "Error: Invalid input format. Please use: operation number1 number2"
+    operation, num1, num2 = parts
+    try:
+        num1 = float(num1)
+        num2 = float(num2)
+    except ValueError:
+        return "Error: Please enter valid numbers"
+    if operation == 'add':
+        command = AddCommand(history_manager, num1, num2)
+    elif operation == 'subtract':
+        command = SubtractCommand(history_manager, num1, num2)
+    elif operation == 'multiply':
+        command = MultiplyCommand(history_manager, num1, num2)
+    elif operation == 'divide':
+        command = DivideCommand(history_manager, num1, num2)
+    else:
+        return "Error: Invalid operation. Use add, subtract, multiply, or divide"
+    return f"Result: {command.execute()}"
+
+
+def make_lines(count):
+    """Return a reproducible mix of arithmetic and error lines."""
+    rng = random.Random(0)
+    operations = ['add', 'subtract', 'multiply', 'divide']
+    lines = [f"{rng.choice(operations)} {rng.randint(0, 99)} {rng.randint(0, 99)}" for _ in range(count)]
+    for i in range(0, count, 20):
+        lines[i] = rng.choice(['add 1', 'modulo 1 2', 'add x 1'])
+    return lines
+
+
+def measure(dispatch, lines):
+    """Return lines per second for ``dispatch`` over ``lines``."""
+    start = time.perf_counter()
+    for line in lines:
+        dispatch(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    """Run both dispatchers and print their throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=500_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    facade = NullFacade()
+    plugin_manager = PluginManager()
+    registry = build_registry(facade, plugin_manager)
+    lines = make_lines(args.lines)
+
+    legacy = measure(lambda line: legacy_dispatch(line, facade, plugin_manager), lines)
+    current = measure(lambda line: process_line(line, registry), lines)
+    print(f"legacy if/elif chain: {legacy:12,.0f} lines/s")
+    print(f"registry dispatch:    {current:12,.0f} lines/s")
+    print(f"speedup:              {current / legacy:12.2f}x")
+
+
+if __name__ == '__main__':
+    main()
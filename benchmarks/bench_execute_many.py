@@ -0,0 +1,63 @@
+"""Benchmark of PluginManager.execute_many against per-call plugin invocation.
+
+Computes ``scientific sqrt`` over N arguments by looping the ``use_plugin`` REPL
+command, by looping ``execute_command``, with ``execute_many`` calling the
+command once per argument (native batch disabled) and with ``execute_many``
+using the plugin's native batch implementation. INFO logging is disabled.
+
+Usage:
+    python benchmarks/bench_execute_many.py [--calls N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from types import MappingProxyType
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import PluginManager, build_registry, process_line
+from singleton import HistoryManager
+
+
+def measure(run, calls):
+    """Return calls per second for ``run()``."""
+    start = time.perf_counter()
+    run()
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    """Print the throughput of each invocation path."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    manager = PluginManager()
+    registry = build_registry(HistoryManager(), manager)
+    numbers = [float(n) for n in range(args.calls)]
+    lines = [f"use_plugin scientific sqrt {n}" for n in numbers]
+
+    rates = {
+        'use_plugin lines': measure(lambda: [process_line(line, registry) for line in lines], args.calls),
+        'execute_command': measure(
+            lambda: [manager.execute_command('scientific', 'sqrt', n) for n in numbers], args.calls),
+    }
+    batch_index = manager.batch_index
+    manager._batch_index = MappingProxyType({})  # pylint: disable=protected-access
+    rates['execute_many'] = measure(
+        lambda: list(manager.execute_many('scientific', 'sqrt', numbers)), args.calls)
+    manager._batch_index = batch_index  # pylint: disable=protected-access
+    rates['execute_many (native)'] = measure(
+        lambda: list(manager.execute_many('scientific', 'sqrt', numbers)), args.calls)
+
+    baseline = rates['execute_command']
+    for name, rate in rates.items():
+        print(f"{name:<22} {rate:12,.0f} calls/s {rate / baseline:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark of compiled expression evaluation over many variable bindings.
+
+Evaluates one expression for ``--bindings`` different (x, y) bindings:
+parsing and compiling it for every binding (no cache, measured on a sample),
+through ExpressionEvaluator.evaluate (cache lookup per binding), through the
+compiled expression's evaluate (bindings by name) and through evaluate_many
+(positional values), reporting evaluations per second.
+
+Usage:
+    python benchmarks/bench_expression.py [--bindings N] [--expression TEXT]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from cache import ResultCache
+from calculator import PluginManager
+from expression import ExpressionEvaluator
+
+
+def timed(func):
+    """Return seconds taken by ``func()``."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def uncached(evaluator, text, bindings):
+    """Parse and compile ``text`` again for every binding."""
+    for binding in bindings:
+        evaluator.cache.clear()
+        evaluator.evaluate(text, binding)
+
+
+def main():
+    """Print evaluations per second for each way of evaluating the expression."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bindings', type=int, default=1_000_000)
+    parser.add_argument('--reparse-sample', type=int, default=20_000,
+                        help='bindings evaluated without the cache')
+    parser.add_argument('--expression', default='(x + 3) * y - x / 2 + x ^ 2')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    evaluator = ExpressionEvaluator(PluginManager(), ResultCache(max_size=16))
+    text = args.expression
+    rows = [(float(i), float(i % 7 + 1)) for i in range(args.bindings)]
+    compiled = evaluator.compile(text)
+    bindings = [dict(zip(compiled.variables, row)) for row in rows]
+    sample = bindings[:args.reparse_sample]
+
+    results = {
+        'parse every time': len(sample) / timed(lambda: uncached(evaluator, text, sample)),
+        'evaluator.evaluate': len(bindings) / timed(
+            lambda: [evaluator.evaluate(text, binding) for binding in bindings]),
+        'compiled.evaluate': len(bindings) / timed(
+            lambda: [compiled.evaluate(binding) for binding in bindings]),
+        'evaluate_many': len(rows) / timed(lambda: compiled.evaluate_many(rows)),
+    }
+    print(f"{args.bindings:,} bindings of {text!r}")
+    print(f"{'mode':<20} {'evals/s':>12} {'speedup':>8}")
+    for name, rate in results.items():
+        print(f"{name:<20} {rate:12,.0f} {rate / results['parse every time']:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark for appending records to the calculation history.
+
+Measures the mean cost of ``DataFacade.add_record`` at growing history sizes to
+show that appends stay flat (amortized O(1)) with the columnar HistoryStore,
+compared with the previous per-record ``pd.concat`` approach.
+
+Usage:
+    python benchmarks/bench_history_append.py [--max-records N] [--legacy-max N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factory import DataFacade  # pylint: disable=wrong-import-position
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def legacy_append(data, operation, num1, num2, result):
+    """Append one record the way DataFacade did before the columnar store."""
+    new_record = pd.DataFrame({
+        'timestamp': [str(pd.Timestamp.now())],
+        'operation': [operation],
+        'num1': [num1],
+        'num2': [num2],
+        'result': [result]
+    })
+    return pd.concat([data, new_record], ignore_index=True)
+
+
+def bench_facade(size):
+    """Return mean seconds per add_record for a history of ``size`` records."""
+    facade = DataFacade()
+    start = time.perf_counter()
+    for i in range(size):
+        facade.add_record('add', float(i), 1.0, i + 1.0)
+    elapsed = time.perf_counter() - start
+    materialize_start = time.perf_counter()
+    facade.data  # pylint: disable=pointless-statement
+    materialize = time.perf_counter() - materialize_start
+    return elapsed / size, materialize
+
+
+def bench_legacy(size):
+    """Return mean seconds per append with the legacy pd.concat approach."""
+    data = pd.DataFrame(columns=['timestamp', 'operation', 'num1', 'num2', 'result'])
+    start = time.perf_counter()
+    for i in range(size):
+        data = legacy_append(data, 'add', float(i), 1.0, i + 1.0)
+    return (time.perf_counter() - start) / size
+
+
+def main():
+    """Run the benchmark and print a table of per-append costs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-records', type=int, default=SIZES[-1])
+    parser.add_argument('--legacy-max', type=int, default=10_000,
+                        help='largest size to run the quadratic legacy path at')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'records':>10} {'store us/op':>12} {'materialize ms':>15} {'legacy us/op':>13}")
+    for size in [s for s in SIZES if s <= args.max_records]:
+        per_op, materialize = bench_facade(size)
+        legacy = f"{bench_legacy(size) * 1e6:13.2f}" if size <= args.legacy_max else f"{'-':>13}"
+        print(f"{size:>10} {per_op * 1e6:12.2f} {materialize * 1e3:15.2f} {legacy}")
+
+
+if __name__ == '__main__':
+    main()
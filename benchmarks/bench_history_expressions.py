@@ -0,0 +1,87 @@
+"""Benchmark of vectorized expressions and result verification over a large history.
+
+Fills the history with ``--rows`` records of the four operations, corrupts a
+few stored results, then times evaluating an expression over the num1/num2/
+result columns (vectorized, and row by row on a sample for comparison) and
+verify_results recomputing every result.
+
+Usage:
+    python benchmarks/bench_history_expressions.py [--rows N] [--expression TEXT]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import PluginManager
+from expression import ExpressionEvaluator
+from singleton import HistoryManager
+
+
+def fill(history_manager, rows, corrupt):
+    """Add ``rows`` records split over the four operations and corrupt ``corrupt`` results."""
+    rng = np.random.default_rng(0)
+    operations = {'add': np.add, 'subtract': np.subtract, 'multiply': np.multiply,
+                  'divide': np.divide}
+    for operation, ufunc in operations.items():
+        num1 = rng.uniform(-1000, 1000, rows // len(operations))
+        num2 = rng.uniform(1, 1000, rows // len(operations))
+        history_manager.add_records(operation, num1, num2, ufunc(num1, num2))
+    result = history_manager.facade.store._numbers['result']  # pylint: disable=protected-access
+    corrupted = rng.choice(len(history_manager.facade.store), corrupt, replace=False)
+    result[corrupted] += 1.0
+    return np.sort(corrupted)
+
+
+def main():
+    """Print vectorized vs row-wise expression throughput and verification time."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--sample', type=int, default=200_000, help='rows evaluated row by row')
+    parser.add_argument('--corrupt', type=int, default=5)
+    parser.add_argument('--expression', default='num1 * num2 - result / 2 + sqrt(num2)')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    history_manager = HistoryManager()
+    history_manager.set_undo_depth(0)
+    history_manager.clear_data()
+    start = time.perf_counter()
+    corrupted = fill(history_manager, args.rows, args.corrupt)
+    print(f"{len(history_manager.facade.store):,} records added in {time.perf_counter() - start:.2f}s")
+
+    evaluator = ExpressionEvaluator(PluginManager())
+    start = time.perf_counter()
+    values, errors = history_manager.evaluate_columns(evaluator, args.expression)
+    vectorized = time.perf_counter() - start
+
+    compiled = evaluator.compile(args.expression)
+    snapshot = history_manager.facade.store.checkpoint()
+    sample = list(zip(*(snapshot.column(name)[:args.sample].tolist() for name in compiled.variables)))
+    start = time.perf_counter()
+    compiled.evaluate_many(sample)
+    row_rate = len(sample) / (time.perf_counter() - start)
+
+    print(f"\n{args.expression!r}")
+    print(f"vectorized  {vectorized:8.2f}s  {len(values) / vectorized:14,.0f} rows/s  "
+          f"({int(errors.sum())} errors)")
+    print(f"row by row  {len(values) / row_rate:8.2f}s  {row_rate:14,.0f} rows/s  "
+          f"(estimated from {len(sample):,} rows)")
+
+    start = time.perf_counter()
+    report = history_manager.verify_results()
+    elapsed = time.perf_counter() - start
+    found = np.array_equal(report['mismatched'], corrupted)
+    print(f"\nverify_results  {elapsed:.2f}s  {report['records'] / elapsed:14,.0f} rows/s  "
+          f"{len(report['mismatched'])} mismatched, corrupted rows found: {found}")
+    history_manager.clear_data()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark of history save/load time and file size per storage format.
+
+Builds a history of N rows (default 1M) and saves/loads it through every
+``strategy.HISTORY_STRATEGIES`` format via ``DataFacade.save_to_csv`` and
+``load_from_csv``. Parquet and Feather are skipped when pyarrow is missing.
+
+Usage:
+    python benchmarks/bench_history_formats.py [--rows N]
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from factory import DataFacade
+from strategy import NPZHistoryStrategy
+
+FORMATS = [
+    ('csv', '.csv', None),
+    ('npz', '.npz', None),
+    ('npz (compressed)', '.npz', NPZHistoryStrategy(compression=True)),
+    ('parquet (snappy)', '.parquet', None),
+    ('feather (lz4)', '.feather', None),
+]
+
+
+def build_history(rows):
+    """Return a DataFacade holding ``rows`` random calculation records."""
+    rng = np.random.default_rng(0)
+    facade = DataFacade()
+    operations = ['add', 'subtract', 'multiply', 'divide']
+    chunk = max(1, rows // len(operations))
+    for operation in operations:
+        num1 = rng.uniform(-1000, 1000, chunk)
+        num2 = rng.uniform(1, 1000, chunk)
+        facade.add_records(operation, num1, num2, num1 + num2)
+    return facade
+
+
+def main():
+    """Save and load the history in every format and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    facade = build_history(args.rows)
+    facade.data  # pylint: disable=pointless-statement
+    has_pyarrow = importlib.util.find_spec('pyarrow') is not None
+
+    print(f"{'format':<18} {'save s':>8} {'load s':>8} {'size MB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, extension, strategy in FORMATS:
+            if extension in ('.parquet', '.feather') and not has_pyarrow:
+                print(f"{label:<18} {'skipped (pyarrow not installed)':>27}")
+                continue
+            filename = os.path.join(directory, f"history{len(label)}{extension}")
+            start = time.perf_counter()
+            if strategy is None:
+                facade.save_to_csv(filename)
+            else:
+                strategy.save(facade.data, filename)
+            save = time.perf_counter() - start
+            loaded = DataFacade()
+            start = time.perf_counter()
+            if strategy is None:
+                loaded.load_from_csv(filename)
+            else:
+                loaded.data = strategy.load(filename)
+            load = time.perf_counter() - start
+            size = os.path.getsize(filename) / 1e6
+            print(f"{label:<18} {save:8.2f} {load:8.2f} {size:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
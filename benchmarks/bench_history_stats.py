@@ -0,0 +1,65 @@
+"""Benchmark of reading history statistics: running aggregates vs recomputation.
+
+Fills the HistoryManager with N records, then times ``get_stats`` served from
+the running aggregates against the full vectorized groupby recomputation (as
+after a load), and the per-record cost of maintaining the aggregates.
+
+Usage:
+    python benchmarks/bench_history_stats.py [--rows N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from singleton import HistoryManager
+from stats import HistoryStats
+
+
+def timed(func, repeat=1):
+    """Return the mean duration of ``func`` in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    """Print the cost of incremental and recomputed statistics."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    manager = HistoryManager()
+    manager.clear_data()
+    rng = np.random.default_rng(0)
+    for operation in ('add', 'subtract', 'multiply', 'divide'):
+        values = rng.uniform(-1000, 1000, args.rows // 4)
+        manager.add_records(operation, values, values, values)
+    manager.get_stats()
+
+    singles = 100_000
+    start = time.perf_counter()
+    for i in range(singles):
+        manager.add_record('add', 1.0, 2.0, float(i))
+    with_stats = (time.perf_counter() - start) / singles * 1e6
+    stats = HistoryStats()
+    record_cost = timed(lambda: stats.record('add', 1.0), singles) * 1e3
+
+    frame = manager.facade.data
+    print(f"{len(manager.facade.store)} records")
+    print(f"{'operation':<34} {'ms':>10}")
+    print(f"{'get_stats (running aggregates)':<34} {timed(manager.get_stats, 1000):10.4f}")
+    print(f"{'recompute (groupby)':<34} {timed(lambda: HistoryStats().recompute(frame), 5):10.2f}")
+    print(f"add_record: {with_stats:.2f} us/record, of which {record_cost:.2f} us maintains the aggregates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark of periodic history saves: full rewrite vs incremental append.
+
+Adds records in batches and saves after each batch, reporting the time of the
+last save; with incremental saves it stays proportional to the batch size,
+while a full rewrite grows with the total history.
+
+Usage:
+    python benchmarks/bench_incremental_save.py [--batches N] [--batch-size N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factory import DataFacade  # pylint: disable=wrong-import-position
+
+
+def run(filename, batches, batch_size, incremental):
+    """Return the list of per-save durations."""
+    facade = DataFacade()
+    durations = []
+    values = np.arange(batch_size, dtype=np.float64)
+    for _ in range(batches):
+        facade.add_records('add', values, values, values * 2)
+        start = time.perf_counter()
+        facade.save_to_csv(filename, incremental=incremental)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    """Run both save modes and print the cost of the first and last saves."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    total = args.batches * args.batch_size
+    print(f"{args.batches} saves of {args.batch_size} new records ({total} total)")
+    print(f"{'mode':<12} {'first ms':>9} {'last ms':>9} {'total s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, incremental in (('full', False), ('incremental', True)):
+            durations = run(os.path.join(directory, f'{label}.csv'), args.batches,
+                            args.batch_size, incremental)
+            print(f"{label:<12} {durations[0] * 1e3:9.1f} {durations[-1] * 1e3:9.1f} "
+                  f"{sum(durations):8.2f}")
+
+
+if __name__ == '__main__':
+    main()
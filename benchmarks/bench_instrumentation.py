@@ -0,0 +1,67 @@
+"""Benchmark of the latency instrumentation overhead on the REPL dispatch path.
+
+Runs the same mix of calculation and plugin lines through process_line with
+instrumentation disabled and enabled, reporting lines per second and the
+per-line cost of recording the latencies.
+
+Usage:
+    python benchmarks/bench_instrumentation.py [--lines N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import PluginManager, build_registry, process_line
+from instrumentation import format_metrics, metrics
+from singleton import HistoryManager
+
+LINES = ('add 1 2', 'multiply 3.5 4', 'divide 10 4', 'use_plugin scientific sqrt 16')
+
+
+def run(registry, lines):
+    """Return seconds taken to process ``lines``."""
+    start = time.perf_counter()
+    for line in lines:
+        process_line(line, registry)
+    return time.perf_counter() - start
+
+
+def main():
+    """Print throughput with instrumentation disabled and enabled."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    history_manager = HistoryManager()
+    history_manager.set_undo_depth(0)
+    history_manager.clear_data()
+    registry = build_registry(history_manager, PluginManager())
+    lines = [LINES[i % len(LINES)] for i in range(args.lines)]
+
+    results = {}
+    for mode in ('disabled', 'enabled', 'disabled again'):
+        if mode == 'enabled':
+            metrics.enable()
+        else:
+            metrics.disable()
+        history_manager.clear_data()
+        results[mode] = run(registry, lines)
+
+    print(f"{args.lines:,} lines")
+    print(f"{'instrumentation':<16} {'lines/s':>12} {'us/line':>9}")
+    for mode, elapsed in results.items():
+        print(f"{mode:<16} {args.lines / elapsed:12,.0f} {elapsed / args.lines * 1e6:9.2f}")
+    overhead = (results['enabled'] - results['disabled']) / args.lines * 1e6
+    print(f"\nrecording cost {overhead:.2f} us/line\n")
+    print(format_metrics(metrics.snapshot()))
+    history_manager.clear_data()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark of logging overhead per calculation.
+
+Times ``add`` plus ``scientific sqrt`` (as the REPL runs them) with the root
+logger at WARNING, at INFO writing to a file, and at INFO through the logging
+queue (CALC_LOG_QUEUE), and reports the time per operation. Then compares an
+eager f-string log call with a lazy %-style one below the logging level, and
+the Logger file strategies: reopening the file per message (the previous
+FileLoggerStrategy), one open handle, and the queued background writer.
+
+Usage:
+    python benchmarks/bench_logging.py [--ops N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from calculator import PluginManager, build_registry, process_line
+from singleton import HistoryManager, logger_instance
+from strategy import FileLoggerStrategy, QueuedFileLoggerStrategy
+
+
+def per_op(run, ops):
+    """Return microseconds per operation for ``run(ops)``."""
+    start = time.perf_counter()
+    run(ops)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def reopen_per_message(filename, message, level):
+    """Log a message the way FileLoggerStrategy did before it kept the file open."""
+    with open(filename, 'a', encoding='utf-8') as file:
+        file.write(f"{level}: {message}\n")
+
+
+def main():
+    """Print per-operation timings for each logging configuration."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=50_000)
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    root.handlers = []
+    manager = HistoryManager()
+    registry = build_registry(manager, PluginManager())
+
+    def calculate(ops):
+        for i in range(ops):
+            process_line(f"add {i} 1", registry)
+            process_line(f"use_plugin scientific sqrt {i}", registry)
+
+    with tempfile.TemporaryDirectory() as directory:
+        handler = logging.FileHandler(os.path.join(directory, 'calc.log'))
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        root.addHandler(handler)
+
+        print(f"{'configuration':<28} {'us/op':>8}")
+        for name, level, queued in (('WARNING', logging.WARNING, False),
+                                    ('INFO, file handler', logging.INFO, False),
+                                    ('INFO, queued file handler', logging.INFO, True)):
+            manager.clear_data()
+            root.setLevel(level)
+            if queued:
+                logger_instance.enable_queue()
+            elapsed = per_op(calculate, args.ops)
+            if queued:
+                logger_instance.disable_queue()
+            print(f"{name:<28} {elapsed:8.2f}")
+
+        root.setLevel(logging.WARNING)
+        logger = logging.getLogger('bench')
+        value = 3.0
+        eager = per_op(lambda ops: [logger.info(f"Result: {value} {ops}") for _ in range(ops)], args.ops * 10)
+        lazy = per_op(lambda ops: [logger.info("Result: %s %s", value, ops) for _ in range(ops)], args.ops * 10)
+        print(f"\nDisabled INFO call: f-string {eager * 1e3:.0f} ns, %-style {lazy * 1e3:.0f} ns")
+
+        filename = os.path.join(directory, 'strategy.log')
+        strategies = {
+            'reopen per message': lambda message, level: reopen_per_message(filename, message, level),
+            'FileLoggerStrategy': FileLoggerStrategy(filename).log,
+        }
+        queued = QueuedFileLoggerStrategy(filename)
+        strategies['QueuedFileLoggerStrategy'] = queued.log
+        print(f"\n{'Logger strategy':<28} {'us/message':>10}")
+        for name, log in strategies.items():
+            elapsed = per_op(lambda ops, log=log: [log("Result: 3.0", "INFO") for _ in range(ops)], args.ops)
+            print(f"{name:<28} {elapsed:10.2f}")
+        queued.close()
+        root.removeHandler(handler)
+        handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark of plugin calls per second with and without the command index.
+
+``legacy_execute`` reproduces the previous ``PluginManager.execute_command``,
+which called ``plugin.get_commands()`` on every invocation; it is compared with
+the current index-based lookup. INFO logging is disabled for both.
+
+Usage:
+    python benchmarks/bench_plugin_calls.py [--calls N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculator import PluginManager, logger  # pylint: disable=wrong-import-position
+
+
+def legacy_execute(manager, plugin_name, command, *args):
+    """Execute a plugin command the way PluginManager did before the index."""
+    if plugin_name not in manager.plugins:
+        return f"Plugin '{plugin_name}' not found"
+    commands = manager.plugins[plugin_name].get_commands()
+    if command not in commands:
+        return f"Command '{command}' not found in plugin '{plugin_name}'"
+    try:
+        result = commands[command](*args)
+        logger.info(f"Executed command '{command}' in plugin '{plugin_name}' with result: {result}")
+        return result
+    except Exception as e:  # pylint: disable=broad-except
+        return f"Error executing command: {str(e)}"
+
+
+def measure(execute, calls):
+    """Return calls per second for ``execute``."""
+    start = time.perf_counter()
+    for i in range(calls):
+        execute('scientific', 'power', i, 2)
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    """Run both lookup paths and print their throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    manager = PluginManager()
+    legacy = measure(lambda *a: legacy_execute(manager, *a), args.calls)
+    indexed = measure(manager.execute_command, args.calls)
+    print(f"get_commands() per call: {legacy:12,.0f} calls/s")
+    print(f"command index:           {indexed:12,.0f} calls/s")
+    print(f"speedup:                 {indexed / legacy:12.2f}x")
+    print(f"lookup stats:            {manager.lookup_stats}")
+
+
+if __name__ == '__main__':
+    main()
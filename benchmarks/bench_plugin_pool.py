@@ -0,0 +1,78 @@
+"""Benchmark of CPU-bound plugin commands in the plugin process pool.
+
+Runs ``scientific prime_count`` calls inline, from threads (limited by the GIL)
+and in PluginProcessPools of 1..N worker processes, reporting calls per second
+and the speedup over inline execution. A second table compares submitting cheap
+calls one by one with batched submission (one IPC round trip per chunk).
+
+Usage:
+    python benchmarks/bench_plugin_pool.py [--calls N] [--limit N] [--max-workers N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from plugin_pool import PluginProcessPool
+from plugins.scientific import plugin_instance
+
+
+def timed(func):
+    """Return seconds taken by ``func()``."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_pool(pool, limits):
+    """Submit every call before waiting, so all workers are busy."""
+    futures = [pool.submit('scientific', 'prime_count', (n,)) for n in limits]
+    return [future.result() for future in futures]
+
+
+def main():
+    """Print CPU-bound scaling and batched submission throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=32)
+    parser.add_argument('--limit', type=int, default=2_000_000, help='prime_count argument')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cheap-calls', type=int, default=20_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    limits = [args.limit + i for i in range(args.calls)]
+    inline = timed(lambda: [plugin_instance.prime_count(n) for n in limits])
+    print(f"{args.calls} x prime_count({args.limit:,}), {os.cpu_count()} CPUs")
+    print(f"{'mode':<18} {'calls/s':>10} {'speedup':>8}")
+    print(f"{'inline':<18} {args.calls / inline:10.1f} {1:8.2f}")
+
+    threads = args.max_workers
+    with ThreadPoolExecutor(threads) as executor:
+        elapsed = timed(lambda: list(executor.map(plugin_instance.prime_count, limits)))
+    print(f"{f'{threads} threads':<18} {args.calls / elapsed:10.1f} {inline / elapsed:8.2f}")
+
+    counts = sorted({2 ** k for k in range(args.max_workers.bit_length())} | {args.max_workers})
+    for workers in counts:
+        pool = PluginProcessPool(['scientific'], workers)
+        elapsed = timed(lambda: run_pool(pool, limits))
+        pool.shutdown()
+        print(f"{f'{workers} processes':<18} {args.calls / elapsed:10.1f} {inline / elapsed:8.2f}")
+
+    pool = PluginProcessPool(['scientific'], args.max_workers)
+    cheap = [(n,) for n in range(args.cheap_calls)]
+    single = timed(lambda: [future.result() for future in
+                            [pool.submit('scientific', 'sqrt', call) for call in cheap]])
+    batched = timed(lambda: pool.call_many('scientific', 'sqrt', cheap))
+    pool.shutdown()
+    print(f"\n{args.cheap_calls:,} x sqrt over {args.max_workers} processes")
+    print(f"{'one task per call':<18} {args.cheap_calls / single:10,.0f} calls/s")
+    print(f"{'batched':<18} {args.cheap_calls / batched:10,.0f} calls/s")
+
+
+if __name__ == '__main__':
+    main()
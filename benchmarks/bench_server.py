@@ -0,0 +1,100 @@
+"""Load generator for the asyncio calculator server.
+
+Starts ``server.py`` in a subprocess on a free localhost port, opens
+``--connections`` clients that each keep ``--pipeline`` requests in flight, and
+reports requests per second and p50/p99 latency for arithmetic and for plugin
+calls (which the server runs in its thread pool).
+
+Usage:
+    python benchmarks/bench_server.py [--connections N] [--requests N] [--pipeline N]
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server import CalculatorClient  # pylint: disable=wrong-import-position
+
+
+def start_server():
+    """Start the server subprocess and return (process, port)."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'server.py'), '--port', '0'],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, LOG_LEVEL='WARNING'))
+    line = process.stdout.readline()
+    match = re.search(r':(\d+)$', line.strip())
+    if match is None:
+        process.kill()
+        raise RuntimeError(f"server did not start: {line!r}")
+    return process, int(match.group(1))
+
+
+async def client(port, requests, pipeline, make_request, latencies):
+    """Send ``requests`` requests keeping ``pipeline`` of them in flight."""
+    connection = await CalculatorClient.connect(port=port)
+    in_flight = asyncio.Semaphore(pipeline)
+
+    async def one(i):
+        async with in_flight:
+            start = time.perf_counter()
+            # The semaphore bounds the write buffer, so no drain() per request
+            response = await connection.send(make_request(i))
+            latencies.append(time.perf_counter() - start)
+            if not response['ok']:
+                raise AssertionError(response)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    await connection.close()
+
+
+async def load(port, connections, requests, pipeline, make_request):
+    """Return (requests/s, latencies) for one load run."""
+    latencies = []
+    per_client = requests // connections
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, per_client, pipeline, make_request, latencies)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, sorted(latencies)
+
+
+def percentile(values, fraction):
+    """Return the ``fraction`` percentile of sorted ``values``."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    """Run the load scenarios and print throughput and latency."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--pipeline', type=int, default=16)
+    args = parser.parse_args()
+
+    scenarios = {
+        'add': lambda i: {'line': f"add {i} 1"},
+        'plugin power': lambda i: {'plugin': 'scientific', 'command': 'power', 'args': [i % 100, 2]},
+    }
+    process, port = start_server()
+    try:
+        print(f"{args.connections} connections, {args.pipeline} requests in flight per connection")
+        print(f"{'scenario':<14} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, make_request in scenarios.items():
+            rate, latencies = asyncio.run(load(port, args.connections, args.requests,
+                                               args.pipeline, make_request))
+            print(f"{name:<14} {rate:10,.0f} {percentile(latencies, 0.5) * 1e3:8.2f} "
+                  f"{percentile(latencies, 0.99) * 1e3:8.2f}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark of SQLite history saves and indexed query latency.
+
+Writes a history of N rows (one per 10 ms) to an SQLite database through
+``DataFacade.save_to_csv`` and times ``SQLiteHistoryStrategy.query_rows`` (raw
+indexed lookup) and ``query`` (DataFrame result) for a filtered one-minute
+window, a time-only window and a deep page, compared with filtering the whole
+history loaded in memory.
+
+Usage:
+    python benchmarks/bench_sqlite_history.py [--rows N] [--repeat N]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from factory import DataFacade
+from strategy import SQLiteHistoryStrategy
+
+START = pd.Timestamp('2024-10-23')
+
+
+def build_history(rows):
+    """Return a DataFacade holding ``rows`` records, one every 10 ms."""
+    rng = np.random.default_rng(0)
+    num1 = rng.uniform(-1000, 1000, rows)
+    num2 = rng.uniform(1, 1000, rows)
+    facade = DataFacade()
+    facade.data = pd.DataFrame({
+        'timestamp': START + pd.to_timedelta(np.arange(rows) * 10, unit='ms'),
+        'operation': rng.choice(['add', 'subtract', 'multiply', 'divide'], rows),
+        'num1': num1,
+        'num2': num2,
+        'result': num1 + num2,
+    })
+    return facade
+
+
+def median_ms(func, repeat):
+    """Return the median duration of ``func`` in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1e3
+
+
+def main():
+    """Save the history and time indexed queries against it."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    facade = build_history(args.rows)
+    middle = START + pd.Timedelta(milliseconds=10 * args.rows // 2)
+    window = (middle, middle + pd.Timedelta(minutes=1))
+    strategy = SQLiteHistoryStrategy()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'history.db')
+        start = time.perf_counter()
+        facade.save_to_csv(filename)
+        elapsed = time.perf_counter() - start
+        print(f"save: {args.rows} rows in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s), "
+              f"{os.path.getsize(filename) / 1e6:.1f} MB")
+
+        queries = [
+            ('operation + 1 min window', ('divide', *window), 0),
+            ('1 min window', (None, *window), 0),
+            ('page 1000 (offset 20k)', ('add', None, None), 20_000),
+        ]
+        print(f"{'query (20 rows)':<26} {'rows ms':>8} {'frame ms':>9}")
+        for label, filters, offset in queries:
+            rows = median_ms(lambda: strategy.query_rows(filename, *filters, offset=offset), args.repeat)
+            frame = median_ms(lambda: strategy.query(filename, *filters, offset=offset), args.repeat)
+            print(f"{label:<26} {rows:8.3f} {frame:9.3f}")
+        data = facade.data
+        in_memory = median_ms(lambda: data[(data['operation'] == 'divide')
+                                           & (data['timestamp'] >= window[0])
+                                           & (data['timestamp'] < window[1])].head(20), 5)
+        print(f"{'in-memory pandas filter':<26} {'':8} {in_memory:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
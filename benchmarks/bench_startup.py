@@ -0,0 +1,80 @@
+"""Startup-time benchmark: time to first prompt and an import-time report.
+
+Starts ``calculator.py`` in a subprocess and measures the wall time until the
+first ``> `` prompt is written, for:
+
+* eager:  plugins imported at construction and pandas imported up front
+          (the previous startup behaviour)
+* lazy:   CALC_LAZY_PLUGINS=1, plugins discovered from manifests, pandas deferred
+
+It then prints the slowest imports of ``import calculator`` as reported by
+``python -X importtime``.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--top N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER = "import pandas, runpy; runpy.run_path('calculator.py', run_name='__main__')"
+LAZY = "import runpy; runpy.run_path('calculator.py', run_name='__main__')"
+
+
+def time_to_prompt(code, lazy):
+    """Return seconds from process start until the first prompt appears."""
+    env = dict(os.environ, CALC_LAZY_PLUGINS='1' if lazy else '0', LOG_LEVEL='WARNING')
+    start = time.perf_counter()
+    with subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                          stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL) as process:
+        seen = b''
+        while not seen.endswith(b'> '):
+            byte = process.stdout.read(1)
+            if not byte:
+                break
+            seen += byte
+        elapsed = time.perf_counter() - start
+        process.communicate(b'exit\n')
+    return elapsed
+
+
+def import_report(top):
+    """Return the ``top`` slowest cumulative imports of the calculator module."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import calculator'],
+                            cwd=ROOT, capture_output=True, text=True, check=True,
+                            env=dict(os.environ, CALC_LAZY_PLUGINS='1')).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        rows.append((int(cumulative_us), int(self_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    """Measure both startup modes and print the import report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    for label, code, lazy in (('eager', EAGER, False), ('lazy', LAZY, True)):
+        samples = [time_to_prompt(code, lazy) for _ in range(args.runs)]
+        print(f"{label:>6}: time to first prompt median {statistics.median(samples) * 1e3:8.1f} ms"
+              f" (min {min(samples) * 1e3:.1f} ms)")
+
+    print(f"\nSlowest imports of 'import calculator' (python -X importtime, top {args.top}):")
+    print(f"{'cumulative us':>14} {'self us':>9}  module")
+    for cumulative, self_us, name in import_report(args.top):
+        print(f"{cumulative:>14} {self_us:>9}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark of history views: full DataFrame rendering vs store slices.
+
+Fills a history with N records and times rendering it the old way
+(``str(DataFacade.data)`` on a freshly built frame) against ``view_data``
+slices (tail, a page in the middle), plus the chunked ``export_view`` with its
+peak traced memory (measured on a second, traced run).
+
+Usage:
+    python benchmarks/bench_view_history.py [--rows N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factory import DataFacade  # pylint: disable=wrong-import-position
+
+
+def timed(func):
+    """Return the duration of ``func`` in milliseconds."""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    """Print the cost of each kind of view."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    facade = DataFacade()
+    values = np.arange(args.rows, dtype=np.float64)
+    facade.add_records('add', values, values, values * 2)
+
+    def full_render():
+        facade.store._frame = None  # pylint: disable=protected-access
+        str(facade.data)
+
+    middle = args.rows // 2
+    facade.view_data(-1)  # import pandas outside the timings
+    print(f"{args.rows} records")
+    print(f"{'view':<28} {'ms':>9}")
+    print(f"{'str(data) (full frame)':<28} {timed(full_render):9.2f}")
+    print(f"{'view_history tail 20':<28} {timed(lambda: facade.view_data(-20)):9.2f}")
+    print(f"{'view_history page (middle)':<28} {timed(lambda: facade.view_data(middle, middle + 20)):9.2f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'history.txt')
+        elapsed = timed(lambda: facade.export_view(filename, 10_000))
+        tracemalloc.start()
+        facade.export_view(filename, 10_000)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"export_history: {elapsed / 1e3:.2f}s, peak {peak / 1e6:.1f} MB traced, "
+              f"{os.path.getsize(filename) / 1e6:.1f} MB file")
+
+
+if __name__ == '__main__':
+    main()
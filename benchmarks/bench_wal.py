@@ -0,0 +1,62 @@
+"""Benchmark of history records/s with the write-ahead log at each durability level.
+
+Adds N records through ``HistoryManager.add_record`` without a log and with a
+log at every ``wal.DURABILITY_LEVELS`` level, then reports throughput and the
+final log size.
+
+Usage:
+    python benchmarks/bench_wal.py [--records N] [--fsync-records N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from singleton import HistoryManager
+from wal import DURABILITY_LEVELS
+
+
+def run(manager, records):
+    """Add ``records`` records and return the elapsed seconds."""
+    start = time.perf_counter()
+    for i in range(records):
+        value = float(i)
+        manager.add_record('add', value, 1.0, value + 1.0)
+    if manager.wal is not None:
+        manager.wal.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    """Measure records/s per durability level."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=200_000)
+    parser.add_argument('--fsync-records', type=int, default=2_000,
+                        help="records for the 'fsync' level, which syncs every record")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    manager = HistoryManager()
+    print(f"{'durability':<12} {'records':>8} {'records/s':>12} {'log KB':>9}")
+    manager.clear_data()
+    elapsed = run(manager, args.records)
+    print(f"{'(no log)':<12} {args.records:8d} {args.records / elapsed:12,.0f} {'-':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for durability in DURABILITY_LEVELS:
+            records = args.fsync_records if durability == 'fsync' else args.records
+            path = os.path.join(directory, f'{durability}.wal')
+            manager.enable_wal(path, durability, checkpoint=os.path.join(directory, 'history.csv'))
+            manager.clear_data()
+            elapsed = run(manager, records)
+            manager.disable_wal()
+            size = os.path.getsize(path) / 1e3
+            print(f"{durability:<12} {records:8d} {records / elapsed:12,.0f} {size:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
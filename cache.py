@@ -0,0 +1,174 @@
+"""Cache module providing a bounded memoization cache for calculation results.
+
+Results are keyed on (source, command, normalized arguments) and evicted in
+least-recently-used order once the cache is full. Entries can also expire after
+a time-to-live. Error results are not cached unless explicitly enabled.
+The cache is safe to share between threads.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by ResultCache.get when the key is not cached
+MISSING = object()
+
+
+def _number_key(kind, value):
+    """Key of a number: its type and value, with the sign of zero.
+
+    -0.0 == 0.0, but results can differ (1 / -0.0), so the sign is kept apart.
+    """
+    value = float(value)
+    return (kind, value, value == 0 and math.copysign(1.0, value) < 0)
+
+
+def normalize_args(args):
+    """Normalize arguments so equivalent inputs share a cache key.
+
+    Numbers are keyed on their type and value, since an int and a float
+    argument can give results of different types (2 + 3 is 5, 2.0 + 3.0 is 5.0).
+    Numeric strings are keyed on their value ('2' and '2.0' are the same key);
+    other strings are stripped and lower-cased.
+
+    Args:
+        args: Iterable of command arguments
+
+    Returns:
+        Tuple of normalized arguments, or None if an argument is not hashable
+        (e.g. an array), meaning the call should not be cached
+    """
+    normalized = []
+    for arg in args:
+        if isinstance(arg, (int, float)) and not isinstance(arg, bool):
+            normalized.append(_number_key(type(arg), arg))
+        elif isinstance(arg, str):
+            try:
+                normalized.append(_number_key(str, arg))
+            except ValueError:
+                normalized.append(arg.strip().lower())
+        else:
+            try:
+                hash(arg)
+            except TypeError:
+                return None
+            normalized.append(arg)
+    return tuple(normalized)
+
+
+def is_error(value):
+    """Return True if a result is an error message rather than a value."""
+    return isinstance(value, str) and ('Error' in value or 'not found' in value)
+
+
+class ResultCache:
+    """Bounded LRU cache with optional time-to-live and hit/miss statistics."""
+
+    def __init__(self, max_size=1024, ttl=None, cache_errors=False, clock=time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            max_size (int): Maximum number of entries before LRU eviction
+            ttl (float): Seconds an entry stays valid, or None for no expiry
+            cache_errors (bool): Whether error results may be cached
+            clock (callable): Time source, injectable for testing
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_errors = cache_errors
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for ``key`` or MISSING.
+
+        Args:
+            key: Hashable cache key
+
+        Returns:
+            The cached value, or MISSING if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires = entry
+            if expires is not None and self._clock() >= expires:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting the least recently used entry.
+
+        Args:
+            key: Hashable cache key
+            value: Result to cache; errors are skipped unless cache_errors is set
+
+        Returns:
+            bool: True if the value was cached
+        """
+        if not self.cache_errors and is_error(value):
+            return False
+        expires = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        """Remove every entry; statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return cache statistics.
+
+        Returns:
+            dict: hits, misses, evictions, expirations, size, max_size and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, environ):
+        """Build a cache from CALC_CACHE_SIZE / CALC_CACHE_TTL / CALC_CACHE_ERRORS.
+
+        Args:
+            environ: Mapping of environment variables
+
+        Returns:
+            ResultCache, or None when CALC_CACHE_SIZE is unset or 0 (disabled)
+        """
+        size = int(environ.get('CALC_CACHE_SIZE', '0') or 0)
+        if size <= 0:
+            return None
+        ttl = environ.get('CALC_CACHE_TTL')
+        cache_errors = environ.get('CALC_CACHE_ERRORS', '').lower() in ('1', 'true', 'yes')
+        return cls(size, float(ttl) if ttl else None, cache_errors)
@@ -4,15 +4,33 @@ Provides basic arithmetic operations and plugin support for extended functionali
 """
 import os
 import sys
+import ast
 import json
+import time
 import logging
+import argparse
 import importlib
+import threading
+import itertools
+from collections import deque
 from datetime import datetime
+from types import MappingProxyType
+import numpy as np
 from command import (
-    AddCommand, SubtractCommand, MultiplyCommand, DivideCommand,
-    SaveHistoryCommand, LoadHistoryCommand, ViewHistoryCommand, ClearHistoryCommand
+    AddCommand, SubtractCommand, MultiplyCommand, DivideCommand, BatchCommand, execute_binary,
+    SaveHistoryCommand, LoadHistoryCommand, ViewHistoryCommand, ClearHistoryCommand,
+    CompactHistoryCommand, QueryHistoryCommand, ExportHistoryCommand, HistoryStatsCommand,
+    ExitCommand, ListPluginsCommand, PluginCommand, MapPluginCommand, FormattedCommand, CacheStatsCommand,
+    StatsCommand,
+    UndoCommand, RedoCommand, EvaluateExpressionCommand, EvaluateHistoryCommand, VerifyHistoryCommand,
+    CommandRegistry, InvalidCommandError,
+    EXIT, DEFAULT_UNDO_DEPTH
 )
 from singleton import logger_instance, HistoryManager
+from cache import MISSING, ResultCache, normalize_args
+from plugin_pool import PluginProcessPool
+from expression import ExpressionEvaluator, DEFAULT_EXPRESSION_CACHE_SIZE
+from instrumentation import COMMAND, PLUGIN, STAGE, metrics, profiled
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,9 +39,52 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
 LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 LOG_FILE = os.getenv('LOG_FILE', None)
+# Format and write log records on a background thread instead of the caller's
+LOG_QUEUE = os.getenv('CALC_LOG_QUEUE', '').lower() in ('1', 'true', 'yes')
+
+# Force history files to disk (fsync) after every save
+HISTORY_FSYNC = os.getenv('CALC_HISTORY_FSYNC', '').lower() in ('1', 'true', 'yes')
+
+# Discover plugins from their manifests and import them on first use
+LAZY_PLUGINS = os.getenv('CALC_LAZY_PLUGINS', '').lower() in ('1', 'true', 'yes')
+
+# Write-ahead log for crash recovery of unsaved history (disabled when unset)
+WAL_PATH = os.getenv('CALC_WAL', None)
+WAL_DURABILITY = os.getenv('CALC_WAL_DURABILITY', 'async').lower()
+
+# Worker processes for CPU-bound plugin commands (0 runs them inline) and the
+# seconds such a command may run before it is cancelled (0 for no limit)
+PLUGIN_WORKERS = int(os.getenv('CALC_PLUGIN_WORKERS', '0'))
+PLUGIN_TIMEOUT = float(os.getenv('CALC_PLUGIN_TIMEOUT', '0')) or None
+
+# History changes that can be undone (0 disables undo)
+UNDO_DEPTH = int(os.getenv('CALC_UNDO_DEPTH', str(DEFAULT_UNDO_DEPTH)))
+
+# Compiled expressions kept for the eval command
+EXPRESSION_CACHE_SIZE = int(os.getenv('CALC_EXPRESSION_CACHE_SIZE', str(DEFAULT_EXPRESSION_CACHE_SIZE)))
+
+# Latency histograms per stage, command and plugin command, shown by 'stats'
+METRICS = os.getenv('CALC_METRICS', '').lower() in ('1', 'true', 'yes')
+
+# Run the session under cProfile and write the profile to this file
+PROFILE_PATH = os.getenv('CALC_PROFILE', None)
 
 logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT, filename=LOG_FILE)
+if LOG_QUEUE:
+    logger_instance.enable_queue()
 logger = logger_instance.get_logger()
+if METRICS:
+    metrics.enable()
+
+# SQLite history database read by query_history
+HISTORY_DB = 'history.db'
+
+# Records per page for view_history page K without a size
+VIEW_PAGE_SIZE = 20
+
+# Batch mode buffering
+BATCH_CHUNK_SIZE = 1 << 20
+BATCH_OUTPUT_LINES = 4096
 
 # History storage
 SAVED_HISTORY = """[{"timestamp": "2024-10-23 20:06:49.299196", "operation": "add", "num1": 1.0, "num2": 2.0, "result": 3.0}, {"timestamp": "2024-10-23 20:06:52.850854", "operation": "add", "num1": 2.0, "num2": 3.0, "result": 5.0}, {"timestamp": "2024-10-23 20:06:56.819044", "operation": "subtract", "num1": 2.0, "num2": 3.0, "result": -1.0}, {"timestamp": "2024-10-23 20:07:00.402757", "operation": "multiply", "num1": 2.0, "num2": 3.0, "result": 6.0}]"""
@@ -56,15 +117,115 @@ def divide(a, b):
         return "Error: Division by zero"
     return a / b
 
+def calculate_batch(operation, num1, num2, facade=None):
+    """Apply an operation element-wise over two arrays and record the batch.
+
+    This is the path for non-interactive callers: the operation runs vectorized
+    over NumPy arrays and every successful element is stored in history with a
+    single bulk append.
+
+    Args:
+        operation: One of 'add', 'subtract', 'multiply' or 'divide'
+        num1: Array-like of first operands
+        num2: Array-like of second operands (scalars are broadcast)
+        facade: History to record into, defaults to the HistoryManager singleton
+
+    Returns:
+        Tuple (results, errors): a float array of results and a boolean mask that
+        is True where the element failed (division by zero); failed results are NaN
+    """
+    if facade is None:
+        facade = HistoryManager()
+    return BatchCommand(facade, operation, num1, num2).execute()
+
+# Argument types that route plugin commands to their vectorized variants
+ARRAY_TYPES = (list, tuple, np.ndarray)
+
+# Argument tuples per chunk sent to a worker process by execute_many
+MAP_CHUNK_SIZE = 1024
+
+def _chunked(iterable, size):
+    """Yield lists of up to ``size`` consecutive items of ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _as_arg_tuple(args):
+    """Treat a tuple or list as an argument tuple and anything else as a single argument."""
+    return tuple(args) if isinstance(args, (tuple, list)) else (args,)
+
+def read_plugin_manifest(path):
+    """Read a plugin's PLUGIN_MANIFEST literal without importing the module.
+
+    Args:
+        path: Path to the plugin source file
+
+    Returns:
+        The manifest dictionary (description, commands), or None if the plugin
+        does not declare one
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        tree = ast.parse(file.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == 'PLUGIN_MANIFEST'
+                for target in node.targets):
+            return ast.literal_eval(node.value)
+    return None
+
 class PluginManager:
-    """Manages the loading and execution of calculator plugins."""
-    def __init__(self):
+    """Manages the loading and execution of calculator plugins.
+
+    Plugin commands are resolved through a flattened, read-only
+    ``(plugin, command) -> callable`` index built once after loading, so that
+    executing a command does not call ``get_commands()`` again. The index is
+    rebuilt when plugins are reloaded or registered.
+
+    Plugins may also provide ``get_array_commands()`` with vectorized variants
+    returning ``(values, errors)``; execute_command routes to them when any
+    argument is a list, tuple or NumPy array.
+
+    With a ResultCache, results of commands a plugin declares pure through
+    ``get_pure_commands()`` are memoized on (plugin, command, normalized args).
+
+    In lazy mode, plugins that declare a ``PLUGIN_MANIFEST`` are only discovered
+    at load time; their module is imported on the first command executed.
+
+    execute_many() maps a command over many argument tuples, resolving it once
+    and preferring a native batch implementation from ``get_batch_commands()``.
+
+    Commands a plugin declares CPU-bound through ``get_cpu_bound_commands()``
+    run in a PluginProcessPool once enable_process_pool() was called (or
+    CALC_PLUGIN_WORKERS is set), keeping the caller responsive and using
+    several cores.
+    """
+    def __init__(self, lazy=None, cache=None, workers=None):
         self.plugins = {}
+        self.cache = cache
+        self.manifests = {}
+        self.lazy = LAZY_PLUGINS if lazy is None else lazy
+        self.lookup_stats = {'lookups': 0, 'misses': 0, 'index_builds': 0}
+        self.process_pool = None
+        self._command_index = None
+        self._array_index = None
+        self._pure_commands = None
+        self._cpu_bound_commands = None
+        self._batch_index = None
+        self._plugin_info = None
+        # Guards lazy imports and index rebuilds when commands run on several threads
+        self._lock = threading.RLock()
         self.load_plugins()
+        workers = PLUGIN_WORKERS if workers is None else workers
+        if workers:
+            self.enable_process_pool(workers, PLUGIN_TIMEOUT)
 
     def load_plugins(self):
         """Load all plugins from the plugins directory"""
         logger.info("Loading plugins from the plugins directory")
+        self.invalidate_index()
         # Ensure plugins directory exists
         if not os.path.exists('plugins'):
             os.makedirs('plugins')
@@ -82,49 +243,652 @@ class PluginManager:
         for file in os.listdir('plugins'):
             if file.endswith('.py') and file != '__init__.py':
                 module_name = file[:-3]
+                if self.lazy and self._discover_plugin(module_name, os.path.join('plugins', file)):
+                    continue
+                self._import_plugin(module_name)
+        self._build_index()
+
+    def _discover_plugin(self, module_name, path):
+        """Record a plugin's manifest instead of importing it; False if it has none."""
+        try:
+            manifest = read_plugin_manifest(path)
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.error("Error reading manifest of plugin %s: %s", module_name, str(e))
+            return False
+        if manifest is None:
+            return False
+        self.manifests[module_name] = manifest
+        logger.info("Discovered plugin: %s", module_name)
+        return True
+
+    def _import_plugin(self, module_name):
+        """Import a plugin module and register its plugin_instance."""
+        try:
+            module = importlib.import_module(f'plugins.{module_name}')
+            if hasattr(module, 'plugin_instance'):
+                self.plugins[module_name] = module.plugin_instance
+                logger.info("Loaded plugin: %s", module_name)
+                return True
+        except Exception as e:
+            logger.error("Error loading plugin %s: %s", module_name, str(e))
+        return False
+
+    def _load_deferred(self, plugin_name):
+        """Import a discovered-but-not-imported plugin; True if it became available."""
+        with self._lock:
+            if plugin_name in self.plugins:
+                return True
+            if plugin_name not in self.manifests:
+                return False
+            manifest = self.manifests.pop(plugin_name)
+            if not self._import_plugin(plugin_name):
+                self.manifests[plugin_name] = manifest
+                return False
+            self.invalidate_index()
+            return True
+
+    def reload_plugins(self):
+        """Re-import every plugin module and rebuild the command index."""
+        for module_name in list(self.plugins):
+            module = sys.modules.get(f'plugins.{module_name}')
+            if module is not None:
                 try:
-                    module = importlib.import_module(f'plugins.{module_name}')
-                    if hasattr(module, 'plugin_instance'):
-                        self.plugins[module_name] = module.plugin_instance
-                        logger.info(f"Loaded plugin: {module_name}")
+                    importlib.reload(module)
                 except Exception as e:
-                    logger.error("Error loading plugin %s: %s", module_name, str(e))
+                    logger.error("Error reloading plugin %s: %s", module_name, str(e))
+        self.plugins = {}
+        self.manifests = {}
+        self.load_plugins()
+
+    def register_plugin(self, name, plugin):
+        """Add a plugin instance at runtime and invalidate the command index."""
+        self.plugins[name] = plugin
+        self.invalidate_index()
+
+    def enable_process_pool(self, workers=None, timeout=None):
+        """Run CPU-bound plugin commands in warm worker processes.
+
+        Args:
+            workers: Number of worker processes, defaults to the CPU count
+            timeout: Seconds a command may run before it is cancelled, None for no limit
+        """
+        self.disable_process_pool()
+        self.process_pool = PluginProcessPool(list(self.plugins) + list(self.manifests),
+                                              workers, timeout)
+
+    def disable_process_pool(self):
+        """Shut the worker processes down; CPU-bound commands run inline again."""
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+            self.process_pool = None
+
+    def invalidate_index(self):
+        """Drop the cached command index; it is rebuilt on the next lookup."""
+        with self._lock:
+            self._command_index = None
+            self._array_index = None
+            self._pure_commands = None
+            self._cpu_bound_commands = None
+            self._batch_index = None
+            self._plugin_info = None
+
+    def _ensure_index(self):
+        """Build the index unless another thread did since the caller found it dropped."""
+        with self._lock:
+            if self._plugin_info is None:
+                self._build_index()
+
+    def _build_index(self):
+        """Flatten every plugin's get_commands() into the command index."""
+        index = {}
+        array_index = {}
+        batch_index = {}
+        pure_commands = set()
+        cpu_bound_commands = set()
+        info = {}
+        for name, plugin in self.plugins.items():
+            try:
+                commands = plugin.get_commands()
+                info[name] = (plugin.get_description(), tuple(commands))
+                get_array_commands = getattr(plugin, 'get_array_commands', None)
+                array_commands = get_array_commands() if get_array_commands else {}
+                get_pure_commands = getattr(plugin, 'get_pure_commands', None)
+                pure = get_pure_commands() if get_pure_commands else ()
+                get_cpu_bound_commands = getattr(plugin, 'get_cpu_bound_commands', None)
+                cpu_bound = get_cpu_bound_commands() if get_cpu_bound_commands else ()
+                get_batch_commands = getattr(plugin, 'get_batch_commands', None)
+                batch_commands = get_batch_commands() if get_batch_commands else {}
+            except Exception as e:
+                logger.error("Error indexing plugin %s: %s", name, str(e))
+                continue
+            for command, func in commands.items():
+                index[(name, command)] = func
+            for command, func in array_commands.items():
+                array_index[(name, command)] = func
+            for command, func in batch_commands.items():
+                batch_index[(name, command)] = func
+            pure_commands.update((name, command) for command in pure)
+            cpu_bound_commands.update((name, command) for command in cpu_bound)
+        for name, manifest in self.manifests.items():
+            info[name] = (manifest.get('description', ''), tuple(manifest.get('commands', ())))
+        self._command_index = MappingProxyType(index)
+        self._array_index = MappingProxyType(array_index)
+        self._batch_index = MappingProxyType(batch_index)
+        self._pure_commands = frozenset(pure_commands)
+        self._cpu_bound_commands = frozenset(cpu_bound_commands)
+        self._plugin_info = MappingProxyType(info)
+        self.lookup_stats['index_builds'] += 1
+
+    @property
+    def command_index(self):
+        """Read-only mapping of (plugin, command) to the callable implementing it."""
+        index = self._command_index
+        if index is None:
+            self._ensure_index()
+            index = self._command_index
+        return index
+
+    @property
+    def array_index(self):
+        """Read-only mapping of (plugin, command) to its vectorized variant."""
+        index = self._array_index
+        if index is None:
+            self._ensure_index()
+            index = self._array_index
+        return index
+
+    @property
+    def batch_index(self):
+        """Read-only mapping of (plugin, command) to its native batch implementation."""
+        index = self._batch_index
+        if index is None:
+            self._ensure_index()
+            index = self._batch_index
+        return index
+
+    @property
+    def pure_commands(self):
+        """Frozen set of (plugin, command) pairs that are safe to cache."""
+        index = self._pure_commands
+        if index is None:
+            self._ensure_index()
+            index = self._pure_commands
+        return index
+
+    @property
+    def cpu_bound_commands(self):
+        """Frozen set of (plugin, command) pairs run in the process pool when enabled."""
+        index = self._cpu_bound_commands
+        if index is None:
+            self._ensure_index()
+            index = self._cpu_bound_commands
+        return index
+
+    @property
+    def plugin_info(self):
+        """Read-only mapping of plugin name to (description, command names)."""
+        index = self._plugin_info
+        if index is None:
+            self._ensure_index()
+            index = self._plugin_info
+        return index
 
     def list_plugins(self):
         """List all available plugins and their commands"""
-        if not self.plugins:
+        if not self.plugin_info:
             return "No plugins available"
 
         output = "Available Plugins:\n"
-        for name, plugin in self.plugins.items():
+        for name, (description, commands) in self.plugin_info.items():
             output += f"\n{name}:\n"
-            output += f"  Description: {plugin.get_description()}\n"
+            output += f"  Description: {description}\n"
             output += "  Commands:\n"
-            for cmd in plugin.get_commands().keys():
+            for cmd in commands:
                 output += f"    - {cmd}\n"
         return output
 
+    def register_commands(self, registry):
+        """Register plugin commands as top-level keywords in a CommandRegistry.
+
+        Built-in keywords take precedence; a plugin command whose name is already
+        registered stays reachable through use_plugin only.
+        """
+        for plugin_name, (_, commands) in self.plugin_info.items():
+            for command in commands:
+                if command not in registry:
+                    registry.register(command, self._command_factory(plugin_name, command))
+
+    def _command_factory(self, plugin_name, command):
+        def create(args):
+            return PluginCommand(self, plugin_name, command, args)
+        return create
+
     def execute_command(self, plugin_name, command, *args):
         """Execute a plugin command"""
-        if plugin_name not in self.plugins:
-            error_msg = f"Plugin '{plugin_name}' not found"
+        self.lookup_stats['lookups'] += 1
+        func = self.command_index.get((plugin_name, command))
+        if func is None and self._load_deferred(plugin_name):
+            func = self.command_index.get((plugin_name, command))
+        if func is None:
+            self.lookup_stats['misses'] += 1
+            if plugin_name not in self.plugins:
+                error_msg = f"Plugin '{plugin_name}' not found"
+                logger.error(error_msg)
+                return error_msg
+            logger.error("Command '%s' not found in plugin '%s'", command, plugin_name)
+            return f"Command '{command}' not found in plugin '{plugin_name}'"
+        array = any(isinstance(arg, ARRAY_TYPES) for arg in args)
+        if array:
+            func = self.array_index.get((plugin_name, command), func)
+
+        # Calls over arrays return mutable arrays, which the cache must not hand out again
+        key = None
+        if self.cache is not None and not array and (plugin_name, command) in self.pure_commands:
+            normalized = normalize_args(args)
+            if normalized is not None:
+                key = (plugin_name, command, normalized)
+                result = self.cache.get(key)
+                if result is not MISSING:
+                    return result
+
+        start = time.perf_counter_ns() if metrics.enabled else 0
+        try:
+            if self.process_pool is not None and (plugin_name, command) in self.cpu_bound_commands:
+                result = self.process_pool.call(plugin_name, command, args, array)
+            else:
+                result = func(*args)
+            if start:
+                metrics.stop(PLUGIN, f"{plugin_name}.{command}", start)
+            logger.info("Executed command '%s' in plugin '%s' with result: %s", command, plugin_name, result)
+        except Exception as e:
+            logger.error("Error executing command: %s", e)
+            result = f"Error executing command: {str(e)}"
+        if key is not None and not isinstance(result, np.ndarray):
+            self.cache.put(key, result)
+        return result
+
+    def execute_many(self, plugin_name, command, iterable_of_args, chunksize=MAP_CHUNK_SIZE):
+        """Execute a plugin command for each argument tuple, yielding results lazily.
+
+        The command is resolved once. A native batch implementation from the
+        plugin's ``get_batch_commands()`` is used when present; CPU-bound
+        commands are sent in chunks to the process pool when it is enabled;
+        otherwise the command is called once per tuple. Results are not cached.
+
+        Args:
+            plugin_name: Plugin to call
+            command: Command to call
+            iterable_of_args: Argument tuples; a non-tuple item is a single argument
+            chunksize: Argument tuples per task sent to a worker process
+
+        Returns:
+            Iterator of results in argument order; failed calls yield their error
+            message, and an unknown plugin or command yields it for every tuple
+        """
+        self.lookup_stats['lookups'] += 1
+        func = self.command_index.get((plugin_name, command))
+        if func is None and self._load_deferred(plugin_name):
+            func = self.command_index.get((plugin_name, command))
+        if func is None:
+            self.lookup_stats['misses'] += 1
+            if plugin_name not in self.plugins:
+                error_msg = f"Plugin '{plugin_name}' not found"
+            else:
+                error_msg = f"Command '{command}' not found in plugin '{plugin_name}'"
             logger.error(error_msg)
-            return error_msg
+            return (error_msg for _ in iterable_of_args)
+        arg_tuples = map(_as_arg_tuple, iterable_of_args)
+        if self.process_pool is not None and (plugin_name, command) in self.cpu_bound_commands:
+            results = self._map_pooled(plugin_name, command, arg_tuples, chunksize)
+        elif (plugin_name, command) in self.batch_index:
+            results = self.batch_index[(plugin_name, command)](arg_tuples)
+        else:
+            results = self._map_inline(func, arg_tuples)
+        return self._logged(plugin_name, command, results)
 
-        plugin = self.plugins[plugin_name]
-        commands = plugin.get_commands()
+    @staticmethod
+    def _map_inline(func, arg_tuples):
+        for args in arg_tuples:
+            try:
+                yield func(*args)
+            except Exception as e:
+                yield f"Error executing command: {str(e)}"
 
-        if command not in commands:
-            logger.error(f"Command '{command}' not found in plugin '{plugin_name}'")
-            return f"Command '{command}' not found in plugin '{plugin_name}'"
+    def _map_pooled(self, plugin_name, command, arg_tuples, chunksize):
+        """Keep two chunks per worker in flight, yielding finished chunks in order."""
+        pool = self.process_pool
+        description = f"Command '{command}' in plugin '{plugin_name}'"
+        pending = deque()
+        for chunk in _chunked(arg_tuples, chunksize):
+            pending.append((pool.submit_many(plugin_name, command, chunk), len(chunk)))
+            if len(pending) >= 2 * pool.workers:
+                yield from self._chunk_results(pool, pending.popleft(), description)
+        while pending:
+            yield from self._chunk_results(pool, pending.popleft(), description)
+
+    @staticmethod
+    def _chunk_results(pool, pending_chunk, description):
+        future, size = pending_chunk
+        results = pool.wait(future, description=description)
+        return [results] * size if isinstance(results, str) else results
+
+    @staticmethod
+    def _logged(plugin_name, command, results):
+        count = 0
+        for count, result in enumerate(results, 1):
+            yield result
+        logger.info("Executed command '%s' in plugin '%s' over %d argument tuples",
+                    command, plugin_name, count)
+
+# Arithmetic operations dispatched from the REPL and batch mode
+OPERATIONS = {
+    'add': AddCommand,
+    'subtract': SubtractCommand,
+    'multiply': MultiplyCommand,
+    'divide': DivideCommand,
+}
+
+INVALID_FORMAT = "Invalid input format. Please use: operation number1 number2"
+
+def _parse_numbers(args):
+    """Convert the two operand tokens of a calculation to floats."""
+    if len(args) != 2:
+        raise InvalidCommandError(INVALID_FORMAT)
+    try:
+        return float(args[0]), float(args[1])
+    except ValueError:
+        raise InvalidCommandError("Please enter valid numbers") from None
+
+def _arithmetic_factory(command_class, history_manager, cache):
+    def create(args):
+        num1, num2 = _parse_numbers(args)
+        return FormattedCommand(command_class(history_manager, num1, num2, cache))
+    return create
+
+def _arithmetic_handler(operation, history_manager, cache):
+    """Run a calculation line without building command objects (the REPL hot path).
+
+    With instrumentation enabled the handler records its own parse (operands)
+    and execute stages.
+    """
+    def run(args):
+        if not metrics.enabled:
+            num1, num2 = _parse_numbers(args)
+            return f"Result: {execute_binary(history_manager, operation, num1, num2, cache)}"
+        start = time.perf_counter_ns()
+        num1, num2 = _parse_numbers(args)
+        parsed = time.perf_counter_ns()
+        metrics.record(STAGE, 'parse', parsed - start)
+        output = f"Result: {execute_binary(history_manager, operation, num1, num2, cache)}"
+        metrics.stop(STAGE, 'execute', parsed)
+        return output
+    return run
+
+def _no_argument_factory(keyword, create_command):
+    def create(args):
+        if args:
+            raise InvalidCommandError(f"Invalid {keyword} command format. Use: {keyword}")
+        return create_command()
+    return create
+
+def _filename_factory(keyword, command_class, history_manager):
+    def create(args):
+        if len(args) != 1:
+            raise InvalidCommandError(f"Invalid {keyword} command format. Use: {keyword} <filename>")
+        return command_class(history_manager, args[0])
+    return create
+
+def _load_history_factory(history_manager):
+    usage = "Invalid load_history_from_csv command format. Use: load_history_from_csv <filename> [chunk_rows]"
+    def create(args):
+        if len(args) not in (1, 2):
+            raise InvalidCommandError(usage)
+        chunksize = None
+        if len(args) == 2:
+            if not args[1].isdigit() or int(args[1]) == 0:
+                raise InvalidCommandError(usage)
+            chunksize = int(args[1])
+        return LoadHistoryCommand(history_manager, args[0], chunksize)
+    return create
+
+def _view_history_factory(history_manager):
+    usage = "Invalid view_history command format. Use: view_history [head N | tail N | page K [size S]]"
+    def create(args):
+        if not args:
+            return ViewHistoryCommand(history_manager)
+        if not all(arg.isdigit() and int(arg) > 0 for arg in args[1::2]):
+            raise InvalidCommandError(usage)
+        if len(args) == 2 and args[0] == 'head':
+            return ViewHistoryCommand(history_manager, 0, int(args[1]))
+        if len(args) == 2 and args[0] == 'tail':
+            return ViewHistoryCommand(history_manager, -int(args[1]))
+        if len(args) in (2, 4) and args[0] == 'page' and args[2:3] in ([], ['size']):
+            page, size = int(args[1]), int(args[3]) if len(args) == 4 else VIEW_PAGE_SIZE
+            return ViewHistoryCommand(history_manager, (page - 1) * size, page * size)
+        raise InvalidCommandError(usage)
+    return create
+
+def _export_history_factory(history_manager):
+    usage = "Invalid export_history command format. Use: export_history <filename> [chunk_rows]"
+    def create(args):
+        if len(args) not in (1, 2) or (len(args) == 2 and not (args[1].isdigit() and int(args[1]) > 0)):
+            raise InvalidCommandError(usage)
+        return ExportHistoryCommand(history_manager, args[0], int(args[1]) if len(args) == 2 else None)
+    return create
+
+def _compact_history_factory(history_manager):
+    def create(args):
+        if len(args) > 1:
+            raise InvalidCommandError(
+                "Invalid compact_history command format. Use: compact_history [filename]")
+        filename = args[0] if args else 'history.csv'
+        return CompactHistoryCommand(history_manager, filename, fsync=HISTORY_FSYNC)
+    return create
 
+def _query_history_factory(history_manager):
+    usage = ("Invalid query_history command format. Use: query_history [operation|all] "
+             "[from <time>] [to <time>] [page <n>] [size <n>] [db <filename>]")
+    def create(args):
+        options = {'from': None, 'to': None, 'page': '1', 'size': '20', 'db': HISTORY_DB}
+        operation = None
+        if len(args) % 2:
+            operation = None if args[0] == 'all' else args[0]
+            args = args[1:]
+        for key, value in zip(args[::2], args[1::2]):
+            if key not in options:
+                raise InvalidCommandError(usage)
+            options[key] = value
+        if not (options['page'].isdigit() and options['size'].isdigit()
+                and int(options['page']) > 0 and int(options['size']) > 0):
+            raise InvalidCommandError(usage)
         try:
-            result = commands[command](*args)
-            logger.info(f"Executed command '{command}' in plugin '{plugin_name}' with result: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error executing command: {str(e)}")
-            return f"Error executing command: {str(e)}"
+            start, end = (datetime.fromisoformat(options[key]) if options[key] else None
+                          for key in ('from', 'to'))
+        except ValueError:
+            raise InvalidCommandError("Times must be ISO formatted, e.g. 2024-10-23t20:06") from None
+        return QueryHistoryCommand(history_manager, options['db'], operation, start, end,
+                                   int(options['page']), int(options['size']))
+    return create
+
+def _use_plugin_factory(plugin_manager):
+    def create(args):
+        if len(args) < 2:
+            raise InvalidCommandError(
+                "Invalid input format. Use: use_plugin <plugin_name> <command> [args...]")
+        return PluginCommand(plugin_manager, args[0], args[1], args[2:])
+    return create
+
+def _map_plugin_factory(plugin_manager):
+    def create(args):
+        if len(args) < 3:
+            raise InvalidCommandError(
+                "Invalid input format. Use: map_plugin <plugin_name> <command> <args> [<args>...] "
+                "(comma-separated arguments per call)")
+        return MapPluginCommand(plugin_manager, args[0], args[1],
+                                [tuple(token.split(',')) for token in args[2:]])
+    return create
+
+def _eval_factory(evaluator):
+    usage = "Invalid eval command format. Use: eval <expression> [with <name>=<value> ...]"
+    def create(args):
+        if 'with' in args:
+            split = args.index('with')
+            args, assignments = args[:split], args[split + 1:]
+        else:
+            assignments = []
+        if not args:
+            raise InvalidCommandError(usage)
+        bindings = {}
+        for assignment in assignments:
+            name, _, value = assignment.partition('=')
+            try:
+                bindings[name] = float(value)
+            except ValueError:
+                raise InvalidCommandError(usage) from None
+        return EvaluateExpressionCommand(evaluator, ' '.join(args), bindings)
+    return create
+
+def _eval_history_factory(evaluator, history_manager):
+    def create(args):
+        if not args:
+            raise InvalidCommandError(
+                "Invalid eval_history command format. Use: eval_history <expression over num1, num2, result>")
+        return EvaluateHistoryCommand(evaluator, history_manager, ' '.join(args))
+    return create
+
+def _stats_factory():
+    def create(args):
+        if args not in ([], ['reset']):
+            raise InvalidCommandError("Invalid stats command format. Use: stats [reset]")
+        return StatsCommand(metrics, reset=bool(args))
+    return create
+
+def _unknown_command(tokens):
+    """Fallback for unregistered keywords, reporting the most specific error."""
+    _parse_numbers(tokens[1:])
+    raise InvalidCommandError("Invalid operation. Use add, subtract, multiply, or divide")
+
+def build_registry(history_manager, plugin_manager, cache=None):
+    """Build the keyword dispatch table used by the REPL and batch mode.
+
+    Args:
+        history_manager: History that calculations and history commands act on
+        plugin_manager: Plugin manager whose commands are registered as well
+        cache: Optional ResultCache memoizing arithmetic results
+
+    Returns:
+        CommandRegistry with the built-in commands and plugin commands
+    """
+    registry = CommandRegistry(_unknown_command)
+    for name, command_class in OPERATIONS.items():
+        registry.register(name, _arithmetic_factory(command_class, history_manager, cache),
+                          _arithmetic_handler(name, history_manager, cache))
+    registry.register('exit', _no_argument_factory('exit', ExitCommand))
+    registry.register('menu', _no_argument_factory('menu', lambda: ListPluginsCommand(plugin_manager)))
+    registry.register('use_plugin', _use_plugin_factory(plugin_manager))
+    registry.register('map_plugin', _map_plugin_factory(plugin_manager))
+    evaluator = ExpressionEvaluator(plugin_manager, ResultCache(EXPRESSION_CACHE_SIZE))
+    registry.register('eval', _eval_factory(evaluator))
+    registry.register('eval_history', _eval_history_factory(evaluator, history_manager))
+    registry.register('verify_history', _no_argument_factory(
+        'verify_history', lambda: VerifyHistoryCommand(history_manager)))
+    registry.register('cache_stats', _no_argument_factory(
+        'cache_stats', lambda: CacheStatsCommand(cache or plugin_manager.cache)))
+    registry.register('stats', _stats_factory())
+    registry.register('save_history', _no_argument_factory(
+        'save_history', lambda: SaveHistoryCommand(history_manager, 'history.csv',
+                                                   incremental=True, fsync=HISTORY_FSYNC)))
+    registry.register('compact_history', _compact_history_factory(history_manager))
+    registry.register('load_history', _no_argument_factory(
+        'load_history', lambda: LoadHistoryCommand(history_manager, 'history.csv')))
+    registry.register('view_history', _view_history_factory(history_manager))
+    registry.register('export_history', _export_history_factory(history_manager))
+    registry.register('history_stats', _no_argument_factory(
+        'history_stats', lambda: HistoryStatsCommand(history_manager)))
+    registry.register('clear_history', _no_argument_factory(
+        'clear_history', lambda: ClearHistoryCommand(history_manager)))
+    registry.register('delete_history', _no_argument_factory(
+        'delete_history', lambda: ClearHistoryCommand(history_manager)))
+    registry.register('undo', _no_argument_factory('undo', lambda: UndoCommand(history_manager)))
+    registry.register('redo', _no_argument_factory('redo', lambda: RedoCommand(history_manager)))
+    registry.register('save_history_to_csv', _filename_factory(
+        'save_history_to_csv', SaveHistoryCommand, history_manager))
+    registry.register('load_history_from_csv', _load_history_factory(history_manager))
+    registry.register('query_history', _query_history_factory(history_manager))
+    plugin_manager.register_commands(registry)
+    return registry
+
+def process_line(user_input, registry):
+    """Process one normalized input line and return the text to print.
+
+    The line is tokenized once and dispatched through the registry; keywords
+    with a handler (the calculations) run without building Command objects.
+
+    Args:
+        user_input: Stripped, lower-cased input line
+        registry: CommandRegistry built by build_registry
+
+    Returns:
+        The output line, or EXIT when the user asked to quit
+    """
+    if metrics.enabled:
+        return _timed_process_line(user_input, registry)
+    tokens = user_input.split()
+    try:
+        handler = registry.handler(tokens[0]) if tokens else None
+        if handler is not None:
+            return handler(tokens[1:])
+        command = registry.create(tokens)
+    except InvalidCommandError as e:
+        logger.warning("Invalid command '%s': %s", user_input, e)
+        return f"Error: {e}"
+    return command.execute()
+
+def _timed_process_line(user_input, registry):
+    """process_line recording parse, execute and per-command latencies.
+
+    Parsing covers tokenizing and building the command. Calculations run
+    through their handler, which records its own parse and execute stages.
+    Unregistered keywords are recorded as '(unknown)'.
+    """
+    start = time.perf_counter_ns()
+    tokens = user_input.split()
+    keyword = tokens[0] if tokens else ''
+    parsed = None
+    try:
+        handler = registry.handler(keyword) if tokens else None
+        if handler is not None:
+            output = handler(tokens[1:])
+        else:
+            command = registry.create(tokens)
+            parsed = time.perf_counter_ns()
+            metrics.record(STAGE, 'parse', parsed - start)
+            output = command.execute()
+    except InvalidCommandError as e:
+        logger.warning("Invalid command '%s': %s", user_input, e)
+        output = f"Error: {e}"
+    end = time.perf_counter_ns()
+    if parsed is not None:
+        metrics.record(STAGE, 'execute', end - parsed)
+    metrics.record(COMMAND, keyword if keyword in registry else '(unknown)', end - start)
+    return output
+
+def open_wal(history_manager):
+    """Enable the write-ahead log named by CALC_WAL and recover what it holds.
+
+    The recovery is not pushed on the undo stack, so an undo cannot revert
+    the history to what it was before the restart.
+
+    Args:
+        history_manager (HistoryManager): History to log to
+
+    Returns:
+        str: Result of loading the saved history with the logged records, or
+        None if there is no log or it holds nothing from a previous run
+    """
+    if WAL_PATH and history_manager.enable_wal(WAL_PATH, WAL_DURABILITY):
+        return history_manager.recover()
+    return None
 
 def main():
     logger.info("Enhanced Calculator REPL with Plugin System started")
@@ -133,137 +897,137 @@ def main():
     print("  Calculations: add, subtract, multiply, divide")
     print("  History commands:")
     print("    - save_history, load_history, view_history, clear_history")
-    print("    - delete_history")
+    print("    - view_history head <n> | tail <n> | page <k> [size <s>]")
+    print("    - export_history <filename> [chunk_rows], history_stats")
+    print("    - delete_history, compact_history [filename]")
+    print("    - undo, redo")
     print("    - save_history_to_csv <filename>")
-    print("    - load_history_from_csv <filename>")
+    print("    - load_history_from_csv <filename> [chunk_rows]")
+    print("    - query_history [operation|all] [from <time>] [to <time>] [page <n>] [size <n>] [db <file>]")
+    print("    - eval_history <expression over num1, num2, result>, verify_history")
     print("  Plugins: menu, use_plugin <plugin_name> <command> [args...]")
+    print("    - map_plugin <plugin_name> <command> <args> [<args>...] (args of one call comma-separated)")
+    print("  Diagnostics: cache_stats, stats [reset] (with CALC_METRICS=1)")
+    print("  Expressions: eval <expression> [with <name>=<value> ...], e.g. eval (2+3)*sqrt(x) with x=16")
     print("Format for calculations: operation number1 number2")
     print("Type 'exit' to quit")
 
+    cache = ResultCache.from_env(os.environ)
     history_manager = HistoryManager()
-    plugin_manager = PluginManager()
+    history_manager.set_undo_depth(UNDO_DEPTH)
+    registry = build_registry(history_manager, PluginManager(cache=cache), cache)
+    recovered = open_wal(history_manager)
+    if recovered:
+        print(recovered)
 
     while True:
         try:
             user_input = input("> ").strip().lower()
-            logger.info(f"User input: {user_input}")
-
-            if user_input == 'exit':
-                logger.info("User exited the calculator")
+        except EOFError:
+            logger.info("End of input reached")
+            break
+        try:
+            logger.info("User input: %s", user_input)
+            output = process_line(user_input, registry)
+            if output is EXIT:
                 break
+            print(output)
+        except Exception as e:
+            logger.error("Error: %s", e)
+            print(f"Error: {str(e)}")
+    history_manager.disable_wal()
 
-            if user_input == 'menu':
-                logger.info("User requested plugin menu")
-                print(plugin_manager.list_plugins())
-                continue
+def iter_input_lines(stream, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield normalized input lines read from a binary stream in large chunks.
 
-            if user_input.startswith('use_plugin '):
-                parts = user_input.split()
-                if len(parts) < 3:
-                    logger.warning("Invalid plugin command format")
-                    print("Error: Invalid plugin command format. Use: use_plugin <plugin_name> <command> [args...]")
-                    continue
-                plugin_name = parts[1]
-                command = parts[2]
-                args = parts[3:]
-                logger.info(f"User executed plugin command: {plugin_name} {command} {args}")
-                result = plugin_manager.execute_command(plugin_name, command, *args)
-                print(f"Result: {result}")
-                continue
+    Args:
+        stream: Binary file-like object, e.g. sys.stdin.buffer
+        chunk_size: Number of bytes to read per chunk
 
-            if user_input == 'save_history':
-                logger.info("User requested to save history")
-                command = SaveHistoryCommand(history_manager, 'history.csv')
-                print(command.execute())
-                continue
-            if user_input == 'load_history':
-                logger.info("User requested to load history")
-                command = LoadHistoryCommand(history_manager, 'history.csv')
-                print(command.execute())
-                continue
-            elif user_input == 'view_history':
-                logger.info("User requested to view history")
-                command = ViewHistoryCommand(history_manager)
-                print(command.execute())
-                continue
-            elif user_input == 'clear_history':
-                logger.info("User requested to clear history")
-                command = ClearHistoryCommand(history_manager)
-                print(command.execute())
-                continue
-            elif user_input == 'delete_history':
-                logger.info("User requested to delete history")
-                print(history_manager.clear_data())
-                continue
-            elif user_input.startswith('save_history_to_csv '):
-                parts = user_input.split()
-                if len(parts) != 2:
-                    logger.warning("Invalid save_history_to_csv command format")
-                    print("Error: Invalid save_history_to_csv command format. Use: save_history_to_csv <filename>")
-                    continue
-                filename = parts[1]
-                logger.info(f"User requested to save history to CSV: {filename}")
-                command = SaveHistoryCommand(history_manager, filename)
-                print(command.execute())
-                continue
-            elif user_input.startswith('load_history_from_csv '):
-                parts = user_input.split()
-                if len(parts) != 2:
-                    logger.warning("Invalid load_history_from_csv command format")
-                    print("Error: Invalid load_history_from_csv command format. Use: load_history_from_csv <filename>")
-                    continue
-                filename = parts[1]
-                logger.info(f"User requested to load history from CSV: {filename}")
-                command = LoadHistoryCommand(history_manager, filename)
-                print(command.execute())
-                continue
+    Yields:
+        Each line stripped and lower-cased, as the REPL normalizes input
+    """
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8', errors='replace').strip().lower()
+    if pending:
+        yield pending.decode('utf-8', errors='replace').strip().lower()
 
-            # Check for save/load history commands first
-            if user_input.startswith('save_history_to_csv') or user_input.startswith('load_history_from_csv'):
-                parts = user_input.split()
-                if len(parts) != 2:
-                    logger.warning(f"Invalid {parts[0]} command format")
-                    print(f"Error: Invalid {parts[0]} command format. Use: {parts[0]} <filename>")
-                    continue
+def run_batch(stream_in, stream_out, stream_err, chunk_size=BATCH_CHUNK_SIZE):
+    """Evaluate newline-separated commands without the interactive prompt.
 
-            # Handle regular calculator operations
-            parts = user_input.split()
-            if len(parts) != 3:
-                logger.warning("Invalid input format")
-                print("Error: Invalid input format. Please use: operation number1 number2")
-                continue
+    Every line goes through process_line and the same dispatch table as the REPL,
+    so each output line matches what the REPL prints. Output is buffered and
+    written in blocks, and a throughput summary is written to ``stream_err``.
+    As in the REPL, CALC_WAL logs the new records and records left in the log
+    by a previous run are recovered first, reported on ``stream_err``.
 
-            operation, num1, num2 = parts
+    Args:
+        stream_in: Binary input stream
+        stream_out: Text output stream for results
+        stream_err: Text stream for the summary
+        chunk_size: Number of bytes to read per input chunk
 
-            try:
-                num1 = float(num1)
-                num2 = float(num2)
-            except ValueError:
-                logger.error("Invalid numbers entered")
-                print("Error: Please enter valid numbers")
-                continue
+    Returns:
+        Tuple (lines, errors) with the number of processed and failed lines
+    """
+    cache = ResultCache.from_env(os.environ)
+    history_manager = HistoryManager()
+    history_manager.set_undo_depth(UNDO_DEPTH)
+    registry = build_registry(history_manager, PluginManager(cache=cache), cache)
+    recovered = open_wal(history_manager)
+    if recovered:
+        stream_err.write(recovered + '\n')
+    pending = []
+    lines = errors = 0
+    start = time.perf_counter()
 
-            command = None
-            if operation == 'add':
-                command = AddCommand(history_manager, num1, num2)
-            elif operation == 'subtract':
-                command = SubtractCommand(history_manager, num1, num2)
-            elif operation == 'multiply':
-                command = MultiplyCommand(history_manager, num1, num2)
-            elif operation == 'divide':
-                command = DivideCommand(history_manager, num1, num2)
-            else:
-                logger.error("Invalid operation")
-                print("Error: Invalid operation. Use add, subtract, multiply, or divide")
-                continue
+    try:
+        for user_input in iter_input_lines(stream_in, chunk_size):
+            try:
+                output = process_line(user_input, registry)
+            except Exception as e:
+                logger.error("Error: %s", e)
+                output = f"Error: {str(e)}"
+            if output is EXIT:
+                break
+            lines += 1
+            if 'Error' in output:
+                errors += 1
+            pending.append(output)
+            if len(pending) >= BATCH_OUTPUT_LINES:
+                stream_out.write('\n'.join(pending) + '\n')
+                pending.clear()
+    finally:
+        history_manager.disable_wal()
 
-            result = command.execute()
-            logger.info(f"User executed {operation} command with result: {result}")
-            print(f"Result: {result}")
+    if pending:
+        stream_out.write('\n'.join(pending) + '\n')
+    stream_out.flush()
+    elapsed = time.perf_counter() - start
+    rate = lines / elapsed if elapsed > 0 else 0.0
+    stream_err.write(f"Processed {lines} lines in {elapsed:.3f}s ({rate:,.0f} lines/s), {errors} errors\n")
+    return lines, errors
 
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            print(f"Error: {str(e)}")
+def cli(argv=None):
+    """Command line entry point: interactive REPL or --batch streaming mode."""
+    parser = argparse.ArgumentParser(description="Enhanced Calculator REPL with Plugin System")
+    parser.add_argument('--batch', action='store_true',
+                        help='read commands from stdin without prompts and print only results')
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+                        help='bytes read from stdin per chunk in batch mode')
+    args = parser.parse_args(argv)
+    with profiled(PROFILE_PATH):
+        if args.batch:
+            run_batch(sys.stdin.buffer, sys.stdout, sys.stderr, args.chunk_size)
+        else:
+            main()
 
 if __name__ == "__main__":
-    main()
+    cli()
@@ -1,79 +1,243 @@
+import operator
+from collections import deque
+
+import numpy as np
+
+from cache import MISSING, normalize_args
+from instrumentation import format_metrics
+
+# Returned by ExitCommand to tell the REPL loop to stop
+EXIT = object()
+
+# History edits kept for undo unless configured otherwise
+DEFAULT_UNDO_DEPTH = 100
+
 class Command:
+    __slots__ = ()
+
     def execute(self):
         raise NotImplementedError
 
-class AddCommand(Command):
-    def __init__(self, facade, num1, num2):
+def _divide(num1, num2):
+    if num2 == 0:
+        return "Error: Division by zero"
+    return num1 / num2
+
+# Binary arithmetic operations: name -> function returning the result or an error message
+BINARY_OPERATIONS = {
+    'add': operator.add,
+    'subtract': operator.sub,
+    'multiply': operator.mul,
+    'divide': _divide,
+}
+
+def execute_binary(facade, operation, num1, num2, cache=None):
+    """Compute a binary operation and record it, without creating a command object.
+
+    This is what ArithmeticCommand.execute does, for hot paths that have the
+    operands at hand and don't need a command to pass around.
+
+    Args:
+        facade: History to record the calculation in
+        operation: Key of BINARY_OPERATIONS
+        num1: First operand
+        num2: Second operand
+        cache: Optional ResultCache memoizing results on (operation, num1, num2)
+
+    Returns:
+        The result, or an error message (which is not recorded)
+    """
+    if cache is None:
+        result = BINARY_OPERATIONS[operation](num1, num2)
+    else:
+        key = ('arithmetic', operation, normalize_args((num1, num2)))
+        result = cache.get(key)
+        if result is MISSING:
+            result = BINARY_OPERATIONS[operation](num1, num2)
+            cache.put(key, result)
+    # Arithmetic only returns a string for an error message
+    if isinstance(result, str):
+        return result
+    facade.add_record(operation, num1, num2, result)
+    return result
+
+class ArithmeticCommand(Command):
+    """Binary arithmetic command that records its result in history.
+
+    The operation is looked up in BINARY_OPERATIONS. With a ResultCache results
+    are memoized on (operation, num1, num2); the calculation is still recorded
+    on a cache hit. Instances have no ``__dict__``.
+    """
+    __slots__ = ('facade', 'operation', 'num1', 'num2', 'result', 'cache')
+
+    def __init__(self, facade, operation, num1, num2, cache=None):
+        if operation not in BINARY_OPERATIONS:
+            raise ValueError(f"Invalid operation '{operation}'. Use add, subtract, multiply, or divide")
         self.facade = facade
+        self.operation = operation
         self.num1 = num1
         self.num2 = num2
         self.result = None
+        self.cache = cache
+
+    def compute(self):
+        return BINARY_OPERATIONS[self.operation](self.num1, self.num2)
 
     def execute(self):
-        self.result = self.num1 + self.num2
-        self.facade.add_record('add', self.num1, self.num2, self.result)
-        return self.result
+        if self.cache is not None:
+            result = execute_binary(self.facade, self.operation, self.num1, self.num2, self.cache)
+        else:
+            # Uncached fast path, the same steps as execute_binary without the extra call
+            result = BINARY_OPERATIONS[self.operation](self.num1, self.num2)
+            if isinstance(result, str):
+                return result
+            self.facade.add_record(self.operation, self.num1, self.num2, result)
+        if not isinstance(result, str):
+            self.result = result
+        return result
+
+def _operation_init(operation):
+    """Build the __init__ of an ArithmeticCommand subclass fixed to ``operation``.
 
-class SubtractCommand(Command):
-    def __init__(self, facade, num1, num2):
+    Assigning the slots directly keeps construction as cheap as a plain class.
+    """
+    def __init__(self, facade, num1, num2, cache=None):
         self.facade = facade
+        self.operation = operation
         self.num1 = num1
         self.num2 = num2
         self.result = None
+        self.cache = cache
+    return __init__
 
-    def execute(self):
-        self.result = self.num1 - self.num2
-        self.facade.add_record('subtract', self.num1, self.num2, self.result)
-        return self.result
+class AddCommand(ArithmeticCommand):
+    __slots__ = ()
+    __init__ = _operation_init('add')
+
+class SubtractCommand(ArithmeticCommand):
+    __slots__ = ()
+    __init__ = _operation_init('subtract')
+
+class MultiplyCommand(ArithmeticCommand):
+    __slots__ = ()
+    __init__ = _operation_init('multiply')
+
+class DivideCommand(ArithmeticCommand):
+    __slots__ = ()
+    __init__ = _operation_init('divide')
 
-class MultiplyCommand(Command):
-    def __init__(self, facade, num1, num2):
+class BatchCommand(Command):
+    OPERATIONS = {
+        'add': np.add,
+        'subtract': np.subtract,
+        'multiply': np.multiply,
+        'divide': np.divide,
+    }
+
+    def __init__(self, facade, operation, num1, num2):
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Invalid operation '{operation}'. Use add, subtract, multiply, or divide")
         self.facade = facade
-        self.num1 = num1
-        self.num2 = num2
+        self.operation = operation
+        # Scalar operands make a one-element batch rather than a 0-d array
+        self.num1, self.num2 = np.broadcast_arrays(np.atleast_1d(np.asarray(num1, dtype=np.float64)),
+                                                   np.atleast_1d(np.asarray(num2, dtype=np.float64)))
         self.result = None
+        self.errors = None
 
     def execute(self):
-        self.result = self.num1 * self.num2
-        self.facade.add_record('multiply', self.num1, self.num2, self.result)
-        return self.result
+        """Return (results, errors); errored elements are NaN and not recorded."""
+        if self.operation == 'divide':
+            self.errors = self.num2 == 0
+            self.result = np.divide(self.num1, self.num2, out=np.full(self.num1.shape, np.nan),
+                                    where=~self.errors)
+        else:
+            self.errors = np.zeros(self.num1.shape, dtype=bool)
+            self.result = self.OPERATIONS[self.operation](self.num1, self.num2)
+        if self.errors.any():
+            valid = ~self.errors
+            self.facade.add_records(self.operation, self.num1[valid], self.num2[valid],
+                                    self.result[valid])
+        else:
+            self.facade.add_records(self.operation, self.num1, self.num2, self.result)
+        return self.result, self.errors
 
-class DivideCommand(Command):
-    def __init__(self, facade, num1, num2):
+class SaveHistoryCommand(Command):
+    def __init__(self, facade, filename, incremental=False, fsync=False):
         self.facade = facade
-        self.num1 = num1
-        self.num2 = num2
-        self.result = None
+        self.filename = filename
+        self.incremental = incremental
+        self.fsync = fsync
 
     def execute(self):
-        if self.num2 == 0:
-            return "Error: Division by zero"
-        self.result = self.num1 / self.num2
-        self.facade.add_record('divide', self.num1, self.num2, self.result)
-        return self.result
+        if not self.incremental and not self.fsync:
+            return self.facade.save_to_csv(self.filename)
+        return self.facade.save_to_csv(self.filename, incremental=self.incremental, fsync=self.fsync)
 
-class SaveHistoryCommand(Command):
-    def __init__(self, facade, filename):
+class CompactHistoryCommand(Command):
+    """Rewrite a history file from the in-memory history in one pass."""
+    def __init__(self, facade, filename, fsync=False):
         self.facade = facade
         self.filename = filename
+        self.fsync = fsync
 
     def execute(self):
-        return self.facade.save_to_csv(self.filename)
+        return self.facade.save_to_csv(self.filename, incremental=False, fsync=self.fsync)
 
 class LoadHistoryCommand(Command):
-    def __init__(self, facade, filename):
+    def __init__(self, facade, filename, chunksize=None, append=False):
+        self.facade = facade
+        self.filename = filename
+        self.chunksize = chunksize
+        self.append = append
+
+    def execute(self):
+        if self.chunksize is None and not self.append:
+            return self.facade.load_from_csv(self.filename)
+        return self.facade.load_from_csv(self.filename, chunksize=self.chunksize, append=self.append)
+
+class QueryHistoryCommand(Command):
+    def __init__(self, facade, filename, operation=None, start=None, end=None, page=1, page_size=20):
         self.facade = facade
         self.filename = filename
+        self.operation = operation
+        self.start = start
+        self.end = end
+        self.page = page
+        self.page_size = page_size
 
     def execute(self):
-        return self.facade.load_from_csv(self.filename)
+        return self.facade.query_history(self.filename, self.operation, self.start, self.end,
+                                         self.page, self.page_size)
 
 class ViewHistoryCommand(Command):
+    def __init__(self, facade, start=None, stop=None):
+        self.facade = facade
+        self.start = start
+        self.stop = stop
+
+    def execute(self):
+        if self.start is None and self.stop is None:
+            return self.facade.view_data()
+        return self.facade.view_data(self.start, self.stop)
+
+class ExportHistoryCommand(Command):
+    def __init__(self, facade, filename, chunksize=None):
+        self.facade = facade
+        self.filename = filename
+        self.chunksize = chunksize
+
+    def execute(self):
+        if self.chunksize is None:
+            return self.facade.export_view(self.filename)
+        return self.facade.export_view(self.filename, self.chunksize)
+
+class HistoryStatsCommand(Command):
     def __init__(self, facade):
         self.facade = facade
 
     def execute(self):
-        return self.facade.view_data()
+        return self.facade.history_stats()
 
 class ClearHistoryCommand(Command):
     def __init__(self, facade):
@@ -81,3 +245,280 @@ class ClearHistoryCommand(Command):
 
     def execute(self):
         return self.facade.clear_data()
+
+class EvaluateExpressionCommand(Command):
+    """Evaluate an infix expression with an ExpressionEvaluator."""
+    def __init__(self, evaluator, expression, bindings=None):
+        self.evaluator = evaluator
+        self.expression = expression
+        self.bindings = bindings
+
+    def execute(self):
+        result = self.evaluator.evaluate(self.expression, self.bindings)
+        if isinstance(result, str):
+            return result
+        return f"Result: {result}"
+
+class EvaluateHistoryCommand(Command):
+    """Evaluate an expression over the history columns, vectorized."""
+    def __init__(self, evaluator, facade, expression):
+        self.evaluator = evaluator
+        self.facade = facade
+        self.expression = expression
+
+    def execute(self):
+        return self.facade.evaluate_history(self.evaluator, self.expression)
+
+class VerifyHistoryCommand(Command):
+    def __init__(self, facade):
+        self.facade = facade
+
+    def execute(self):
+        return self.facade.verify_history()
+
+class UndoCommand(Command):
+    def __init__(self, facade):
+        self.facade = facade
+
+    def execute(self):
+        return self.facade.undo()
+
+class RedoCommand(Command):
+    def __init__(self, facade):
+        self.facade = facade
+
+    def execute(self):
+        return self.facade.redo()
+
+class HistoryEdit(Command):
+    """A change to the history that the UndoStack can revert and apply again."""
+    __slots__ = ()
+
+    def undo(self):
+        """Revert the effect of execute(); redoing an edit executes it again."""
+        raise NotImplementedError
+
+class AppendRecordsEdit(HistoryEdit):
+    """Undo entry for records appended to a HistoryStore at indexes [start, stop).
+
+    Undo truncates the store in O(1); redo brings the truncated rows back.
+    """
+    __slots__ = ('store', 'start', 'stop')
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+    def execute(self):
+        self.store.untruncate(self.stop)
+
+    def undo(self):
+        self.store.truncate(self.start)
+
+    def __str__(self):
+        count = self.stop - self.start
+        return "1 record" if count == 1 else f"{count} records"
+
+class ReplaceRecordsEdit(HistoryEdit):
+    """Undo entry for an operation that replaced a HistoryStore's records (clear, load).
+
+    Only a copy-on-write snapshot of the records on the other side of the edit
+    is kept, so an entry costs no copy of the history.
+    """
+    __slots__ = ('store', 'label', 'snapshot')
+
+    def __init__(self, store, label, before):
+        self.store = store
+        self.label = label
+        self.snapshot = before
+
+    def _swap(self):
+        snapshot = self.snapshot
+        self.snapshot = self.store.checkpoint()
+        self.store.restore(snapshot)
+
+    def execute(self):
+        self._swap()
+
+    def undo(self):
+        self._swap()
+
+    def __str__(self):
+        return self.label
+
+class ExitCommand(Command):
+    def execute(self):
+        return EXIT
+
+class ListPluginsCommand(Command):
+    def __init__(self, plugin_manager):
+        self.plugin_manager = plugin_manager
+
+    def execute(self):
+        return self.plugin_manager.list_plugins()
+
+class PluginCommand(Command):
+    def __init__(self, plugin_manager, plugin_name, command, args):
+        self.plugin_manager = plugin_manager
+        self.plugin_name = plugin_name
+        self.command = command
+        self.args = args
+
+    def execute(self):
+        result = self.plugin_manager.execute_command(self.plugin_name, self.command, *self.args)
+        return f"Result: {result}"
+
+class MapPluginCommand(Command):
+    """Run a plugin command over several argument tuples in one batch."""
+    def __init__(self, plugin_manager, plugin_name, command, arg_tuples):
+        self.plugin_manager = plugin_manager
+        self.plugin_name = plugin_name
+        self.command = command
+        self.arg_tuples = arg_tuples
+
+    def execute(self):
+        results = self.plugin_manager.execute_many(self.plugin_name, self.command, self.arg_tuples)
+        return f"Results: {', '.join(map(str, results))}"
+
+class FormattedCommand(Command):
+    """Wrap a command so that its result is returned as a 'Result: ...' line."""
+    __slots__ = ('command',)
+
+    def __init__(self, command):
+        self.command = command
+
+    def execute(self):
+        return f"Result: {self.command.execute()}"
+
+class CacheStatsCommand(Command):
+    def __init__(self, cache):
+        self.cache = cache
+
+    def execute(self):
+        if self.cache is None:
+            return "Result cache is disabled (set CALC_CACHE_SIZE to enable it)"
+        stats = self.cache.stats()
+        return ("Cache: {size}/{max_size} entries, {hits} hits, {misses} misses, "
+                "{evictions} evictions, {expirations} expirations, "
+                "hit rate {hit_rate:.1%}").format(**stats)
+
+class StatsCommand(Command):
+    def __init__(self, metrics, reset=False):
+        self.metrics = metrics
+        self.reset = reset
+
+    def execute(self):
+        if not self.metrics.enabled:
+            return "Instrumentation is disabled (set CALC_METRICS=1 to enable it)"
+        if self.reset:
+            self.metrics.reset()
+            return "Latency statistics reset"
+        return format_metrics(self.metrics.snapshot())
+
+class UndoStack:
+    """Bounded undo and redo stacks of executed HistoryEdit commands.
+
+    Pushing a command clears the redo stack. Once ``depth`` commands are on the
+    undo stack, pushing another drops the oldest; a depth of 0 keeps none.
+    """
+    def __init__(self, depth=DEFAULT_UNDO_DEPTH):
+        self._undo = deque(maxlen=depth)
+        self._redo = []
+
+    @property
+    def depth(self):
+        return self._undo.maxlen
+
+    def resize(self, depth):
+        """Change the depth, dropping the oldest commands that no longer fit."""
+        self._undo = deque(self._undo, maxlen=depth)
+        del self._redo[:max(0, len(self._redo) - depth)]
+
+    def push(self, command):
+        self._undo.append(command)
+        if self._redo:
+            self._redo.clear()
+
+    def undo(self):
+        """Undo the last command and return it, or None if there is none."""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        try:
+            command.undo()
+        except Exception:
+            self._undo.append(command)
+            raise
+        self._redo.append(command)
+        return command
+
+    def redo(self):
+        """Execute the last undone command again and return it, or None if there is none."""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        try:
+            command.execute()
+        except Exception:
+            self._redo.append(command)
+            raise
+        self._undo.append(command)
+        return command
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def redo_count(self):
+        return len(self._redo)
+
+class InvalidCommandError(ValueError):
+    """Raised by a command factory when the input does not match its usage."""
+
+class CommandRegistry:
+    """Maps command keywords to factories that build Command objects.
+
+    A factory is called with the argument tokens that followed the keyword and
+    returns a Command; it raises InvalidCommandError for malformed arguments.
+    Lines whose keyword is not registered are handed to the fallback factory
+    together with the full token list.
+
+    A keyword may also have a handler: a function taking the same argument
+    tokens that runs the command directly and returns its output, so hot
+    commands can be executed without building a Command object.
+    """
+    def __init__(self, fallback):
+        self._factories = {}
+        self._handlers = {}
+        self._fallback = fallback
+
+    def register(self, keyword, factory, handler=None):
+        self._factories[keyword] = factory
+        if handler is None:
+            self._handlers.pop(keyword, None)
+        else:
+            self._handlers[keyword] = handler
+
+    def unregister(self, keyword):
+        self._factories.pop(keyword, None)
+        self._handlers.pop(keyword, None)
+
+    def handler(self, keyword):
+        return self._handlers.get(keyword)
+
+    def __contains__(self, keyword):
+        return keyword in self._factories
+
+    def keywords(self):
+        return list(self._factories)
+
+    def create(self, tokens):
+        factory = self._factories.get(tokens[0]) if tokens else None
+        if factory is None:
+            return self._fallback(tokens)
+        return factory(tokens[1:])
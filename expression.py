@@ -0,0 +1,360 @@
+"""Infix expression evaluation for the calculator.
+
+Expressions such as ``(2 + 3) * sqrt(16)`` or ``x ^ 2 + y`` are parsed with the
+``ast`` module, checked against a small whitelist (numbers, variables, the
+operators ``+ - * / // % ** ^`` and calls of known functions) and compiled to a
+Python function taking the expression's variables as arguments. Numbers are
+floats throughout, like the rest of the calculator, and constant
+subexpressions are folded by the compiler.
+
+Compiled expressions are kept in an LRU cache keyed by the expression text, so
+evaluating a repeated expression with new variable bindings costs one function
+call instead of a parse. Functions are the arithmetic operations (``add(a, b)``
+...) and the commands of the loaded plugins, called through the PluginManager
+so that its result cache and process pool apply.
+
+An expression can also be evaluated over whole columns of values (e.g. the
+history's ``num1``/``num2``/``result``): the same compiled code then runs once
+with NumPy arrays bound to the variables, arithmetic becomes element-wise and
+plugin functions use their vectorized variants.
+"""
+import ast
+import logging
+
+import numpy as np
+
+from cache import MISSING, ResultCache, is_error
+from command import BINARY_OPERATIONS, BatchCommand
+
+logger = logging.getLogger(__name__)
+
+# Compiled expressions kept by an ExpressionEvaluator unless configured otherwise
+DEFAULT_EXPRESSION_CACHE_SIZE = 256
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be parsed, compiled or evaluated."""
+
+
+class _Compiler(ast.NodeTransformer):
+    """Validate a parsed expression and rewrite it into compilable form.
+
+    Numbers become float constants and anything outside the whitelist raises
+    ExpressionError. Names used as variables and as
+    functions are collected on the way.
+    """
+
+    def __init__(self, functions):
+        self.functions = functions
+        self.variables = []
+        self.called = set()
+
+    def generic_visit(self, node):
+        raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Unsupported value: {node.value!r}")
+        try:
+            value = float(node.value)
+        except OverflowError:
+            raise ExpressionError(f"Number too large: {node.value}") from None
+        return ast.copy_location(ast.Constant(value), node)
+
+    def visit_Name(self, node):
+        if node.id in self.called:
+            raise ExpressionError(f"'{node.id}' is used both as a function and a variable")
+        if node.id not in self.variables:
+            self.variables.append(node.id)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BINARY_OPERATORS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPERATORS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ExpressionError("Only calls of the form name(arguments) are supported")
+        name = node.func.id
+        if name not in self.functions:
+            raise ExpressionError(f"Unknown function '{name}'")
+        if name in self.variables:
+            raise ExpressionError(f"'{name}' is used both as a function and a variable")
+        self.called.add(name)
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+
+class CompiledExpression:
+    """An expression compiled to a function of its variables.
+
+    Attributes:
+        text (str): The expression as written
+        tree (ast.Expression): The validated expression tree
+        variables (tuple): Variable names, in order of first use; the positional
+            parameters of ``function``
+        functions (frozenset): Names of the functions the expression calls
+        code: Code object building the function from a namespace of functions
+        function: Compiled function returning the value of the expression
+        vector_function: The same function over arrays, built on first use
+    """
+    __slots__ = ('text', 'tree', 'variables', 'functions', 'code', 'function', 'vector_function')
+
+    def __init__(self, text, tree, variables, functions, code, function):
+        self.text = text
+        self.tree = tree
+        self.variables = variables
+        self.functions = functions
+        self.code = code
+        self.function = function
+        self.vector_function = None
+
+    def evaluate(self, bindings=None):
+        """Evaluate the expression with variables bound by name.
+
+        Args:
+            bindings: Mapping of variable name to value
+
+        Returns:
+            The value, or an error message
+        """
+        try:
+            if bindings:
+                return self.function(**bindings)
+            return self.function()
+        except TypeError:
+            missing = [name for name in self.variables if name not in (bindings or {})]
+            unknown = [name for name in (bindings or {}) if name not in self.variables]
+            if missing:
+                return f"Error: No value for variable '{missing[0]}'"
+            if unknown:
+                return f"Error: Unknown variable '{unknown[0]}'"
+            return "Error: Invalid operands"
+        except (ExpressionError, ArithmeticError) as e:
+            return error_message(e)
+
+    def evaluate_many(self, rows):
+        """Evaluate the expression once per tuple of variable values.
+
+        Args:
+            rows: Iterable of value tuples in the order of ``variables``
+
+        Returns:
+            list: Values, with error messages in place of failed evaluations
+        """
+        function = self.function
+        results = []
+        for values in rows:
+            try:
+                results.append(function(*values))
+            except (ExpressionError, ArithmeticError, TypeError) as e:
+                results.append(error_message(e))
+        return results
+
+
+def error_message(error):
+    """Return the calculator error message for an exception raised by an expression."""
+    if isinstance(error, ExpressionError):
+        message = str(error)
+        return message if is_error(message) else f"Error: {message}"
+    if isinstance(error, ZeroDivisionError):
+        return "Error: Division by zero"
+    if isinstance(error, OverflowError):
+        return "Error: Numeric overflow"
+    return f"Error: {error}"
+
+
+def format_column_result(values, errors, preview=5):
+    """Summarize the values of an expression evaluated over columns.
+
+    Args:
+        values: Array of values, NaN where errors is set
+        errors: Boolean array flagging failed rows
+        preview (int): Number of leading values to show
+
+    Returns:
+        str: Row and error counts, min/mean/max and the first values
+    """
+    lines = [f"Evaluated over {len(values)} records, {int(errors.sum())} errors"]
+    valid = values[~errors]
+    if valid.size:
+        lines.append(f"min {valid.min():.6g}, mean {valid.mean():.6g}, max {valid.max():.6g}")
+    if len(values):
+        shown = ', '.join(f"{value:.6g}" for value in values[:preview].tolist())
+        lines.append(f"values: {shown}{', ...' if len(values) > preview else ''}")
+    return '\n'.join(lines)
+
+
+def _checked(function):
+    """Wrap a calculator function so that an error result aborts the evaluation."""
+    def call(*args):
+        result = function(*args)
+        if is_error(result):
+            raise ExpressionError(result)
+        return result
+    return call
+
+
+class ExpressionEvaluator:
+    """Compiles and evaluates infix expressions, caching compiled expressions."""
+
+    def __init__(self, plugin_manager=None, cache=None):
+        """Initialize the evaluator.
+
+        Args:
+            plugin_manager: PluginManager whose commands can be called as functions
+            cache: ResultCache for compiled expressions, defaults to an LRU of
+                DEFAULT_EXPRESSION_CACHE_SIZE entries
+        """
+        self.plugin_manager = plugin_manager
+        self.cache = cache if cache is not None else ResultCache(DEFAULT_EXPRESSION_CACHE_SIZE)
+        self._functions = None
+
+    @property
+    def functions(self):
+        """Mapping of function name to (plugin name or None, command)."""
+        if self._functions is None:
+            functions = {name: (None, name) for name in BINARY_OPERATIONS}
+            if self.plugin_manager is not None:
+                for plugin_name, (_, commands) in self.plugin_manager.plugin_info.items():
+                    for command in commands:
+                        functions.setdefault(command, (plugin_name, command))
+            self._functions = functions
+        return self._functions
+
+    def invalidate(self):
+        """Forget compiled expressions and functions, e.g. after reloading plugins."""
+        self._functions = None
+        self.cache.clear()
+
+    def _function(self, name):
+        plugin_name, command = self.functions[name]
+        if plugin_name is None:
+            return _checked(BINARY_OPERATIONS[command])
+        execute = self.plugin_manager.execute_command
+        return _checked(lambda *args: execute(plugin_name, command, *args))
+
+    def _vector_function(self, name):
+        plugin_name, command = self.functions[name]
+        if plugin_name is None:
+            return BatchCommand.OPERATIONS[command]
+        execute = self.plugin_manager.execute_command
+
+        def call(*args):
+            result = execute(plugin_name, command, *args)
+            # Vectorized plugin commands return (values, errors), NaN where errors is set
+            if isinstance(result, tuple):
+                return result[0]
+            if is_error(result):
+                raise ExpressionError(result)
+            return result
+        return call
+
+    def compile(self, text):
+        """Return the compiled form of an expression, from the cache if possible.
+
+        Args:
+            text (str): Infix expression
+
+        Returns:
+            CompiledExpression
+
+        Raises:
+            ExpressionError: If the expression is invalid
+        """
+        compiled = self.cache.get(text)
+        if compiled is not MISSING:
+            return compiled
+        try:
+            # '^' is power, with the precedence of '**' (there are no strings to break)
+            tree = ast.parse(text.strip().replace('^', '**'), mode='eval')
+        except SyntaxError:
+            raise ExpressionError(f"Invalid expression: {text}") from None
+        compiler = _Compiler(self.functions)
+        tree = compiler.visit(tree)
+        variables = tuple(compiler.variables)
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg(name) for name in variables],
+                                  kwonlyargs=[], kw_defaults=[], defaults=[])
+        code = compile(ast.fix_missing_locations(ast.Expression(ast.Lambda(arguments, tree.body))),
+                       '<expression>', 'eval')
+        compiled = CompiledExpression(text, tree, variables, frozenset(compiler.called), code,
+                                      self._build(code, compiler.called, self._function))
+        self.cache.put(text, compiled)
+        logger.debug("Compiled expression %r with variables %s", text, variables)
+        return compiled
+
+    @staticmethod
+    def _build(code, called, function_for):
+        """Create the expression's function with the named functions in scope."""
+        namespace = {'__builtins__': {}}
+        namespace.update((name, function_for(name)) for name in called)
+        # The tree only holds whitelisted nodes, so this only builds the function
+        return eval(code, namespace)  # pylint: disable=eval-used
+
+    def evaluate(self, text, bindings=None):
+        """Evaluate an expression with optional variable bindings.
+
+        Args:
+            text (str): Infix expression
+            bindings: Mapping of variable name to value
+
+        Returns:
+            The value, or an error message
+        """
+        try:
+            compiled = self.compile(text)
+        except ExpressionError as e:
+            return error_message(e)
+        return compiled.evaluate(bindings)
+
+    def evaluate_columns(self, text, columns, size=None):
+        """Evaluate an expression over columns of values in one vectorized pass.
+
+        Args:
+            text (str): Infix expression whose variables are column names
+            columns: Mapping of column name to a NumPy array
+            size (int): Number of rows, defaults to the length of the first column
+
+        Returns:
+            Tuple (values, errors) of float64 arrays; ``errors`` flags rows whose
+            value is not finite (division by zero, failed function, missing
+            operand), and those values are NaN
+
+        Raises:
+            ExpressionError: If the expression is invalid, uses a variable that is
+                not a column or calls a function that fails as a whole
+        """
+        compiled = self.compile(text)
+        unknown = [name for name in compiled.variables if name not in columns]
+        if unknown:
+            raise ExpressionError(f"Unknown column '{unknown[0]}'. Use {', '.join(columns)}")
+        if compiled.vector_function is None:
+            compiled.vector_function = self._build(compiled.code, compiled.functions,
+                                                   self._vector_function)
+        if size is None:
+            size = len(next(iter(columns.values()))) if columns else 1
+        try:
+            with np.errstate(all='ignore'):
+                values = compiled.vector_function(*(columns[name] for name in compiled.variables))
+                values = np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ExpressionError(f"Cannot evaluate '{text}' over columns: {e}") from None
+        values = np.broadcast_to(values, (size,))
+        errors = ~np.isfinite(values)
+        return np.where(errors, np.nan, values), errors
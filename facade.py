@@ -4,25 +4,61 @@ This module provides a facade pattern implementation for managing operational da
 including storage, retrieval, and manipulation of numerical operations data.
 """
 import logging
-from typing import Optional
+import sqlite3
+from datetime import datetime
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Iterator, Optional
 
-import pandas as pd
+from history_store import HistorySnapshot, HistoryStore
+from instrumentation import STAGE, metrics
+from strategy import FlushTracker, fsync_file, history_strategy_for
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Rows per chunk when streaming history files
+DEFAULT_CHUNK_ROWS = 100_000
+
+class PendingSave:
+    """Snapshot of the records a save will write, taken by DataFacade.prepare_save."""
+    __slots__ = ('filename', 'strategy', 'frame', 'generation', 'rows', 'flushed')
+
+    def __init__(self, filename, strategy, frame, generation, rows, flushed):
+        self.filename = filename
+        self.strategy = strategy
+        self.frame = frame
+        self.generation = generation
+        self.rows = rows
+        # Rows already in the file for an incremental append, None for a rewrite
+        self.flushed = flushed
+
 class DataFacade:
     """Manages data operations including storage, retrieval, and manipulation of numerical operations.
     
     Provides methods for adding records, saving/loading from CSV files, viewing data,
-    and clearing stored data. Uses pandas DataFrame for data storage.
+    and clearing stored data. Records live in a columnar HistoryStore and are
+    only materialized as a pandas DataFrame when viewed or saved.
     """
 
     def __init__(self):
-        """Initialize DataFacade with empty DataFrame with predefined columns."""
-        self.data = pd.DataFrame(columns=['timestamp', 'operation', 'num1', 'num2', 'result'])
+        """Initialize DataFacade with an empty columnar history store."""
+        self.store = HistoryStore()
+        self.flushes = FlushTracker()
+
+    @property
+    def data(self) -> 'pd.DataFrame':
+        """Current records as a DataFrame, built on demand from the store."""
+        return self.store.to_frame()
+
+    @data.setter
+    def data(self, frame: 'pd.DataFrame') -> None:
+        self.store.load_frame(frame)
 
-    def add_record(self, operation: str, num1: float, num2: float, result: float) -> None:
+    def add_record(self, operation: str, num1: float, num2: float, result: float,
+                   timestamp: Optional[datetime] = None) -> None:
         """Add a new operation record to the data store.
 
         Args:
@@ -30,65 +66,319 @@ class DataFacade:
             num1: First number in the operation
             num2: Second number in the operation
             result: Result of the operation
+            timestamp: Time of the operation, defaults to now
         """
-        new_record = pd.DataFrame({
-            'timestamp': [str(pd.Timestamp.now())],
-            'operation': [operation],
-            'num1': [num1],
-            'num2': [num2],
-            'result': [result]
-        })
-        self.data = pd.concat([self.data, new_record], ignore_index=True)
-        logger.info("Added record to data: %(op)s %(n1)s %(n2)s = %(res)s",
-                   {'op': operation, 'n1': num1, 'n2': num2, 'res': result})
+        start = perf_counter_ns() if metrics.enabled else 0
+        self.store.append(operation, num1, num2, result, timestamp)
+        if start:
+            metrics.stop(STAGE, 'add_record', start)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Added record to data: %(op)s %(n1)s %(n2)s = %(res)s",
+                       {'op': operation, 'n1': num1, 'n2': num2, 'res': result})
+
+    def add_records(self, operation: str, num1, num2, result,
+                    timestamp: Optional[datetime] = None) -> None:
+        """Add a batch of records for one operation in a single bulk append.
+
+        Args:
+            operation: The mathematical operation performed
+            num1: Array of first numbers
+            num2: Array of second numbers
+            result: Array of results
+            timestamp: Time shared by the batch, defaults to now
+        """
+        self.store.extend(operation, num1, num2, result, timestamp)
+        logger.info("Added %d %s records to data", len(result), operation)
+
+    # Errors a failed save or load raises, reported as messages by save_to_csv and load_from_csv
+    SAVE_ERRORS = (IOError, PermissionError, ImportError, ValueError, sqlite3.Error)
+    LOAD_ERRORS = (IOError, FileNotFoundError, ImportError, ValueError, sqlite3.Error)
 
-    def save_to_csv(self, filename: str) -> str:
-        """Save current data to a CSV file.
+    def save(self, filename: str, incremental: bool = False, fsync: bool = False) -> Optional[int]:
+        """Save current data to a file, raising if it cannot be written.
 
         Args:
-            filename: Path to the output CSV file
+            filename: Path to the output file
+            incremental: Append records added since the last save instead of rewriting
+            fsync: Force the written data to disk before returning
+
+        Returns:
+            Number of records appended by an incremental save, None if the file was rewritten
+
+        Raises:
+            One of SAVE_ERRORS if the file cannot be written
+        """
+        return self.write(self.prepare_save(filename, incremental), fsync)
+
+    def prepare_save(self, filename: str, incremental: bool = False) -> 'PendingSave':
+        """Take the snapshot of the records a save writes, without writing it.
+
+        Args:
+            filename: Path to the output file
+            incremental: Only take the records added since the last save, if possible
+
+        Returns:
+            PendingSave to pass to ``write``
+        """
+        strategy = history_strategy_for(filename)
+        with self.store.lock:
+            flushed = self.flushes.flushed_rows(filename, self.store) if incremental else 0
+            append = bool(flushed) and hasattr(strategy, 'append')
+            frame, generation, rows = self.store.snapshot(flushed if append else 0)
+        return PendingSave(filename, strategy, frame, generation, rows, flushed if append else None)
+
+    def write(self, pending: 'PendingSave', fsync: bool = False) -> Optional[int]:
+        """Write the records of a prepared save to its file.
+
+        Args:
+            pending: Result of ``prepare_save``
+            fsync: Force the written data to disk before returning
+
+        Returns:
+            Number of records appended by an incremental save, None if the file was rewritten
+
+        Raises:
+            One of SAVE_ERRORS if the file cannot be written
+        """
+        filename = pending.filename
+        if pending.flushed is not None:
+            new_rows = pending.rows - pending.flushed
+            if new_rows:
+                pending.strategy.append(pending.frame, filename, fsync)
+            self.flushes.mark(filename, pending.generation, pending.rows)
+            logger.info("Appended %d new records to %s", new_rows, filename)
+            return new_rows
+        pending.strategy.save(pending.frame, filename)
+        if fsync:
+            fsync_file(filename)
+        self.flushes.mark(filename, pending.generation, pending.rows)
+        logger.info("Data saved to %s successfully", filename)
+        return None
+
+    def save_to_csv(self, filename: str, incremental: bool = False, fsync: bool = False) -> str:
+        """Save current data to a file.
+
+        The format is chosen by extension (.csv, .npz, .parquet, .feather);
+        unknown extensions are written as CSV. An incremental save of a CSV file
+        that already holds a prefix of the data only appends the new records.
+
+        Args:
+            filename: Path to the output file
+            incremental: Append records added since the last save instead of rewriting
+            fsync: Force the written data to disk before returning
 
         Returns:
             Status message indicating success or failure
         """
         try:
-            self.data.to_csv(filename, index=False)
-            logger.info("Data saved to %s successfully", filename)
-            return f"Data saved to {filename} successfully"
-        except (IOError, PermissionError) as e:
-            logger.error("Error saving data to %(filename)s: %(error)s",
-                        {'filename': filename, 'error': str(e)})
-            return f"Error saving data to {filename}: {str(e)}"
+            appended = self.save(filename, incremental, fsync)
+        except self.SAVE_ERRORS as e:
+            return self.error_message('saving data to', filename, e)
+        return self.save_message(filename, appended)
+
+    def load(self, filename: str, chunksize: Optional[int] = None, append: bool = False) -> None:
+        """Load data from a file, raising if it cannot be read.
+
+        Args:
+            filename: Path to the input file
+            chunksize: Rows per chunk for streaming loads, None to read at once
+            append: Add the file's records to the current data instead of replacing it
+
+        Raises:
+            One of LOAD_ERRORS if the file cannot be read; the current data is
+            then kept unless ``append`` was given
+        """
+        if not append:
+            self.install(filename, self.read(filename, chunksize))
+        elif chunksize:
+            for chunk in history_strategy_for(filename).iter_chunks(filename, chunksize):
+                self.store.extend_frame(chunk)
+        else:
+            self.store.extend_frame(history_strategy_for(filename).load(filename))
+        logger.info("Data loaded from %s successfully", filename)
+
+    def read(self, filename: str, chunksize: Optional[int] = None) -> HistorySnapshot:
+        """Read a file into a separate store, leaving the current data untouched.
+
+        Parsing is the slow part of a load; doing it here lets the caller swap
+        the records in with ``install`` without blocking writers meanwhile.
+
+        Args:
+            filename: Path to the input file
+            chunksize: Rows per chunk for streaming reads, None to read at once
+
+        Returns:
+            Snapshot of the file's records
+
+        Raises:
+            One of LOAD_ERRORS if the file cannot be read
+        """
+        strategy = history_strategy_for(filename)
+        staging = HistoryStore()
+        if chunksize:
+            for chunk in strategy.iter_chunks(filename, chunksize):
+                staging.extend_frame(chunk)
+        else:
+            staging.load_frame(strategy.load(filename))
+        return staging.checkpoint()
+
+    def install(self, filename: str, records: HistorySnapshot) -> None:
+        """Replace the current data with records read from ``filename`` by ``read``.
+
+        Args:
+            filename: Path the records were read from, now in sync with the data
+            records: Result of ``read``
+        """
+        with self.store.lock:
+            self.store.restore(records)
+            self.flushes.mark(filename, self.store.generation, len(self.store))
+
+    def load_from_csv(self, filename: str, chunksize: Optional[int] = None,
+                      append: bool = False) -> str:
+        """Load data from a file in any format supported by save_to_csv.
 
-    def load_from_csv(self, filename: str) -> str:
-        """Load data from a CSV file.
+        With ``chunksize``, CSV files are read, validated and appended to the
+        store in chunks of that many rows, bounding the memory used by parsing.
 
         Args:
-            filename: Path to the input CSV file
+            filename: Path to the input file
+            chunksize: Rows per chunk for streaming loads, None to read at once
+            append: Add the file's records to the current data instead of replacing it
 
         Returns:
             Status message indicating success or failure
         """
         try:
-            self.data = pd.read_csv(filename)
-            logger.info("Data loaded from %s successfully", filename)
-            return f"Data loaded from {filename} successfully"
-        except (IOError, FileNotFoundError) as e:
-            logger.error("Error loading data from %(filename)s: %(error)s",
-                        {'filename': filename, 'error': str(e)})
-            return f"Error loading data from {filename}: {str(e)}"
-
-    def view_data(self) -> str:
+            self.load(filename, chunksize, append)
+        except self.LOAD_ERRORS as e:
+            return self.error_message('loading data from', filename, e)
+        return self.load_message(filename)
+
+    @staticmethod
+    def save_message(filename: str, appended: Optional[int] = None) -> str:
+        """Return the status message of a save that returned ``appended``."""
+        if appended is None:
+            return f"Data saved to {filename} successfully"
+        return f"Data saved to {filename} successfully ({appended} new records appended)"
+
+    @staticmethod
+    def load_message(filename: str) -> str:
+        """Return the status message of a successful load."""
+        return f"Data loaded from {filename} successfully"
+
+    @staticmethod
+    def error_message(action: str, filename: str, error: Exception) -> str:
+        """Log a failed file operation and return its status message.
+
+        Args:
+            action: What failed, e.g. 'saving data to'
+            filename: Path of the file
+            error: The raised exception
+
+        Returns:
+            Error message for the user
+        """
+        logger.error("Error %(action)s %(filename)s: %(error)s",
+                     {'action': action, 'filename': filename, 'error': str(error)})
+        return f"Error {action} {filename}: {str(error)}"
+
+    def iter_history(self, filename: str, chunksize: int = DEFAULT_CHUNK_ROWS) -> Iterator['pd.DataFrame']:
+        """Iterate over a history file in chunks without loading it into the store.
+
+        Args:
+            filename: Path to the history file
+            chunksize: Maximum rows per chunk
+
+        Returns:
+            Iterator of typed DataFrame chunks
+        """
+        return history_strategy_for(filename).iter_chunks(filename, chunksize)
+
+    def query_history(self, filename: str, operation: Optional[str] = None, start=None, end=None,
+                      page: int = 1, page_size: int = 20) -> str:
+        """Return one page of matching records from a history database.
+
+        The query runs against the file's indexes, so only the requested page
+        is read rather than the whole history.
+
+        Args:
+            filename: Path to an SQLite history database
+            operation: Only records of this operation, or None for all
+            start: Only records at or after this time (datetime or ISO string)
+            end: Only records before this time (datetime or ISO string)
+            page: 1-based page number
+            page_size: Records per page
+
+        Returns:
+            The page of records, "No matching records" or an error message
+        """
+        try:
+            strategy = history_strategy_for(filename)
+            if not hasattr(strategy, 'query'):
+                raise ValueError("only SQLite history databases (.db, .sqlite) can be queried")
+            offset = (page - 1) * page_size
+            rows = strategy.query(filename, operation, start, end, limit=page_size + 1, offset=offset)
+        except (IOError, ImportError, ValueError, sqlite3.Error) as e:
+            logger.error("Error querying history in %s: %s", filename, str(e))
+            return f"Error querying history in {filename}: {str(e)}"
+        if len(rows) == 0:
+            return "No matching records"
+        more = len(rows) > page_size
+        rows = rows.iloc[:page_size]
+        rows.index = range(offset, offset + len(rows))
+        logger.info("Queried %d records from %s", len(rows), filename)
+        return f"{rows}\nPage {page}: {len(rows)} records" + (", more available" if more else "")
+
+    def view_data(self, start: Optional[int] = None, stop: Optional[int] = None) -> str:
         """Return string representation of current data.
 
+        Without a range the whole history is shown, as pandas displays it. With
+        one, only the requested records are materialized, so the cost is
+        proportional to the rows shown rather than the rows stored.
+
+        Args:
+            start: Index of the first record to show (negative counts from the end)
+            stop: Index after the last record to show, None for the end
+
         Returns:
             String representation of the data or status message if empty
         """
-        if len(self.data) == 0:
+        size = len(self.store)
+        if size == 0:
             logger.info("No data available")
             return "No data available"
         logger.info("Viewing data")
-        return str(self.data)
+        if start is None and stop is None:
+            return str(self.store.snapshot()[0])
+        frame = self.store.slice_frame(start, size if stop is None else stop)
+        if len(frame) == 0:
+            return f"No records in range ({size} records stored)"
+        return f"{frame}\nShowing records {frame.index[0]}-{frame.index[-1]} of {size}"
+
+    def export_view(self, filename: str, chunksize: int = DEFAULT_CHUNK_ROWS) -> str:
+        """Write a fixed-width text view of the whole history to a file.
+
+        Records are formatted and written ``chunksize`` at a time, so memory
+        use stays bounded by the chunk size.
+
+        Args:
+            filename: Path to the target text file
+            chunksize: Records formatted per chunk
+
+        Returns:
+            Status message indicating success or failure
+        """
+        try:
+            size = len(self.store)
+            with open(filename, 'w', encoding='utf-8') as file:
+                for start in range(0, max(size, 1), chunksize):
+                    lines = self.store.format_rows(start, start + chunksize, header=start == 0)
+                    file.write('\n'.join(lines) + '\n')
+            logger.info("History view exported to %s", filename)
+            return f"History view exported to {filename} successfully ({size} records)"
+        except (IOError, PermissionError) as e:
+            logger.error("Error exporting history view to %s: %s", filename, str(e))
+            return f"Error exporting history view to {filename}: {str(e)}"
 
     def clear_data(self) -> str:
         """Clear all data from memory.
@@ -96,7 +386,7 @@ class DataFacade:
         Returns:
             Confirmation message
         """
-        self.data = pd.DataFrame(columns=['timestamp', 'operation', 'num1', 'num2', 'result'])
+        self.store.clear()
         logger.info("Data cleared from memory")
         return "Data cleared from memory"
     
\ No newline at end of file
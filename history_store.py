@@ -0,0 +1,493 @@
+"""Columnar history store module.
+
+Keeps calculation records in typed, geometrically growing column buffers so that
+appending a record costs amortized O(1). A pandas DataFrame is only built when a
+caller asks for one (viewing, saving), and is cached until the next mutation.
+pandas itself is only imported at that point, keeping it off the startup path.
+
+For undo, the last records can be dropped in O(1) (``truncate``) and the whole
+store captured in a copy-on-write snapshot (``checkpoint``/``restore``).
+"""
+import threading
+import weakref
+from datetime import datetime
+
+import numpy as np
+
+COLUMNS = ['timestamp', 'operation', 'num1', 'num2', 'result']
+NUMERIC_COLUMNS = ('num1', 'num2', 'result')
+
+# Values stored natively in the float64 buffers; anything else promotes the
+# column to an object buffer so that no information is lost.
+_FLOAT_TYPES = (float, int, np.float64, np.float32, np.int64, np.int32)
+
+
+class HistorySnapshot:
+    """Records of a HistoryStore at one point in time.
+
+    Used to ``restore`` the store and to read its columns without copying them.
+
+    The snapshot references the store's buffers instead of copying them; the
+    store copies its buffers before it would overwrite a row a live snapshot
+    covers (copy-on-write). Clearing or loading switches the store to new
+    buffers anyway, so snapshots taken before them are never copied.
+
+    Rows truncated before the snapshot but not yet overwritten (``retained``)
+    are covered as well, so that a restored store can still untruncate them.
+    """
+    __slots__ = ('generation', 'size', 'retained', 'capacity', 'timestamps', 'op_codes', 'numbers',
+                 'operations', '__weakref__')
+
+    def __init__(self, generation, size, retained, capacity, timestamps, op_codes, numbers, operations):
+        self.generation = generation
+        self.size = size
+        self.retained = retained
+        self.capacity = capacity
+        self.timestamps = timestamps
+        self.op_codes = op_codes
+        self.numbers = numbers
+        self.operations = operations
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def operation_codes(self) -> np.ndarray:
+        """Dictionary codes of the records' operations; see ``operations``."""
+        return self.op_codes[:self.size]
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a numeric column as float64 values.
+
+        Float columns are returned as views of the buffers, valid while the
+        snapshot is alive; promoted columns are converted, with NaN for values
+        that are not numbers.
+
+        Args:
+            name: One of NUMERIC_COLUMNS
+        """
+        values = self.numbers[name][:self.size]
+        if values.dtype == object:
+            import pandas as pd  # pylint: disable=import-outside-toplevel
+            values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+        return values
+
+
+class HistoryStore:
+    """Growable columnar storage for calculation records.
+
+    Each column lives in its own NumPy buffer: ``datetime64[us]`` timestamps,
+    dictionary-encoded operation codes and ``float64`` operands/results. When the
+    buffers are full their capacity is multiplied by ``GROWTH_FACTOR``.
+
+    ``generation`` changes whenever existing records are replaced or removed
+    (clear, load, truncate, restore) but not on appends, so persistence can tell
+    whether rows it already flushed to a file are still a prefix of the store.
+
+    Every public method holds ``lock`` (re-entrant) while it touches the
+    buffers, so appends from many threads are not lost and frames are
+    consistent snapshots; callers can hold it to group several calls.
+    """
+
+    INITIAL_CAPACITY = 64
+    GROWTH_FACTOR = 2
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        """Initialize an empty store.
+
+        Args:
+            capacity: Number of records to preallocate
+        """
+        self._initial_capacity = max(1, int(capacity))
+        self.lock = threading.RLock()
+        self.generation = 0
+        self._reset(self._initial_capacity)
+
+    def _reset(self, capacity: int) -> None:
+        """Drop all records and allocate fresh buffers."""
+        self.generation += 1
+        self._size = 0
+        self._release()
+        self._capacity = capacity
+        self._timestamps = np.empty(capacity, dtype='datetime64[us]')
+        self._op_codes = np.empty(capacity, dtype=np.int32)
+        self._operations = []
+        self._operation_codes = {}
+        self._numbers = {name: np.empty(capacity, dtype=np.float64) for name in NUMERIC_COLUMNS}
+        self._frame = None
+
+    def _release(self) -> None:
+        """Forget snapshots of the buffers, after switching to new ones."""
+        # Rows still valid past the end after a truncate, for untruncate
+        self._retained = self._size
+        # Live snapshots sharing the buffers and the rows they cover
+        self._sharers = []
+        self._shared_rows = 0
+
+    def _before_write(self, index: int) -> None:
+        """Prepare to overwrite rows from ``index`` on.
+
+        Truncated rows from there on can no longer be brought back, and buffers
+        shared with a live snapshot covering those rows are copied first.
+        """
+        self._retained = min(self._retained, index)
+        if index >= self._shared_rows:
+            return
+        if any(ref() is not None for ref in self._sharers):
+            self._timestamps = self._grow(self._timestamps, self._capacity)
+            self._op_codes = self._grow(self._op_codes, self._capacity)
+            self._numbers = {name: self._grow(buffer, self._capacity)
+                             for name, buffer in self._numbers.items()}
+        self._sharers = []
+        self._shared_rows = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """Number of records the buffers can hold before growing."""
+        return self._capacity
+
+    def _reserve(self, required: int) -> None:
+        """Grow every buffer geometrically until ``required`` records fit."""
+        if required <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= self.GROWTH_FACTOR
+        self._timestamps = self._grow(self._timestamps, capacity)
+        self._op_codes = self._grow(self._op_codes, capacity)
+        for name, buffer in self._numbers.items():
+            self._numbers[name] = self._grow(buffer, capacity)
+        self._capacity = capacity
+        # Only the live rows were copied to the new, unshared buffers
+        self._retained = min(self._retained, self._size)
+        self._sharers = []
+        self._shared_rows = 0
+
+    def _grow(self, buffer: np.ndarray, capacity: int) -> np.ndarray:
+        """Return a copy of ``buffer`` resized to ``capacity`` entries."""
+        grown = np.empty(capacity, dtype=buffer.dtype)
+        grown[:self._size] = buffer[:self._size]
+        return grown
+
+    def _encode_operation(self, operation) -> int:
+        """Return the dictionary code for ``operation``, registering it if new."""
+        code = self._operation_codes.get(operation)
+        if code is None:
+            code = len(self._operations)
+            self._operations.append(operation)
+            self._operation_codes[operation] = code
+        return code
+
+    def _promote(self, name: str) -> np.ndarray:
+        """Switch a numeric column to an object buffer to hold arbitrary values."""
+        buffer = self._numbers[name]
+        promoted = np.empty(self._capacity, dtype=object)
+        promoted[:self._size] = buffer[:self._size]
+        self._numbers[name] = promoted
+        self._retained = min(self._retained, self._size)
+        return promoted
+
+    def _store_number(self, name: str, index: int, value) -> None:
+        buffer = self._numbers[name]
+        if buffer.dtype != object and type(value) not in _FLOAT_TYPES:
+            buffer = self._promote(name)
+        buffer[index] = value
+
+    def append(self, operation, num1, num2, result, timestamp=None) -> None:
+        """Append a single record.
+
+        Args:
+            operation: The mathematical operation performed
+            num1: First number in the operation
+            num2: Second number in the operation
+            result: Result of the operation
+            timestamp: Time of the operation, defaults to now
+        """
+        with self.lock:
+            index = self._size
+            if index == self._capacity:
+                self._reserve(index + 1)
+            if index < self._retained or index < self._shared_rows:
+                self._before_write(index)
+            self._timestamps[index] = timestamp if timestamp is not None else datetime.now()
+            self._op_codes[index] = self._encode_operation(operation)
+            self._store_number('num1', index, num1)
+            self._store_number('num2', index, num2)
+            self._store_number('result', index, result)
+            self._size = index + 1
+            self._frame = None
+
+    def extend(self, operation, num1, num2, result, timestamp=None) -> None:
+        """Append a batch of records for one operation in a single copy per column.
+
+        Args:
+            operation: The mathematical operation performed for every record
+            num1: Array of first operands
+            num2: Array of second operands
+            result: Array of results
+            timestamp: Time shared by the whole batch, defaults to now
+        """
+        columns = {'num1': np.asarray(num1, dtype=np.float64),
+                   'num2': np.asarray(num2, dtype=np.float64),
+                   'result': np.asarray(result, dtype=np.float64)}
+        count = len(columns['result'])
+        if count == 0:
+            return
+        with self.lock:
+            start = self._size
+            end = start + count
+            self._reserve(end)
+            self._before_write(start)
+            self._timestamps[start:end] = timestamp if timestamp is not None else datetime.now()
+            self._op_codes[start:end] = self._encode_operation(operation)
+            for name, values in columns.items():
+                self._numbers[name][start:end] = values
+            self._size = end
+            self._frame = None
+
+    def _cached_frame(self) -> 'pd.DataFrame':
+        """Return the DataFrame of all records, built once until the store changes."""
+        with self.lock:
+            if self._frame is None:
+                self._frame = self.slice_frame(0, self._size)
+            return self._frame
+
+    def to_frame(self) -> 'pd.DataFrame':
+        """Materialize the stored records as a DataFrame.
+
+        Returns:
+            DataFrame with the history columns. It is a copy of a frame cached
+            until the store changes, so callers may modify it.
+        """
+        return self._cached_frame().copy()
+
+    def slice_frame(self, start: int, stop: int) -> 'pd.DataFrame':
+        """Materialize only the records in ``[start, stop)`` as a DataFrame.
+
+        Args:
+            start: Index of the first record
+            stop: Index after the last record
+
+        Returns:
+            DataFrame with the history columns, indexed from ``start``
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        with self.lock:
+            start, stop, _ = slice(start, stop).indices(self._size)
+            stop = max(start, stop)
+            operations = np.empty(len(self._operations), dtype=object)
+            operations[:] = self._operations
+            columns = {
+                'timestamp': self._timestamps[start:stop].copy(),
+                'operation': operations[self._op_codes[start:stop]],
+            }
+            for name in NUMERIC_COLUMNS:
+                columns[name] = self._numbers[name][start:stop].copy()
+        return pd.DataFrame(columns, columns=COLUMNS, index=pd.RangeIndex(start, stop))
+
+    def snapshot(self, start: int = 0) -> tuple:
+        """Return a consistent copy of the records from ``start`` on.
+
+        Args:
+            start: Index of the first record to include
+
+        Returns:
+            Tuple of (DataFrame, generation, number of records) taken atomically.
+            A full snapshot shares the store's cached frame and must not be modified.
+        """
+        with self.lock:
+            frame = self._cached_frame() if start == 0 else self.slice_frame(start, self._size)
+            return frame, self.generation, self._size
+
+    def format_rows(self, start: int, stop: int, header: bool = True) -> list:
+        """Format the records in ``[start, stop)`` as fixed-width text lines.
+
+        Column widths depend only on the store (not on the slice), so the lines
+        of consecutive slices line up and can be streamed to a file in chunks.
+
+        Args:
+            start: Index of the first record
+            stop: Index after the last record
+            header: Whether to start with a line of column names
+
+        Returns:
+            List of lines without trailing newlines
+        """
+        with self.lock:
+            start, stop, _ = slice(start, stop).indices(self._size)
+            index_width = len(str(max(self._size - 1, 0)))
+            op_width = max([len('operation')] + [len(str(op)) for op in self._operations])
+            row_format = f"{{:>{index_width}}}  {{:<26}}  {{:<{op_width}}}  {{:>24}}  {{:>24}}  {{:>24}}"
+            lines = [row_format.format('', *COLUMNS)] if header else []
+            if stop <= start:
+                return lines
+            timestamps = np.datetime_as_string(self._timestamps[start:stop], unit='us')
+            operations = [self._operations[code] for code in self._op_codes[start:stop].tolist()]
+            numbers = [self._numbers[name][start:stop].tolist() for name in NUMERIC_COLUMNS]
+        for index, timestamp, operation, num1, num2, result in zip(
+                range(start, stop), timestamps.tolist(), operations, *numbers):
+            lines.append(row_format.format(index, timestamp.replace('T', ' '), str(operation),
+                                           str(num1), str(num2), str(result)))
+        return lines
+
+    def load_frame(self, frame: 'pd.DataFrame') -> None:
+        """Replace the stored records with the contents of ``frame``.
+
+        Args:
+            frame: DataFrame with (a subset of) the history columns
+        """
+        with self.lock:
+            self._reset(max(self._initial_capacity, len(frame)))
+            self.extend_frame(frame)
+
+    def extend_frame(self, frame: 'pd.DataFrame') -> None:
+        """Append the rows of ``frame`` with one bulk copy per column.
+
+        Missing columns are filled with NaT/None/NaN, timestamps are parsed if
+        needed and non-numeric operand columns promote the buffer to objects.
+
+        Args:
+            frame: DataFrame with (a subset of) the history columns
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        with self.lock:
+            count = len(frame)
+            if count == 0:
+                return
+            start = self._size
+            end = start + count
+            self._reserve(end)
+            self._before_write(start)
+            if 'timestamp' in frame:
+                timestamps = frame['timestamp']
+                if not pd.api.types.is_datetime64_any_dtype(timestamps):
+                    timestamps = pd.to_datetime(timestamps, errors='coerce', format='mixed')
+                self._timestamps[start:end] = timestamps.to_numpy(dtype='datetime64[us]')
+            else:
+                self._timestamps[start:end] = np.datetime64('NaT')
+            if 'operation' in frame:
+                codes, uniques = pd.factorize(frame['operation'], use_na_sentinel=False)
+                mapping = np.fromiter((self._encode_operation(op) for op in uniques),
+                                      dtype=np.int32, count=len(uniques))
+                self._op_codes[start:end] = mapping[codes]
+            else:
+                self._op_codes[start:end] = self._encode_operation(None)
+            for name in NUMERIC_COLUMNS:
+                if name not in frame:
+                    self._numbers[name][start:end] = np.nan
+                    continue
+                column = frame[name]
+                buffer = self._numbers[name]
+                if buffer.dtype != object and not pd.api.types.is_numeric_dtype(column):
+                    buffer = self._promote(name)
+                buffer[start:end] = column.to_numpy()
+            self._size = end
+            self._frame = None
+
+    def extend_snapshot(self, snapshot: HistorySnapshot) -> None:
+        """Append the records of a snapshot, e.g. of a staging store, with one copy per column.
+
+        Args:
+            snapshot: Snapshot returned by ``checkpoint`` of any store
+        """
+        with self.lock:
+            count = len(snapshot)
+            if count == 0:
+                return
+            start = self._size
+            end = start + count
+            self._reserve(end)
+            self._before_write(start)
+            self._timestamps[start:end] = snapshot.timestamps[:count]
+            mapping = np.fromiter((self._encode_operation(op) for op in snapshot.operations),
+                                  dtype=np.int32, count=len(snapshot.operations))
+            self._op_codes[start:end] = mapping[snapshot.operation_codes]
+            for name in NUMERIC_COLUMNS:
+                values = snapshot.numbers[name][:count]
+                buffer = self._numbers[name]
+                if buffer.dtype != object and values.dtype == object:
+                    buffer = self._promote(name)
+                buffer[start:end] = values
+            self._size = end
+            self._frame = None
+
+    def clear(self) -> None:
+        """Remove all records and release the grown buffers."""
+        with self.lock:
+            self._reset(self._initial_capacity)
+
+    def truncate(self, size: int) -> None:
+        """Drop the records from index ``size`` on, in O(1).
+
+        The buffers keep the dropped rows until they are overwritten, so
+        ``untruncate`` can bring them back.
+
+        Args:
+            size: Number of leading records to keep
+        """
+        with self.lock:
+            if not 0 <= size < self._size:
+                return
+            self._retained = max(self._retained, self._size)
+            self._size = size
+            self._frame = None
+            self.generation += 1
+
+    def untruncate(self, size: int) -> None:
+        """Bring back records dropped by ``truncate``, up to ``size`` records.
+
+        Args:
+            size: Number of records the store should hold again
+
+        Raises:
+            ValueError: If rows were written since the truncate, so the dropped
+                records are gone
+        """
+        with self.lock:
+            if size <= self._size:
+                return
+            if size > self._retained:
+                raise ValueError("Truncated records were overwritten and cannot be restored")
+            self._size = size
+            self._frame = None
+
+    def checkpoint(self) -> HistorySnapshot:
+        """Capture the current records without copying them.
+
+        Returns:
+            HistorySnapshot to pass to ``restore``
+        """
+        with self.lock:
+            retained = max(self._retained, self._size)
+            snapshot = HistorySnapshot(self.generation, self._size, retained, self._capacity, self._timestamps,
+                                       self._op_codes, dict(self._numbers), list(self._operations))
+            self._sharers.append(weakref.ref(snapshot))
+            self._shared_rows = max(self._shared_rows, retained)
+            return snapshot
+
+    def restore(self, snapshot: HistorySnapshot) -> None:
+        """Replace the stored records with those of a snapshot.
+
+        The store takes the snapshot's buffers over and copies them only once
+        it writes to a row the snapshot covers.
+
+        Args:
+            snapshot: Snapshot returned by ``checkpoint``
+        """
+        with self.lock:
+            self.generation += 1
+            self._size = snapshot.size
+            self._capacity = snapshot.capacity
+            self._timestamps = snapshot.timestamps
+            self._op_codes = snapshot.op_codes
+            self._numbers = dict(snapshot.numbers)
+            self._operations = list(snapshot.operations)
+            self._operation_codes = {operation: code for code, operation in enumerate(self._operations)}
+            self._frame = None
+            self._release()
+            self._retained = snapshot.retained
+            self._sharers.append(weakref.ref(snapshot))
+            self._shared_rows = snapshot.retained
@@ -0,0 +1,197 @@
+"""Latency instrumentation and profiling hooks.
+
+``metrics`` collects latency histograms of the calculator's stages (parsing a
+line, executing the command, appending to the history), per command keyword
+and per plugin command. It is disabled by default; instrumented code checks
+``metrics.enabled`` before reading the clock, so a disabled registry costs one
+attribute lookup per stage.
+
+Histograms have log-linear buckets: 16 per power of two of nanoseconds, so a
+percentile is exact to within about 6% whatever the latency, and recording is
+O(1) with memory bounded by the bucket count.
+
+``profiled(path)`` runs a block under cProfile and writes the stats to a file
+for ``python -m pstats`` or a viewer such as snakeviz.
+"""
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+logger = logging.getLogger(__name__)
+
+# Histogram resolution: 2 ** SUB_BUCKET_BITS buckets per power of two
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_LINEAR_LIMIT = 2 * _SUB_BUCKETS
+
+# Kinds of measurements
+STAGE = 'stage'      # parse / execute / add_record, whatever the command
+COMMAND = 'command'  # whole line, per command keyword
+PLUGIN = 'plugin'    # plugin command invocation, per plugin.command
+
+PERCENTILES = (50, 95, 99)
+
+
+def _bucket(value):
+    """Return the index of the bucket holding ``value`` nanoseconds."""
+    if value < _LINEAR_LIMIT:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def _bucket_bounds(index):
+    """Return the [low, high) nanoseconds covered by bucket ``index``."""
+    if index < _LINEAR_LIMIT:
+        return index, index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = index - (shift << SUB_BUCKET_BITS)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in nanoseconds."""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, nanoseconds):
+        index = _bucket(nanoseconds)
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+        if self.min is None or nanoseconds < self.min:
+            self.min = nanoseconds
+
+    def percentile(self, percent):
+        """Return the latency below which ``percent`` % of the samples fall, in ns.
+
+        The value is the middle of the bucket holding that sample, clamped to the
+        observed minimum and maximum.
+        """
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = _bucket_bounds(index)
+                return min(max((low + high) / 2, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """Return count, mean, min, max and the PERCENTILES, in nanoseconds."""
+        summary = {'count': self.count, 'mean': self.total / self.count if self.count else None,
+                   'min': self.min, 'max': self.max if self.count else None}
+        for percent in PERCENTILES:
+            summary[f'p{percent}'] = self.percentile(percent)
+        return summary
+
+
+class Metrics:
+    """Registry of latency histograms keyed by (kind, name)."""
+
+    def __init__(self, enabled=False):
+        """Initialize an empty registry.
+
+        Args:
+            enabled (bool): Whether instrumented code records latencies
+        """
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Drop every recorded latency."""
+        with self._lock:
+            self._histograms.clear()
+
+    def record(self, kind, name, nanoseconds):
+        """Add one latency sample.
+
+        Args:
+            kind (str): STAGE, COMMAND or PLUGIN
+            name (str): Stage, command keyword or plugin.command
+            nanoseconds (int): Measured latency
+        """
+        with self._lock:
+            try:
+                self._histograms[kind, name].record(nanoseconds)
+            except KeyError:
+                histogram = self._histograms[kind, name] = LatencyHistogram()
+                histogram.record(nanoseconds)
+
+    def stop(self, kind, name, start):
+        """Record the time elapsed since ``start`` (a perf_counter_ns() value)."""
+        self.record(kind, name, perf_counter_ns() - start)
+
+    def snapshot(self):
+        """Return {(kind, name): summary} for every histogram with samples."""
+        with self._lock:
+            return {key: histogram.summary() for key, histogram in self._histograms.items()}
+
+
+def _micros(nanoseconds):
+    return '-' if nanoseconds is None else f"{nanoseconds / 1000:.1f}"
+
+
+def format_metrics(snapshot):
+    """Render a metrics snapshot as a latency table in microseconds.
+
+    Args:
+        snapshot (dict): Result of Metrics.snapshot
+
+    Returns:
+        str: One row per stage, command and plugin command
+    """
+    if not snapshot:
+        return "No latencies recorded yet"
+    lines = [f"{'latency (us)':<32} {'count':>9} {'mean':>9} "
+             + ' '.join(f"{f'p{percent}':>9}" for percent in PERCENTILES) + f" {'max':>9}"]
+    order = {STAGE: 0, COMMAND: 1, PLUGIN: 2}
+    for (kind, name), summary in sorted(snapshot.items(), key=lambda item: (order.get(item[0][0], 3), item[0])):
+        lines.append(f"{f'{kind} {name}':<32} {summary['count']:>9} {_micros(summary['mean']):>9} "
+                     + ' '.join(f"{_micros(summary[f'p{percent}']):>9}" for percent in PERCENTILES)
+                     + f" {_micros(summary['max']):>9}")
+    return '\n'.join(lines)
+
+
+@contextmanager
+def profiled(path):
+    """Run the block under cProfile and write the stats to ``path``.
+
+    Args:
+        path (str): Output file, or None/empty to run the block unprofiled
+    """
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info("Profile written to %s", path)
+
+
+# Process-wide registry used by the instrumented code
+metrics = Metrics()
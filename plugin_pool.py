@@ -0,0 +1,232 @@
+"""Process pool running CPU-bound plugin commands on worker processes.
+
+Plugin commands that a plugin declares CPU-bound (``get_cpu_bound_commands()``)
+can run in a ProcessPoolExecutor instead of on the calling thread, so a long
+computation neither blocks the REPL or server nor is limited to one core by the
+GIL. Worker processes import the plugins when they start and are started
+eagerly, so the first call does not pay for process creation or imports.
+
+Many calls can be submitted as one task (``call_many``), paying one IPC round
+trip per chunk instead of per call. Calls that exceed their timeout are
+cancelled; if one is already running, the workers are terminated and replaced,
+since a running process task cannot be interrupted otherwise.
+"""
+import os
+import logging
+import importlib
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Plugin commands resolved in this worker process: (plugin, command, array) -> callable
+_worker_commands = {}
+
+
+def _worker_init(plugin_names):
+    """Worker initializer: import the plugins up front."""
+    for name in plugin_names:
+        try:
+            _load_plugin(name)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Worker %d could not import plugin %s: %s", os.getpid(), name, e)
+
+
+def _load_plugin(name):
+    plugin = importlib.import_module(f'plugins.{name}').plugin_instance
+    for command, func in plugin.get_commands().items():
+        _worker_commands[(name, command, False)] = func
+    get_array_commands = getattr(plugin, 'get_array_commands', None)
+    for command, func in (get_array_commands() if get_array_commands else {}).items():
+        _worker_commands[(name, command, True)] = func
+
+
+def _resolve(plugin_name, command, array):
+    func = _worker_commands.get((plugin_name, command, array))
+    if func is None:
+        if not any(key[0] == plugin_name for key in _worker_commands):
+            _load_plugin(plugin_name)
+        func = (_worker_commands.get((plugin_name, command, array))
+                or _worker_commands.get((plugin_name, command, False)))
+    if func is None:
+        raise LookupError(f"Command '{command}' not found in plugin '{plugin_name}'")
+    return func
+
+
+def _run(plugin_name, command, args, array):
+    """Execute one plugin command in a worker."""
+    return _resolve(plugin_name, command, array)(*args)
+
+
+def _run_many(plugin_name, command, arg_tuples):
+    """Execute a plugin command over many argument tuples in a worker.
+
+    An exception in one call becomes that call's error message instead of
+    failing the whole chunk.
+    """
+    func = _resolve(plugin_name, command, False)
+    results = []
+    for args in arg_tuples:
+        try:
+            results.append(func(*args))
+        except Exception as e:  # pylint: disable=broad-except
+            results.append(f"Error executing command: {str(e)}")
+    return results
+
+
+def _ping():
+    return os.getpid()
+
+
+class PluginProcessPool:
+    """Warm pool of worker processes executing plugin commands."""
+
+    def __init__(self, plugin_names=(), workers=None, timeout=None, mp_context=None):
+        """Start the worker processes.
+
+        Args:
+            plugin_names: Plugins each worker imports on startup
+            workers (int): Number of worker processes, defaults to the CPU count
+            timeout (float): Default seconds a call may take, None to wait forever
+            mp_context: multiprocessing context, defaults to the platform's
+        """
+        self.plugin_names = tuple(plugin_names)
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.mp_context = mp_context
+        self.stats = {'calls': 0, 'batches': 0, 'timeouts': 0, 'restarts': 0}
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._start()
+
+    def _start(self):
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=self.mp_context,
+                                             initializer=_worker_init,
+                                             initargs=(self.plugin_names,))
+        # Each submission finding no idle worker spawns one, so this starts them all
+        pids = {future.result() for future in
+                [self._executor.submit(_ping) for _ in range(self.workers)]}
+        logger.info("Started %d plugin worker processes", len(pids))
+
+    def restart(self, generation=None):
+        """Terminate the workers, failing calls in progress, and start new ones.
+
+        Args:
+            generation (int): Only restart if the pool is still this generation,
+                so callers that saw the same failure restart it once
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            executor = self._executor
+            processes = self._worker_processes(executor)
+            executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            self.stats['restarts'] += 1
+            self.generation += 1
+            self._start()
+
+    @staticmethod
+    def _worker_processes(executor):
+        """Return the worker processes of ``executor``, to end calls still running.
+
+        ProcessPoolExecutor has no public way to stop a running task, so this
+        reads its private process table. Where that is unavailable, no process
+        is returned and shut-down workers exit once their current call returns.
+        """
+        processes = getattr(executor, '_processes', None)
+        if not isinstance(processes, dict):
+            logger.warning("Cannot terminate plugin workers; running calls finish in the background")
+            return []
+        return list(processes.values())
+
+    def submit(self, plugin_name, command, args=(), array=False):
+        """Schedule one plugin call and return its concurrent.futures.Future."""
+        self.stats['calls'] += 1
+        future = self._executor.submit(_run, plugin_name, command, tuple(args), array)
+        future.generation = self.generation
+        return future
+
+    def submit_many(self, plugin_name, command, arg_tuples):
+        """Schedule a command over a chunk of argument tuples as a single task.
+
+        Returns:
+            Future resolving to the list of results, in order
+        """
+        arg_tuples = [tuple(args) for args in arg_tuples]
+        self.stats['batches'] += 1
+        self.stats['calls'] += len(arg_tuples)
+        future = self._executor.submit(_run_many, plugin_name, command, arg_tuples)
+        future.generation = self.generation
+        return future
+
+    def wait(self, future, timeout=None, description="Plugin call"):
+        """Return a future's result, cancelling it once ``timeout`` has passed.
+
+        Returns:
+            The result, or an error message if the call timed out, was cancelled
+            or its worker died
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.stats['timeouts'] += 1
+            if not future.cancel():
+                self.restart(getattr(future, 'generation', None))
+            logger.error("%s timed out after %ss", description, timeout)
+            return f"Error: {description} timed out after {timeout}s"
+        except CancelledError:
+            return f"Error: {description} was cancelled"
+        except BrokenProcessPool as e:
+            logger.error("%s failed, plugin worker died: %s", description, e)
+            self.restart(getattr(future, 'generation', None))
+            return f"Error: {description} failed, plugin worker died"
+
+    def call(self, plugin_name, command, args=(), array=False, timeout=None):
+        """Run one plugin call in a worker and wait for its result.
+
+        Exceptions raised by the command are re-raised here.
+        """
+        return self.wait(self.submit(plugin_name, command, args, array), timeout,
+                         f"Command '{command}' in plugin '{plugin_name}'")
+
+    def call_many(self, plugin_name, command, arg_tuples, chunksize=None, timeout=None):
+        """Run a command over many argument tuples, one task per chunk.
+
+        Args:
+            plugin_name (str): Plugin to call
+            command (str): Command to call
+            arg_tuples: Iterable of argument tuples
+            chunksize (int): Calls per task, defaults to spreading them evenly over the workers
+            timeout (float): Seconds allowed per chunk
+
+        Returns:
+            list: Results in argument order; error messages in place of failed calls
+        """
+        arg_tuples = list(arg_tuples)
+        if not chunksize:
+            chunksize = max(1, -(-len(arg_tuples) // self.workers))
+        futures = [self.submit_many(plugin_name, command, arg_tuples[start:start + chunksize])
+                   for start in range(0, len(arg_tuples), chunksize)]
+        results = []
+        failed = None
+        description = f"Command '{command}' in plugin '{plugin_name}'"
+        for future, start in zip(futures, range(0, len(arg_tuples), chunksize)):
+            if failed is None:
+                chunk = self.wait(future, timeout, description)
+                if isinstance(chunk, str):
+                    failed = chunk
+            else:
+                future.cancel()
+            if failed is not None:
+                chunk = [failed] * len(arg_tuples[start:start + chunksize])
+            results.extend(chunk)
+        return results
+
+    def shutdown(self, wait=True):
+        """Stop the workers, cancelling calls that have not started."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
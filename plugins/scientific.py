@@ -1,13 +1,25 @@
 import math
 import logging
+import itertools
+
+import numpy as np
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Argument tuples evaluated per NumPy call by the batch commands
+BATCH_CHUNK_SIZE = 4096
+
+# Read by PluginManager without importing this module (lazy plugin discovery)
+PLUGIN_MANIFEST = {
+    'description': "Scientific calculator functions (power, square root, sin, cos, prime count)",
+    'commands': ['power', 'sqrt', 'sin', 'cos', 'prime_count'],
+}
+
 class ScientificCalculator:
     def get_description(self):
         logger.info("Getting description for ScientificCalculator")
-        return "Scientific calculator functions (power, square root, sin, cos)"
+        return PLUGIN_MANIFEST['description']
     
     def get_commands(self):
         logger.info("Getting commands for ScientificCalculator")
@@ -15,22 +27,23 @@ class ScientificCalculator:
             'power': self.power,
             'sqrt': self.sqrt,
             'sin': self.sin,
-            'cos': self.cos
+            'cos': self.cos,
+            'prime_count': self.prime_count
         }
     
     def power(self, base, exponent):
-        logger.info(f"Executing power command with base: {base}, exponent: {exponent}")
+        logger.info("Executing power command with base: %s, exponent: %s", base, exponent)
         try:
             return float(base) ** float(exponent)
         except ValueError:
             logger.error("Invalid numbers for power command")
             return "Error: Invalid numbers"
         except Exception as e:
-            logger.error(f"Error executing power command: {str(e)}")
+            logger.error("Error executing power command: %s", e)
             return f"Error: {str(e)}"
     
     def sqrt(self, number):
-        logger.info(f"Executing sqrt command with number: {number}")
+        logger.info("Executing sqrt command with number: %s", number)
         try:
             num = float(number)
             if num < 0:
@@ -41,30 +54,159 @@ class ScientificCalculator:
             logger.error("Invalid number for sqrt command")
             return "Error: Invalid number"
         except Exception as e:
-            logger.error(f"Error executing sqrt command: {str(e)}")
+            logger.error("Error executing sqrt command: %s", e)
             return f"Error: {str(e)}"
     
     def sin(self, angle):
-        logger.info(f"Executing sin command with angle: {angle}")
+        logger.info("Executing sin command with angle: %s", angle)
         try:
             return math.sin(float(angle))
         except ValueError:
             logger.error("Invalid number for sin command")
             return "Error: Invalid number"
         except Exception as e:
-            logger.error(f"Error executing sin command: {str(e)}")
+            logger.error("Error executing sin command: %s", e)
             return f"Error: {str(e)}"
     
     def cos(self, angle):
-        logger.info(f"Executing cos command with angle: {angle}")
+        logger.info("Executing cos command with angle: %s", angle)
         try:
             return math.cos(float(angle))
         except ValueError:
             logger.error("Invalid number for cos command")
             return "Error: Invalid number"
         except Exception as e:
-            logger.error(f"Error executing cos command: {str(e)}")
+            logger.error("Error executing cos command: %s", e)
             return f"Error: {str(e)}"
 
+    def prime_count(self, limit):
+        """Count the primes below ``limit`` with a sieve of Eratosthenes."""
+        logger.info("Executing prime_count command with limit: %s", limit)
+        try:
+            limit = int(float(limit))
+        except (TypeError, ValueError):
+            logger.error("Invalid number for prime_count command")
+            return "Error: Invalid number"
+        if limit < 3:
+            return 0
+        sieve = bytearray([1]) * limit
+        sieve[0] = sieve[1] = 0
+        for number in range(2, math.isqrt(limit - 1) + 1):
+            if sieve[number]:
+                sieve[number * number::number] = bytes(len(range(number * number, limit, number)))
+        return sieve.count(1)
+
+    def get_pure_commands(self):
+        """Return the names of commands whose results depend only on their arguments."""
+        return {'power', 'sqrt', 'sin', 'cos', 'prime_count'}
+
+    def get_cpu_bound_commands(self):
+        """Return the names of commands expensive enough to run in a worker process."""
+        return {'prime_count'}
+
+    def get_array_commands(self):
+        """Return the vectorized variants of the commands, used for array arguments."""
+        return {
+            'power': self.power_array,
+            'sqrt': self.sqrt_array,
+            'sin': self.sin_array,
+            'cos': self.cos_array
+        }
+
+    def get_batch_commands(self):
+        """Return batch variants mapping an iterable of argument tuples to results."""
+        return {
+            'power': lambda arg_tuples: _map_chunks(self.power_array, self.power, arg_tuples),
+            'sqrt': lambda arg_tuples: _map_chunks(self.sqrt_array, self.sqrt, arg_tuples),
+            'sin': lambda arg_tuples: _map_chunks(self.sin_array, self.sin, arg_tuples),
+            'cos': lambda arg_tuples: _map_chunks(self.cos_array, self.cos, arg_tuples)
+        }
+
+    def power_array(self, base, exponent):
+        """Element-wise power; returns (values, errors) with NaN where errors is True."""
+        base, bad_base = _as_float_array(base)
+        exponent, bad_exponent = _as_float_array(exponent)
+        with np.errstate(all='ignore'):
+            values = np.power(base, exponent)
+        return _with_errors(values, bad_base | bad_exponent)
+
+    def sqrt_array(self, number):
+        """Element-wise square root; negative and invalid inputs are flagged as errors."""
+        number, invalid = _as_float_array(number)
+        with np.errstate(invalid='ignore'):
+            values = np.sqrt(number)
+        return _with_errors(values, invalid | (number < 0))
+
+    def sin_array(self, angle):
+        """Element-wise sine; returns (values, errors)."""
+        angle, invalid = _as_float_array(angle)
+        with np.errstate(invalid='ignore'):
+            return _with_errors(np.sin(angle), invalid)
+
+    def cos_array(self, angle):
+        """Element-wise cosine; returns (values, errors)."""
+        angle, invalid = _as_float_array(angle)
+        with np.errstate(invalid='ignore'):
+            return _with_errors(np.cos(angle), invalid)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _as_float_array(values):
+    """Convert a sequence or array to float64, returning (array, invalid_mask).
+
+    Elements that cannot be converted with float() (or are NaN) become NaN and
+    are marked invalid.
+    """
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        items = np.asarray(values, dtype=object)
+        array = np.fromiter((_to_float(item) for item in items.ravel()),
+                            dtype=np.float64, count=items.size).reshape(items.shape)
+    return array, np.isnan(array)
+
+def _with_errors(values, errors):
+    """Flag non-finite results as errors too and blank out every errored value."""
+    errors = np.broadcast_to(errors, values.shape) | ~np.isfinite(values)
+    values = np.where(errors, np.nan, values)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Executed vectorized command over %d elements with %d errors",
+                    values.size, int(errors.sum()))
+    return values, errors
+
+def _map_chunks(array_command, command, arg_tuples):
+    """Evaluate a command over argument tuples with its array variant, chunk by chunk.
+
+    Elements the array variant flags as errors are recomputed with the scalar
+    command, so every result, error messages included, matches a direct call.
+    """
+    iterator = iter(arg_tuples)
+    while True:
+        chunk = list(itertools.islice(iterator, BATCH_CHUNK_SIZE))
+        if not chunk:
+            return
+        try:
+            values, errors = array_command(*zip(*chunk))
+        except TypeError:
+            # Mixed or wrong argument counts: no array evaluation for this chunk
+            values, errors = [None] * len(chunk), [True] * len(chunk)
+        else:
+            if len(values) != len(chunk):
+                values, errors = [None] * len(chunk), [True] * len(chunk)
+            else:
+                values, errors = values.tolist(), errors.tolist()
+        for args, value, error in zip(chunk, values, errors):
+            if not error:
+                yield value
+                continue
+            try:
+                yield command(*args)
+            except Exception as e:
+                yield f"Error executing command: {str(e)}"
+
 # Create plugin instance
 plugin_instance = ScientificCalculator()
@@ -0,0 +1,340 @@
+"""
+Asyncio server exposing the calculator command layer over a local socket.
+
+Clients connect over TCP or a Unix socket and exchange newline-delimited JSON.
+Each request is one object per line:
+
+    {"id": 1, "line": "add 2 3"}                                  # any REPL command
+    {"id": 2, "plugin": "scientific", "command": "sqrt", "args": [16]}
+
+and gets one response line ``{"id": ..., "ok": true|false, "result": ...}``.
+Requests on a connection are pipelined: they are dispatched as soon as they
+arrive, while responses are written back in request order. Commands that never
+touch the history run on the event loop; calculations, history commands and
+plugin calls run in a thread pool, so that one waiting for the history (e.g.
+behind a large load) never blocks other connections. The command lines of one
+connection still run one after the other, in request order.
+"""
+import os
+import sys
+import stat
+import json
+import asyncio
+import logging
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ResultCache, is_error
+from calculator import EXIT, UNDO_DEPTH, PluginManager, build_registry, process_line
+from singleton import HistoryManager
+
+logger = logging.getLogger(__name__)
+
+# Keywords run directly on the event loop. They must never wait for the history
+# manager's lock; everything else, including calculations, which record to the
+# history, goes to the executor.
+INLINE_COMMANDS = frozenset({'menu', 'cache_stats', 'stats', 'exit'})
+
+# Requests in flight per connection before the server stops reading from it
+MAX_PIPELINE = 256
+
+# Longest accepted request line, in bytes
+MAX_LINE = 1 << 20
+
+
+def _response(request_id, result):
+    """Build the response object for a command result."""
+    if result is EXIT:
+        return {'id': request_id, 'ok': True, 'result': 'Goodbye'}
+    if not isinstance(result, (str, int, float, bool, type(None))):
+        result = str(result)
+    return {'id': request_id, 'ok': not is_error(result), 'result': result}
+
+
+class CalculatorServer:
+    """Serve calculator commands over newline-delimited JSON."""
+
+    def __init__(self, registry, plugin_manager, executor=None, max_pipeline=MAX_PIPELINE):
+        """Initialize the server.
+
+        Args:
+            registry: CommandRegistry used for "line" requests
+            plugin_manager: PluginManager used for "plugin" requests
+            executor: Executor for slow commands, a thread pool by default
+            max_pipeline (int): Requests in flight per connection
+        """
+        self.registry = registry
+        self.plugin_manager = plugin_manager
+        self.executor = executor or ThreadPoolExecutor(thread_name_prefix='calc-worker')
+        self.max_pipeline = max_pipeline
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+        self._handlers = {}
+
+    def _call(self, request):
+        """Return (function, mode) computing the response for a decoded request.
+
+        ``mode`` is 'inline' to run on the event loop, 'ordered' to run in the
+        executor after the connection's previous command line, or 'parallel'.
+        """
+        request_id = request.get('id')
+        if 'plugin' in request:
+            args = request.get('args', [])
+            if not isinstance(args, list):
+                raise ValueError("'args' must be a list")
+            def run_plugin():
+                return _response(request_id, self.plugin_manager.execute_command(
+                    request['plugin'], request.get('command'), *args))
+            return run_plugin, 'parallel'
+        line = request.get('line')
+        if not isinstance(line, str):
+            raise ValueError("request needs a 'line' string or a 'plugin' name")
+        line = line.strip().lower()
+        keyword = line.split(maxsplit=1)[0] if line else ''
+        def run_line():
+            return _response(request_id, process_line(line, self.registry))
+        return run_line, 'inline' if keyword in INLINE_COMMANDS else 'ordered'
+
+    def _guarded(self, request_id, func):
+        """Run ``func``, turning an unexpected exception into an error response."""
+        try:
+            return func()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Error handling request %s: %s", request_id, e)
+            return {'id': request_id, 'ok': False, 'result': f"Error: {e}"}
+
+    async def _run_after(self, previous, request_id, func):
+        """Run ``func`` in the executor once the ``previous`` future is done."""
+        if not previous.done():
+            await asyncio.wait([previous])
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._guarded,
+                                                                request_id, func)
+
+    def _dispatch(self, raw, previous=None):
+        """Decode and start one request.
+
+        Args:
+            raw (bytes): The request line
+            previous: Future of the connection's last ordered request, or None
+
+        Returns:
+            Tuple (response, ordered): the response object for inline requests,
+            or a future resolving to it for requests handed to the executor, and
+            whether later command lines must run after it
+        """
+        try:
+            request = json.loads(raw)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return {'id': None, 'ok': False, 'result': f"Error: Invalid request: {e}"}, False
+        request_id = request.get('id')
+        try:
+            func, mode = self._call(request)
+        except ValueError as e:
+            return {'id': request_id, 'ok': False, 'result': f"Error: Invalid request: {e}"}, False
+        if mode == 'inline':
+            return self._guarded(request_id, func), False
+        if mode == 'ordered' and previous is not None:
+            return asyncio.ensure_future(self._run_after(previous, request_id, func)), True
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self._guarded, request_id, func)
+        return future, mode == 'ordered'
+
+    async def handle(self, reader, writer):
+        """Serve one connection until the client closes it or sends exit."""
+        self.connections += 1
+        self._handlers[asyncio.current_task()] = writer
+        pending = asyncio.Queue(self.max_pipeline)
+        previous = None
+
+        async def respond():
+            while True:
+                response = await pending.get()
+                if response is None:
+                    break
+                if isinstance(response, asyncio.Future):
+                    response = await response
+                writer.write(json.dumps(response).encode() + b'\n')
+                if pending.empty():
+                    await writer.drain()
+                if response.get('result') == 'Goodbye':
+                    # Ends the read loop too: the reader sees end of stream
+                    writer.close()
+                    break
+
+        responder = asyncio.create_task(respond())
+        try:
+            while not responder.done():
+                try:
+                    raw = await reader.readline()
+                except (ValueError, ConnectionError) as e:
+                    logger.warning("Dropping connection: %s", e)
+                    break
+                if not raw:
+                    break
+                if raw.strip():
+                    self.requests += 1
+                    response, ordered = self._dispatch(raw, previous)
+                    if ordered:
+                        previous = response
+                    await pending.put(response)
+            await pending.put(None)
+            await responder
+        except ConnectionError:
+            pass
+        finally:
+            responder.cancel()
+            self.connections -= 1
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Start listening on TCP ``host:port`` or, if given, Unix socket ``path``.
+
+        A socket left at ``path`` by a previous run is replaced.
+
+        Returns:
+            The listening address: (host, port) or the socket path
+
+        Raises:
+            FileExistsError: If ``path`` exists and is not a socket
+        """
+        if path is not None:
+            try:
+                mode = os.stat(path).st_mode
+            except FileNotFoundError:
+                pass
+            else:
+                if not stat.S_ISSOCK(mode):
+                    raise FileExistsError(f"{path} exists and is not a socket")
+                os.remove(path)
+            self._server = await asyncio.start_unix_server(self.handle, path, limit=MAX_LINE,
+                                                           backlog=4096)
+            return path
+        self._server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE,
+                                                  backlog=4096)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """Serve until cancelled."""
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections, close open ones and shut the executor down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        handlers = list(self._handlers.items())
+        for _, writer in handlers:
+            writer.close()
+        await asyncio.gather(*(task for task, _ in handlers), return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+
+class CalculatorClient:
+    """Async client for CalculatorServer supporting pipelined requests."""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._waiting = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=None, path=None):
+        """Open a connection over TCP or, if ``path`` is given, a Unix socket."""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._waiting.pop(response.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("connection closed"))
+
+    def send(self, request):
+        """Send a request without waiting; returns a future for its response."""
+        request = dict(request, id=next(self._ids))
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request['id']] = future
+        self._writer.write(json.dumps(request).encode() + b'\n')
+        return future
+
+    async def request(self, request):
+        """Send a request and wait for its response object."""
+        future = self.send(request)
+        await self._writer.drain()
+        return await future
+
+    async def line(self, line):
+        """Run a REPL command line and return its result."""
+        return (await self.request({'line': line}))['result']
+
+    async def close(self):
+        """Close the connection."""
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._receiver.cancel()
+
+
+def create_server(cache=None, executor=None, plugin_workers=None):
+    """Build a CalculatorServer around the shared HistoryManager and a PluginManager."""
+    plugin_manager = PluginManager(cache=cache, workers=plugin_workers)
+    history_manager = HistoryManager()
+    history_manager.set_undo_depth(UNDO_DEPTH)
+    registry = build_registry(history_manager, plugin_manager, cache)
+    return CalculatorServer(registry, plugin_manager, executor)
+
+
+async def _serve(args):
+    server = create_server(ResultCache.from_env(os.environ),
+                           ThreadPoolExecutor(args.workers, thread_name_prefix='calc-worker'),
+                           args.plugin_workers)
+    address = await server.start(args.host, args.port, args.unix)
+    print(f"Listening on {address if args.unix else '%s:%d' % address}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    """Command line entry point for the calculator server."""
+    parser = argparse.ArgumentParser(description="Calculator NDJSON server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port, 0 for any free port')
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='threads for plugin and file-backed commands')
+    parser.add_argument('--plugin-workers', type=int, default=None,
+                        help='processes for CPU-bound plugin commands (default CALC_PLUGIN_WORKERS)')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        print("Server stopped", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,50 @@
 """Singleton module implementing logger and history manager."""
+import os
+import queue
+import atexit
 import logging
-from factory import DataFacade
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime
+import numpy as np
+from factory import DataFacade, DEFAULT_CHUNK_ROWS
+from wal import WriteAheadLog
+from command import AppendRecordsEdit, ReplaceRecordsEdit, UndoStack, BatchCommand
+from stats import HistoryStats, format_stats
+from history_store import NUMERIC_COLUMNS
+from expression import ExpressionError, error_message, format_column_result
+
+# Mismatched rows listed by verify_history
+VERIFY_SHOWN_ROWS = 10
 
 class SingletonMeta(type):
     """Metaclass that implements the singleton pattern.
     
     Ensures only one instance of a class is created and provides global access to it.
+    Creation is guarded by a lock (double-checked, so lookups of an existing
+    instance stay lock-free) and is therefore safe from multiple threads.
     """
     _instances = {}
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(SingletonMeta, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+        instance = cls._instances.get(cls)
+        if instance is None:
+            with SingletonMeta._lock:
+                instance = cls._instances.get(cls)
+                if instance is None:
+                    instance = super(SingletonMeta, cls).__call__(*args, **kwargs)
+                    cls._instances[cls] = instance
+        return instance
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records unformatted.
+    
+    The stock handler formats each record on the logging thread so it can be
+    pickled; records here stay in-process, so formatting is left to the listener.
+    """
+    def prepare(self, record):
+        return record
 
 class Logger(metaclass=SingletonMeta):
     """Singleton logger class that provides centralized logging functionality.
@@ -24,6 +56,8 @@ class Logger(metaclass=SingletonMeta):
         """Initialize logger with default configuration."""
         self.strategy = None
         self.logger = logging.getLogger(__name__)
+        self._listener = None
+        self._handlers = None
 
     def set_strategy(self, strategy):
         """Set the logging strategy to be used.
@@ -45,6 +79,32 @@ class Logger(metaclass=SingletonMeta):
         else:
             self.logger.log(getattr(logging, level), message)
 
+    def enable_queue(self):
+        """Move the root logger's handlers behind a queue served by a background thread.
+        
+        Log calls then only enqueue the record; formatting and writing to the
+        handlers happen on the listener thread. Queued records are written when
+        the queue is disabled or at exit.
+        """
+        if self._listener is not None:
+            return
+        root = logging.getLogger()
+        records = queue.SimpleQueue()
+        self._handlers = root.handlers[:]
+        self._listener = QueueListener(records, *self._handlers, respect_handler_level=True)
+        root.handlers = [_DeferredQueueHandler(records)]
+        self._listener.start()
+        atexit.register(self.disable_queue)
+
+    def disable_queue(self):
+        """Write the queued records and give the root logger its handlers back."""
+        if self._listener is None:
+            return
+        logging.getLogger().handlers = self._handlers
+        self._listener.stop()
+        self._listener = None
+        self._handlers = None
+
     def get_logger(self):
         """Return the underlying logger instance.
         
@@ -57,11 +117,62 @@ class HistoryManager(metaclass=SingletonMeta):
     """Singleton class for managing calculation history.
     
     Provides functionality to store, retrieve, and manage calculation records
-    using a data facade pattern.
+    using a data facade pattern. Methods may be called from multiple threads:
+    a lock keeps the write-ahead log, the store and the running statistics in
+    step, and views and saves work on consistent snapshots of the store. Files
+    are read and written outside the lock, so loads and saves of large
+    histories do not block new records.
+    
+    Every change to the records (new records, loads, clears) is pushed on a
+    bounded undo stack and can be undone and redone.
     """
     def __init__(self):
         """Initialize HistoryManager with a DataFacade instance."""
+        self._lock = threading.RLock()
+        # Serializes checkpoint saves, which write outside _lock; taken before _lock
+        self._checkpoint_lock = threading.Lock()
         self.facade = DataFacade()
+        self.wal = None
+        self.wal_checkpoint = None
+        self.undo_stack = UndoStack()
+        self.stats = HistoryStats()
+        # (store generation, rows) the running statistics describe
+        self._stats_state = (self.facade.store.generation, 0)
+
+    def enable_wal(self, path, durability='async', checkpoint='history.csv', **options):
+        """Log every new record to a write-ahead log before applying it.
+        
+        Records, and undos and redos of added records, stay in the log until
+        the history is saved to ``checkpoint``; loading ``checkpoint`` (or
+        ``recover``) replays them on top of the saved history.
+        
+        Args:
+            path (str): Path of the write-ahead log.
+            durability (str): One of wal.DURABILITY_LEVELS.
+            checkpoint (str): History file whose saves truncate the log.
+            **options: flush_interval / flush_bytes for WriteAheadLog.
+            
+        Returns:
+            int: Number of entries pending in the log from a previous run; if
+            any, the history should be recovered.
+        """
+        with self._lock:
+            self.disable_wal()
+            self.wal = WriteAheadLog(path, durability, **options)
+            self.wal_checkpoint = checkpoint
+            return self.wal.entries
+
+    def disable_wal(self):
+        """Flush and close the write-ahead log, if any."""
+        with self._lock:
+            if self.wal is not None:
+                self.wal.close()
+                self.wal = None
+                self.wal_checkpoint = None
+
+    def _is_checkpoint(self, filename):
+        return (self.wal is not None
+                and os.path.abspath(filename) == os.path.abspath(self.wal_checkpoint))
 
     def add_record(self, operation, num1, num2, result):
         """Add a new calculation record.
@@ -72,37 +183,348 @@ class HistoryManager(metaclass=SingletonMeta):
             num2 (float): Second operand.
             result (float): Result of the operation.
         """
-        self.facade.add_record(operation, num1, num2, result)
+        with self._lock:
+            timestamp = datetime.now()
+            if self.wal is not None:
+                self.wal.append(timestamp, operation, num1, num2, result)
+            self.facade.add_record(operation, num1, num2, result, timestamp)
+            size = len(self.facade.store)
+            if self.undo_stack.depth:
+                self.undo_stack.push(AppendRecordsEdit(self.facade.store, size - 1, size))
+            if self._stats_state == (self.facade.store.generation, size - 1):
+                self.stats.record(operation, result, timestamp)
+                self._stats_state = (self.facade.store.generation, size)
+
+    def add_records(self, operation, num1, num2, result):
+        """Add a batch of calculation records in one bulk append.
+        
+        Args:
+            operation (str): The mathematical operation performed.
+            num1 (numpy.ndarray): First operands.
+            num2 (numpy.ndarray): Second operands.
+            result (numpy.ndarray): Results of the operation.
+        """
+        with self._lock:
+            timestamp = datetime.now()
+            if self.wal is not None:
+                self.wal.append_batch(timestamp, operation, num1, num2, result)
+            self.facade.add_records(operation, num1, num2, result, timestamp)
+            size = len(self.facade.store)
+            if self.undo_stack.depth and len(result):
+                self.undo_stack.push(AppendRecordsEdit(self.facade.store, size - len(result), size))
+            if self._stats_state == (self.facade.store.generation, size - len(result)):
+                self.stats.record_many(operation, result, timestamp)
+                self._stats_state = (self.facade.store.generation, size)
+
+    def _replacing(self, label, operation, *args):
+        """Run an operation that may replace the records as one undoable edit.
+        
+        Args:
+            label (str): Description of the edit shown by undo/redo.
+            operation: Callable changing the store, called with ``args``.
+            
+        Returns:
+            The operation's return value.
+        """
+        with self._lock:
+            store = self.facade.store
+            if not self.undo_stack.depth:
+                return operation(*args)
+            before = store.checkpoint()
+            message = operation(*args)
+            if (store.generation, len(store)) != (before.generation, len(before)):
+                self.undo_stack.push(ReplaceRecordsEdit(store, label, before))
+            return message
 
-    def save_to_csv(self, filename):
+    def save_to_csv(self, filename, incremental=False, fsync=False):
         """Save calculation history to a CSV file.
         
         Args:
             filename (str): Path to the CSV file.
+            incremental (bool): Only append records added since the last save.
+            fsync (bool): Force the written data to disk before returning.
             
         Returns:
             bool: True if save was successful, False otherwise.
         """
-        return self.facade.save_to_csv(filename)
+        if not self._is_checkpoint(filename):
+            return self.facade.save_to_csv(filename, incremental, fsync)
+        try:
+            appended = self._save_checkpoint(incremental, fsync)
+        except self.facade.SAVE_ERRORS as e:
+            return self.facade.error_message('saving data to', filename, e)
+        return self.facade.save_message(filename, appended)
+
+    def _save_checkpoint(self, incremental=False, fsync=False):
+        """Save the history to the write-ahead log checkpoint and truncate the log.
+        
+        The records are snapshotted together with the end of the log and written
+        without blocking writers; only the entries the file then holds are
+        dropped from the log.
+        
+        Returns:
+            int: Records appended by an incremental save, None if the file was rewritten.
+            
+        Raises:
+            One of DataFacade.SAVE_ERRORS if the save failed; the log is then kept.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                wal = self.wal
+                position = wal.position()
+                pending = self.facade.prepare_save(self.wal_checkpoint, incremental)
+            appended = self.facade.write(pending, fsync)
+            wal.truncate(position)
+            return appended
 
-    def load_from_csv(self, filename):
+    def load_from_csv(self, filename, chunksize=None, append=False):
         """Load calculation history from a CSV file.
         
         Args:
             filename (str): Path to the CSV file.
+            chunksize (int): Rows per chunk for a streaming load, None to read at once.
+            append (bool): Add to the current history instead of replacing it.
             
+        The file is read without holding the lock, which is only taken to swap
+        the records in. Loading the write-ahead log checkpoint file replays the
+        records logged since it was last saved, recovering them after a crash.
+        The load can be undone as a whole.
+        
         Returns:
             bool: True if load was successful, False otherwise.
         """
-        return self.facade.load_from_csv(filename)
+        return self._load(filename, chunksize, append, f"load of {filename}")
 
-    def view_data(self):
-        """Retrieve all calculation records.
+    def recover(self):
+        """Load the write-ahead log checkpoint and replay the log after a restart.
+        
+        Unlike load_from_csv, the recovery is not an undoable change: the
+        recovered history is where the session starts.
         
         Returns:
-            list: List of calculation records.
+            str: Status message with the number of records replayed.
         """
-        return self.facade.view_data()
+        return self._load(self.wal_checkpoint, None, False, None)
+
+    def _load(self, filename, chunksize, append, label):
+        """Read a file outside the lock and swap its records in.
+        
+        Args:
+            label (str): Description of the undoable edit, None to bypass the undo stack.
+        """
+        recover = not append and self._is_checkpoint(filename)
+        if recover and not os.path.exists(filename):
+            records, message = None, f"No saved history in {filename}"
+        else:
+            try:
+                records = self.facade.read(filename, chunksize)
+            except self.facade.LOAD_ERRORS as e:
+                return self.facade.error_message('loading data from', filename, e)
+            message = self.facade.load_message(filename)
+        if label is None:
+            return self._install(filename, records, append, recover, message)
+        return self._replacing(label, self._install, filename, records, append, recover, message)
+
+    def _install(self, filename, records, append, recover, message):
+        with self._lock:
+            if append:
+                self.facade.store.extend_snapshot(records)
+            elif records is None:
+                self.facade.clear_data()
+            else:
+                self.facade.install(filename, records)
+            if not recover:
+                return message
+            replayed = self.replay_wal()
+            return f"{message} ({replayed} records replayed from write-ahead log)"
+
+    def replay_wal(self):
+        """Apply the records, undos and redos in the write-ahead log to the history.
+        
+        Returns:
+            int: Number of records replayed.
+        """
+        with self._lock:
+            store = self.facade.store
+            count = 0
+            for kind, fields in self.wal.replay():
+                if kind == 'truncate':
+                    store.truncate(fields[0])
+                elif kind == 'untruncate':
+                    store.untruncate(fields[0])
+                elif kind == 'record':
+                    timestamp, operation, num1, num2, result = fields
+                    store.append(operation, num1, num2, result, timestamp)
+                    count += 1
+                else:
+                    timestamp, operation, num1, num2, result = fields
+                    store.extend(operation, num1, num2, result, timestamp)
+                    count += len(result)
+            return count
+
+    def iter_history(self, filename, chunksize=DEFAULT_CHUNK_ROWS):
+        """Iterate over a history file in chunks without loading it.
+        
+        Args:
+            filename (str): Path to the history file.
+            chunksize (int): Maximum rows per chunk.
+            
+        Returns:
+            Iterator of pandas.DataFrame chunks.
+        """
+        return self.facade.iter_history(filename, chunksize)
+
+    def query_history(self, filename, operation=None, start=None, end=None, page=1, page_size=20):
+        """Query a history database by operation and time window, one page at a time.
+        
+        Args:
+            filename (str): Path to an SQLite history database.
+            operation (str): Only records of this operation, or None for all.
+            start: Only records at or after this time.
+            end: Only records before this time.
+            page (int): 1-based page number.
+            page_size (int): Records per page.
+            
+        Returns:
+            str: The page of records or a status message.
+        """
+        return self.facade.query_history(filename, operation, start, end, page, page_size)
+
+    def get_stats(self):
+        """Return aggregate statistics of the history.
+        
+        The running aggregates are updated by add_record/add_records; after the
+        history was loaded, cleared or replaced they are recomputed once with a
+        vectorized groupby.
+        
+        Returns:
+            dict: Snapshot as returned by HistoryStats.snapshot.
+        """
+        with self._lock:
+            store = self.facade.store
+            if self._stats_state != (store.generation, len(store)):
+                self.stats.recompute(store.to_frame())
+                self._stats_state = (store.generation, len(store))
+            return self.stats.snapshot()
+
+    def history_stats(self):
+        """Return the history statistics formatted as a table.
+        
+        Returns:
+            str: Per-operation count/sum/mean/min/max, throughput and recent rate.
+        """
+        return format_stats(self.get_stats(), self.stats.window)
+
+    def evaluate_columns(self, evaluator, expression):
+        """Evaluate an expression over the history columns in one vectorized pass.
+        
+        The columns are read from a copy-on-write snapshot of the store, so the
+        evaluation neither copies the history nor blocks writers.
+        
+        Args:
+            evaluator (ExpressionEvaluator): Evaluator compiling the expression.
+            expression (str): Expression over num1, num2 and result.
+            
+        Returns:
+            tuple: (values, errors) arrays as returned by evaluate_columns.
+            
+        Raises:
+            ExpressionError: If the expression is invalid or uses another variable.
+        """
+        compiled = evaluator.compile(expression)
+        unknown = [name for name in compiled.variables if name not in NUMERIC_COLUMNS]
+        if unknown:
+            raise ExpressionError(f"Unknown column '{unknown[0]}'. Use {', '.join(NUMERIC_COLUMNS)}")
+        snapshot = self.facade.store.checkpoint()
+        columns = {name: snapshot.column(name) for name in compiled.variables}
+        return evaluator.evaluate_columns(expression, columns, len(snapshot))
+
+    def evaluate_history(self, evaluator, expression):
+        """Evaluate an expression over the history columns and summarize the values.
+        
+        Args:
+            evaluator (ExpressionEvaluator): Evaluator compiling the expression.
+            expression (str): Expression over num1, num2 and result.
+            
+        Returns:
+            str: Summary of the values, or an error message.
+        """
+        try:
+            values, errors = self.evaluate_columns(evaluator, expression)
+        except ExpressionError as e:
+            return error_message(e)
+        return format_column_result(values, errors)
+
+    def verify_results(self, rtol=1e-9):
+        """Recompute every stored result from its operation and operands.
+        
+        Each operation is recomputed with one masked NumPy ufunc call over the
+        whole columns of a copy-on-write snapshot.
+        
+        Args:
+            rtol (float): Relative tolerance for a result to match.
+            
+        Returns:
+            dict: 'records', 'checked' (records with an arithmetic operation) and
+            'mismatched' (array of the indexes of records whose result differs).
+        """
+        snapshot = self.facade.store.checkpoint()
+        codes = snapshot.operation_codes
+        num1, num2, stored = (snapshot.column(name) for name in NUMERIC_COLUMNS)
+        expected = np.full(len(snapshot), np.nan)
+        known = np.zeros(len(snapshot), dtype=bool)
+        with np.errstate(all='ignore'):
+            for code, operation in enumerate(snapshot.operations):
+                ufunc = BatchCommand.OPERATIONS.get(operation) if isinstance(operation, str) else None
+                if ufunc is None:
+                    continue
+                rows = codes == code
+                ufunc(num1, num2, out=expected, where=rows)
+                known |= rows
+            matches = np.isclose(stored, expected, rtol=rtol, atol=0.0, equal_nan=True)
+        return {'records': len(snapshot), 'checked': int(known.sum()),
+                'mismatched': np.flatnonzero(known & ~matches)}
+
+    def verify_history(self):
+        """Check every stored result against its operation and operands.
+        
+        Returns:
+            str: Number of records checked and the first mismatched rows, if any.
+        """
+        report = self.verify_results()
+        mismatched = report['mismatched']
+        summary = f"Verified {report['checked']} of {report['records']} records"
+        if not len(mismatched):
+            return f"{summary}: all results match"
+        rows = ', '.join(str(row) for row in mismatched[:VERIFY_SHOWN_ROWS].tolist())
+        more = ", ..." if len(mismatched) > VERIFY_SHOWN_ROWS else ""
+        return f"{summary}: {len(mismatched)} mismatched results (rows {rows}{more})"
+
+    def view_data(self, start=None, stop=None):
+        """Retrieve calculation records.
+        
+        Args:
+            start (int): Index of the first record to show, negative from the end.
+            stop (int): Index after the last record to show, None for the end.
+            
+        Returns:
+            str: Formatted calculation records.
+        """
+        if start is None and stop is None:
+            return self.facade.view_data()
+        return self.facade.view_data(start, stop)
+
+    def export_view(self, filename, chunksize=DEFAULT_CHUNK_ROWS):
+        """Write a formatted view of the history to a text file in chunks.
+        
+        Args:
+            filename (str): Path to the target text file.
+            chunksize (int): Records formatted per chunk.
+            
+        Returns:
+            str: Status message.
+        """
+        return self.facade.export_view(filename, chunksize)
 
     def clear_data(self):
         """Clear all calculation records.
@@ -110,7 +532,94 @@ class HistoryManager(metaclass=SingletonMeta):
         Returns:
             bool: True if clearing was successful, False otherwise.
         """
-        return self.facade.clear_data()
+        return self._replacing('clear', self._clear)
+
+    def _clear(self):
+        with self._lock:
+            if self.wal is not None:
+                self.wal.truncate()
+            return self.facade.clear_data()
+
+    def _log_edit(self, command, undone):
+        """Log an undone or redone edit to the write-ahead log, if it can express it.
+        
+        Undoing and redoing added records is logged as an O(1) marker.
+        Replacing edits (loads, clears) cannot be replayed from the log.
+        
+        Args:
+            command (HistoryEdit): The edit just undone or redone.
+            undone (bool): True for an undo, False for a redo.
+            
+        Returns:
+            bool: False if the checkpoint must be saved to make a replay match the history.
+        """
+        if self.wal is None:
+            return True
+        if not isinstance(command, AppendRecordsEdit):
+            return False
+        self.wal.append_marker('truncate' if undone else 'untruncate', len(self.facade.store))
+        return True
+
+    def _checkpoint_edit(self):
+        """Save the history to the write-ahead log checkpoint after a replacing edit was undone or redone.
+        
+        Saving the checkpoint truncates the log and makes the file match the
+        history again.
+        
+        Returns:
+            str: Suffix for the undo/redo message, reporting a failed save.
+        """
+        try:
+            self._save_checkpoint()
+        except self.facade.SAVE_ERRORS as e:
+            return f"; {self.facade.error_message('saving data to', self.wal_checkpoint, e)}"
+        return ""
+
+    def undo(self):
+        """Undo the last change to the records.
+        
+        With a write-ahead log, undoing added records is logged so that a
+        replay does not bring them back; undoing a load or clear saves the
+        history to the log's checkpoint instead.
+        
+        Returns:
+            str: What was undone, or that there is nothing to undo.
+        """
+        with self._lock:
+            command = self.undo_stack.undo()
+            if command is None:
+                return "Nothing to undo"
+            logged = self._log_edit(command, True)
+            records = len(self.facade.store)
+        saved = "" if logged else self._checkpoint_edit()
+        return f"Undid {command} ({records} records in history){saved}"
+
+    def redo(self):
+        """Redo the last undone change to the records.
+        
+        Returns:
+            str: What was redone, or that there is nothing to redo.
+        """
+        with self._lock:
+            try:
+                command = self.undo_stack.redo()
+            except ValueError as e:
+                return f"Error: Cannot redo: {e}"
+            if command is None:
+                return "Nothing to redo"
+            logged = self._log_edit(command, False)
+            records = len(self.facade.store)
+        saved = "" if logged else self._checkpoint_edit()
+        return f"Redid {command} ({records} records in history){saved}"
+
+    def set_undo_depth(self, depth):
+        """Keep at most ``depth`` changes for undo; 0 disables undo.
+        
+        Args:
+            depth (int): Maximum number of changes that can be undone.
+        """
+        with self._lock:
+            self.undo_stack.resize(depth)
 
 # Create an instance of Logger
 logger_instance = Logger()
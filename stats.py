@@ -0,0 +1,213 @@
+"""Statistics module maintaining running aggregates over calculation history.
+
+Per-operation counts and sum/min/max of numeric results are updated as records
+are added, so reading them is O(number of operations) rather than O(history).
+Histories that are replaced wholesale (e.g. loaded from a file) are summarized
+again with a vectorized groupby. A ring of per-second buckets gives the rate of
+operations over a sliding window for monitoring.
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+# Result types included in sum/mean/min/max; anything else is only counted
+_NUMERIC_TYPES = (float, int, np.floating, np.integer)
+
+
+class OperationStats:
+    """Running aggregates of one operation's results."""
+    __slots__ = ('count', 'numeric', 'total', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.count = 0
+        self.numeric = 0
+        self.total = 0.0
+        self.minimum = float('inf')
+        self.maximum = float('-inf')
+
+    def add(self, result):
+        """Fold a single result into the aggregates."""
+        self.count += 1
+        if isinstance(result, _NUMERIC_TYPES) and not isinstance(result, bool) and result == result:
+            self.numeric += 1
+            self.total += result
+            if result < self.minimum:
+                self.minimum = result
+            if result > self.maximum:
+                self.maximum = result
+
+    def add_many(self, results):
+        """Fold an array of float results into the aggregates."""
+        results = np.asarray(results, dtype=np.float64)
+        self.count += len(results)
+        valid = results[~np.isnan(results)]
+        if len(valid):
+            self.numeric += len(valid)
+            self.total += float(valid.sum())
+            self.minimum = min(self.minimum, float(valid.min()))
+            self.maximum = max(self.maximum, float(valid.max()))
+
+    def as_dict(self):
+        """Return the aggregates, with mean/min/max None when no result is numeric."""
+        numeric = self.numeric > 0
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.numeric if numeric else None,
+            'min': self.minimum if numeric else None,
+            'max': self.maximum if numeric else None,
+        }
+
+
+class HistoryStats:
+    """Incrementally maintained statistics of a calculation history."""
+
+    def __init__(self, window=60.0, clock=time.monotonic):
+        """Initialize empty statistics.
+
+        Args:
+            window (float): Seconds covered by the sliding operations rate
+            clock (callable): Monotonic time source, injectable for testing
+        """
+        self.window = window
+        self._clock = clock
+        self._buckets = deque()
+        self.reset()
+
+    def reset(self):
+        """Drop the aggregates (the sliding rate keeps counting recent activity)."""
+        self.operations = {}
+        self.first = None
+        self.last = None
+
+    def _timestamp(self, timestamp):
+        if timestamp is None:
+            return
+        if self.first is None or timestamp < self.first:
+            self.first = timestamp
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+
+    def _tick(self, count):
+        """Count ``count`` operations in the current one-second bucket."""
+        second = int(self._clock())
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([second, count])
+        self._expire(second)
+
+    def _expire(self, second):
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def record(self, operation, result, timestamp=None):
+        """Add one record to the statistics.
+
+        Args:
+            operation (str): The operation performed
+            result: Result of the operation
+            timestamp (datetime): Time of the operation
+        """
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        stats.add(result)
+        self._timestamp(timestamp)
+        self._tick(1)
+
+    def record_many(self, operation, results, timestamp=None):
+        """Add a batch of records of one operation to the statistics.
+
+        Args:
+            operation (str): The operation performed
+            results: Array of float results
+            timestamp (datetime): Time shared by the batch
+        """
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        stats.add_many(results)
+        self._timestamp(timestamp)
+        self._tick(len(results))
+
+    def recompute(self, frame):
+        """Rebuild the aggregates from a history DataFrame with a vectorized groupby.
+
+        Args:
+            frame (pandas.DataFrame): History with operation, result and timestamp columns
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        self.reset()
+        if len(frame) == 0:
+            return
+        results = pd.to_numeric(frame['result'], errors='coerce')
+        codes, operations = pd.factorize(frame['operation'], use_na_sentinel=False)
+        grouped = results.groupby(codes, sort=False).agg(['size', 'count', 'sum', 'min', 'max'])
+        for code, row in grouped.iterrows():
+            stats = self.operations[str(operations[code])] = OperationStats()
+            stats.count = int(row['size'])
+            stats.numeric = int(row['count'])
+            if stats.numeric:
+                stats.total = float(row['sum'])
+                stats.minimum = float(row['min'])
+                stats.maximum = float(row['max'])
+        timestamps = frame['timestamp']
+        if timestamps.notna().any():
+            self.first = timestamps.min().to_pydatetime()
+            self.last = timestamps.max().to_pydatetime()
+
+    def rate(self):
+        """Return operations per second over the sliding window."""
+        self._expire(int(self._clock()))
+        return sum(count for _, count in self._buckets) / self.window
+
+    def snapshot(self):
+        """Return the current statistics.
+
+        Returns:
+            dict: 'operations' (per-operation count/sum/mean/min/max), 'total'
+            record count, 'first'/'last' timestamps, 'per_minute' average
+            throughput over the history's time span and 'rate' (ops/s over the
+            sliding window)
+        """
+        total = sum(stats.count for stats in self.operations.values())
+        per_minute = None
+        if self.first is not None and self.last > self.first:
+            per_minute = total / ((self.last - self.first).total_seconds() / 60)
+        return {
+            'operations': {operation: stats.as_dict() for operation, stats in self.operations.items()},
+            'total': total,
+            'first': self.first,
+            'last': self.last,
+            'per_minute': per_minute,
+            'rate': self.rate(),
+        }
+
+
+def _number(value):
+    return '-' if value is None else f"{value:.6g}"
+
+
+def format_stats(snapshot, window=60):
+    """Render a statistics snapshot as a text table.
+
+    Args:
+        snapshot (dict): Result of HistoryStats.snapshot
+        window (float): Sliding window the rate covers, in seconds
+
+    Returns:
+        str: The formatted statistics
+    """
+    if snapshot['total'] == 0:
+        return f"No data available\nLast {window:g}s: {snapshot['rate']:.2f} ops/s"
+    lines = [f"{'operation':<12} {'count':>10} {'sum':>12} {'mean':>12} {'min':>12} {'max':>12}"]
+    for operation, stats in sorted(snapshot['operations'].items()):
+        lines.append(f"{operation:<12} {stats['count']:>10} {_number(stats['sum']):>12} "
+                     f"{_number(stats['mean']):>12} {_number(stats['min']):>12} {_number(stats['max']):>12}")
+    lines.append(f"Total: {snapshot['total']} records from {snapshot['first']} to {snapshot['last']}")
+    if snapshot['per_minute'] is not None:
+        lines.append(f"Throughput: {snapshot['per_minute']:.2f} ops/min over the history")
+    lines.append(f"Last {window:g}s: {snapshot['rate']:.2f} ops/s")
+    return '\n'.join(lines)
@@ -1,5 +1,20 @@
 """Strategy module implementing various logging and history strategies."""
-import pandas as pd
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+import logging
+
+import numpy as np
+
+from history_store import COLUMNS, NUMERIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# pandas is imported inside the history strategies so that importing this module
+# stays cheap; it is only needed once history is actually saved or loaded.
 
 class HistoryStrategy:
     """Base class for implementing history storage strategies."""
@@ -23,6 +38,20 @@ class HistoryStrategy:
         """
         raise NotImplementedError
 
+    def iter_chunks(self, filename, chunksize):
+        """Yield the data of a file in chunks of at most ``chunksize`` rows.
+
+        Formats that cannot be read incrementally yield the whole file once.
+
+        Args:
+            filename (str): Path to the source file
+            chunksize (int): Maximum number of rows per chunk
+
+        Yields:
+            pandas.DataFrame: Consecutive chunks of the data
+        """
+        yield self.load(filename)
+
 class CSVHistoryStrategy(HistoryStrategy):
     """Strategy for saving and loading history data in CSV format."""
     def save(self, data, filename):
@@ -34,6 +63,22 @@ class CSVHistoryStrategy(HistoryStrategy):
         """
         data.to_csv(filename, index=False)
 
+    def append(self, data, filename, fsync=False):
+        """Append rows to an existing CSV file without rewriting it.
+        
+        The header is only written when the file is new or empty.
+        
+        Args:
+            data (pandas.DataFrame): The rows to append
+            filename (str): Path to the target CSV file
+            fsync (bool): Force the written data to disk before returning
+        """
+        with open(filename, 'a', encoding='utf-8', newline='') as file:
+            data.to_csv(file, index=False, header=file.tell() == 0)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+
     def load(self, filename):
         """Load data from a CSV file.
         
@@ -43,8 +88,477 @@ class CSVHistoryStrategy(HistoryStrategy):
         Returns:
             pandas.DataFrame: The loaded data
         """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
         return pd.read_csv(filename)
 
+    def iter_chunks(self, filename, chunksize):
+        """Read a CSV file in bounded chunks, validating and typing each one.
+
+        Only one chunk is held in memory at a time. Timestamps are parsed to
+        datetime64 and operand/result columns converted to float64; values that
+        fail conversion become NaT/NaN and are reported in the log.
+
+        Args:
+            filename (str): Path to the source CSV file
+            chunksize (int): Maximum number of rows per chunk
+
+        Yields:
+            pandas.DataFrame: Typed chunks of the history
+
+        Raises:
+            ValueError: If the file lacks one of the history columns
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        with pd.read_csv(filename, chunksize=chunksize, dtype={'operation': object}) as reader:
+            for chunk in reader:
+                yield _validate_chunk(chunk)
+
+def _validate_chunk(chunk):
+    """Check the history columns of a CSV chunk and convert them to native types."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    missing = [name for name in COLUMNS if name not in chunk.columns]
+    if missing:
+        raise ValueError(f"History file is missing columns: {', '.join(missing)}")
+    typed = chunk[COLUMNS].copy()
+    invalid = 0
+    typed['timestamp'] = pd.to_datetime(chunk['timestamp'], errors='coerce', format='ISO8601')
+    invalid += int((typed['timestamp'].isna() & chunk['timestamp'].notna()).sum())
+    for name in NUMERIC_COLUMNS:
+        typed[name] = pd.to_numeric(chunk[name], errors='coerce')
+        invalid += int((typed[name].isna() & chunk[name].notna()).sum())
+    if invalid:
+        logger.warning("Chunk at row %d: %d values could not be converted", chunk.index[0], invalid)
+    return typed
+
+def _typed_columns(data):
+    """Return history columns with native types for the binary formats.
+
+    Timestamps become datetime64, the operation becomes categorical and operand
+    and result columns float64 where they are numeric.
+
+    Args:
+        data (pandas.DataFrame): History data
+
+    Returns:
+        pandas.DataFrame: Copy of the data with typed columns
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    typed = pd.DataFrame(index=range(len(data)))
+    typed['timestamp'] = pd.to_datetime(data['timestamp'], errors='coerce', format='mixed').to_numpy()
+    typed['operation'] = pd.Categorical(data['operation'].to_numpy())
+    for name in ('num1', 'num2', 'result'):
+        column = data[name]
+        if pd.api.types.is_numeric_dtype(column):
+            typed[name] = column.to_numpy(dtype=np.float64)
+        else:
+            typed[name] = column.astype(str).to_numpy()
+    return typed
+
+class NPZHistoryStrategy(HistoryStrategy):
+    """Strategy for saving and loading history as typed NumPy arrays (.npz).
+
+    Needs only NumPy: timestamps are stored as datetime64, operations as integer
+    codes plus a category table, and operands/results as float64.
+    """
+    def __init__(self, compression=False):
+        """Initialize the strategy.
+
+        Args:
+            compression (bool): Whether to zip-compress the arrays
+        """
+        self.compression = bool(compression)
+
+    def save(self, data, filename):
+        """Save data to an .npz file.
+        
+        Args:
+            data (pandas.DataFrame): The data to be saved
+            filename (str): Path to the target file
+        """
+        typed = _typed_columns(data)
+        operation = typed['operation'].cat
+        arrays = {
+            'timestamp': typed['timestamp'].to_numpy(dtype='datetime64[us]'),
+            'operation_codes': operation.codes.to_numpy(dtype=np.int32),
+            'operation_categories': np.asarray(operation.categories.astype(str), dtype=str),
+        }
+        for name in ('num1', 'num2', 'result'):
+            arrays[name] = typed[name].to_numpy()
+        save = np.savez_compressed if self.compression else np.savez
+        with open(filename, 'wb') as file:
+            save(file, **arrays)
+
+    def load(self, filename):
+        """Load data from an .npz file.
+        
+        Args:
+            filename (str): Path to the source file
+            
+        Returns:
+            pandas.DataFrame: The loaded data
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        with np.load(filename, allow_pickle=False) as arrays:
+            operation = pd.Categorical.from_codes(arrays['operation_codes'],
+                                                  categories=arrays['operation_categories'])
+            return pd.DataFrame({
+                'timestamp': arrays['timestamp'],
+                'operation': operation,
+                'num1': arrays['num1'],
+                'num2': arrays['num2'],
+                'result': arrays['result'],
+            })
+
+class ParquetHistoryStrategy(HistoryStrategy):
+    """Strategy for saving and loading history in Parquet format (requires pyarrow)."""
+    def __init__(self, compression='snappy'):
+        """Initialize the strategy.
+        
+        Args:
+            compression (str): Parquet codec such as 'snappy', 'zstd' or None
+        """
+        self.compression = compression
+
+    def save(self, data, filename):
+        """Save data to a Parquet file.
+        
+        Args:
+            data (pandas.DataFrame): The data to be saved
+            filename (str): Path to the target file
+        """
+        _typed_columns(data).to_parquet(filename, index=False, compression=self.compression)
+
+    def load(self, filename):
+        """Load data from a Parquet file.
+        
+        Args:
+            filename (str): Path to the source file
+            
+        Returns:
+            pandas.DataFrame: The loaded data
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        return pd.read_parquet(filename)
+
+class FeatherHistoryStrategy(HistoryStrategy):
+    """Strategy for saving and loading history in Feather/Arrow IPC format (requires pyarrow)."""
+    def __init__(self, compression='lz4'):
+        """Initialize the strategy.
+        
+        Args:
+            compression (str): Feather codec, 'lz4', 'zstd' or 'uncompressed'
+        """
+        self.compression = compression
+
+    def save(self, data, filename):
+        """Save data to a Feather file.
+        
+        Args:
+            data (pandas.DataFrame): The data to be saved
+            filename (str): Path to the target file
+        """
+        _typed_columns(data).to_feather(filename, compression=self.compression)
+
+    def load(self, filename):
+        """Load data from a Feather file.
+        
+        Args:
+            filename (str): Path to the source file
+            
+        Returns:
+            pandas.DataFrame: The loaded data
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        return pd.read_feather(filename)
+
+_SQLITE_COLUMNS = 'timestamp, operation, num1, num2, result'
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER,
+    operation TEXT,
+    num1 REAL,
+    num2 REAL,
+    result REAL
+);
+"""
+_SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS history_operation_timestamp ON history (operation, timestamp);
+"""
+
+def _sqlite_rows(data):
+    """Yield history rows as tuples of SQLite values.
+
+    Timestamps become integer microseconds since the epoch (NULL for NaT) and
+    missing values NULL; non-numeric operands are stored as given.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    timestamps = data['timestamp']
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, errors='coerce', format='mixed')
+    micros = timestamps.to_numpy(dtype='datetime64[us]')
+    stamps = micros.astype(np.int64).astype(object)
+    stamps[np.isnat(micros)] = None
+    columns = [stamps, np.array(data['operation'], dtype=object)]
+    for name in NUMERIC_COLUMNS:
+        column = np.array(data[name], dtype=object)
+        column[pd.isna(column)] = None
+        columns.append(column)
+    return zip(*(column.tolist() for column in columns))
+
+def _sqlite_frame(rows):
+    """Build a history DataFrame from (timestamp, operation, num1, num2, result) rows."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    nat = np.iinfo(np.int64).min
+    stamps = np.array([nat if value is None else value for value in columns[0]], dtype=np.int64)
+    frame = {'timestamp': stamps.view('datetime64[us]'),
+             'operation': np.array(columns[1], dtype=object)}
+    for name, values in zip(NUMERIC_COLUMNS, columns[2:]):
+        try:
+            frame[name] = np.array([np.nan if value is None else value for value in values],
+                                   dtype=np.float64)
+        except ValueError:
+            frame[name] = np.array(values, dtype=object)
+    return pd.DataFrame(frame)
+
+def _sqlite_time(value):
+    """Convert a datetime (or ISO string) to the stored integer microseconds."""
+    return int(np.datetime64(value, 'us').astype(np.int64))
+
+class SQLiteHistoryStrategy(HistoryStrategy):
+    """Strategy for saving, loading and querying history in an SQLite database.
+
+    Rows live in a ``history`` table with timestamps stored as integer
+    microseconds since the epoch. Indexes on ``timestamp`` and on ``(operation,
+    timestamp)`` let filtered, time-ordered queries read only the matching rows.
+    """
+    def __init__(self, batch_rows=50_000):
+        """Initialize the strategy.
+
+        Args:
+            batch_rows (int): Rows per ``executemany`` batch when inserting
+        """
+        self.batch_rows = batch_rows
+
+    def _insert(self, connection, data):
+        """Insert rows in batches inside the caller's transaction."""
+        for start in range(0, len(data), self.batch_rows):
+            connection.executemany(
+                f"INSERT INTO history ({_SQLITE_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                _sqlite_rows(data.iloc[start:start + self.batch_rows]))
+
+    def save(self, data, filename):
+        """Save data to a new SQLite database, replacing any existing file.
+
+        Rows are inserted in one transaction before the indexes are built. The
+        database is written next to the target and moved over it only once
+        complete, so a failed save leaves the existing file intact.
+
+        Args:
+            data (pandas.DataFrame): The data to be saved
+            filename (str): Path to the target database
+        """
+        partial = f"{filename}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        try:
+            connection = sqlite3.connect(partial)
+            try:
+                connection.executescript(_SQLITE_SCHEMA)
+                with connection:
+                    self._insert(connection, data)
+                connection.executescript(_SQLITE_INDEXES)
+            finally:
+                connection.close()
+            os.replace(partial, filename)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+    def append(self, data, filename, fsync=False):
+        """Append rows to a database in a single transaction.
+
+        Args:
+            data (pandas.DataFrame): The rows to append
+            filename (str): Path to the target database
+            fsync (bool): Sync every commit to disk (synchronous=FULL)
+        """
+        connection = sqlite3.connect(filename)
+        try:
+            connection.execute(f"PRAGMA synchronous = {'FULL' if fsync else 'NORMAL'}")
+            connection.executescript(_SQLITE_SCHEMA + _SQLITE_INDEXES)
+            with connection:
+                self._insert(connection, data)
+        finally:
+            connection.close()
+
+    def _open(self, filename):
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f"No such history database: '{filename}'")
+        return sqlite3.connect(filename)
+
+    def load(self, filename):
+        """Load data from an SQLite database.
+        
+        Args:
+            filename (str): Path to the source database
+            
+        Returns:
+            pandas.DataFrame: The loaded data
+        """
+        connection = self._open(filename)
+        try:
+            return _sqlite_frame(connection.execute(
+                f"SELECT {_SQLITE_COLUMNS} FROM history ORDER BY id").fetchall())
+        finally:
+            connection.close()
+
+    def iter_chunks(self, filename, chunksize):
+        """Read the database in chunks of at most ``chunksize`` rows.
+
+        Args:
+            filename (str): Path to the source database
+            chunksize (int): Maximum number of rows per chunk
+
+        Yields:
+            pandas.DataFrame: Consecutive chunks of the history
+        """
+        connection = self._open(filename)
+        try:
+            cursor = connection.execute(f"SELECT {_SQLITE_COLUMNS} FROM history ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield _sqlite_frame(rows)
+        finally:
+            connection.close()
+
+    def query_rows(self, filename, operation=None, start=None, end=None, limit=20, offset=0):
+        """Return matching records in time order as raw (timestamp, ...) tuples.
+
+        Timestamps are integer microseconds since the epoch. See ``query``
+        for the arguments.
+
+        Returns:
+            list: Tuples of (timestamp, operation, num1, num2, result)
+        """
+        clauses, params = [], []
+        if operation is not None:
+            clauses.append("operation = ?")
+            params.append(operation)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_sqlite_time(start))
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(_sqlite_time(end))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        connection = self._open(filename)
+        try:
+            return connection.execute(
+                f"SELECT {_SQLITE_COLUMNS} FROM history{where} "
+                "ORDER BY timestamp, id LIMIT ? OFFSET ?", (*params, limit, offset)).fetchall()
+        finally:
+            connection.close()
+
+    def query(self, filename, operation=None, start=None, end=None, limit=20, offset=0):
+        """Return matching records in time order, one page at a time.
+
+        Args:
+            filename (str): Path to the source database
+            operation (str): Only records of this operation, or None for all
+            start: Only records at or after this time (datetime or ISO string)
+            end: Only records before this time (datetime or ISO string)
+            limit (int): Maximum number of records to return
+            offset (int): Number of matching records to skip
+
+        Returns:
+            pandas.DataFrame: The matching records
+        """
+        return _sqlite_frame(self.query_rows(filename, operation, start, end, limit, offset))
+
+class FlushTracker:
+    """Track the high-water mark of store rows already written to each file.
+
+    A mark is only trusted while the store's generation is unchanged (no clear or
+    load since) and the file still has the size it had after the last write, so
+    that an incremental save never appends onto a file that diverged.
+    """
+    def __init__(self):
+        """Initialize with no flushed files."""
+        self._marks = {}
+
+    def flushed_rows(self, filename, store):
+        """Return how many leading store rows ``filename`` already holds.
+        
+        Args:
+            filename (str): Path of the history file
+            store (HistoryStore): The in-memory history
+            
+        Returns:
+            int: Number of rows that need not be written again, 0 for a full rewrite
+        """
+        mark = self._marks.get(os.path.abspath(filename))
+        if mark is None:
+            return 0
+        generation, rows, size = mark
+        if generation != store.generation or rows > len(store):
+            return 0
+        try:
+            if os.path.getsize(filename) != size:
+                return 0
+        except OSError:
+            return 0
+        return rows
+
+    def mark(self, filename, generation, rows):
+        """Record that ``filename`` now holds the first ``rows`` store rows.
+        
+        Args:
+            filename (str): Path of the history file
+            generation (int): Store generation the rows were taken from
+            rows (int): Number of leading store rows in the file
+        """
+        self._marks[os.path.abspath(filename)] = (generation, rows, os.path.getsize(filename))
+
+def fsync_file(filename):
+    """Flush a file's data to disk.
+    
+    Args:
+        filename (str): Path of the file
+    """
+    with open(filename, 'rb') as file:
+        os.fsync(file.fileno())
+
+# History file extensions and the strategy used for each
+HISTORY_STRATEGIES = {
+    '.csv': CSVHistoryStrategy,
+    '.npz': NPZHistoryStrategy,
+    '.parquet': ParquetHistoryStrategy,
+    '.pq': ParquetHistoryStrategy,
+    '.feather': FeatherHistoryStrategy,
+    '.arrow': FeatherHistoryStrategy,
+    '.db': SQLiteHistoryStrategy,
+    '.sqlite': SQLiteHistoryStrategy,
+    '.sqlite3': SQLiteHistoryStrategy,
+}
+
+def history_strategy_for(filename):
+    """Return the history strategy matching a file's extension.
+    
+    Args:
+        filename (str): Path of the history file
+        
+    Returns:
+        HistoryStrategy: Strategy for the extension; CSV for unknown extensions
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return HISTORY_STRATEGIES.get(extension, CSVHistoryStrategy)()
+
 class LoggerStrategy:
     """Base class for implementing logging strategies."""
     def log(self, message, level):
@@ -61,7 +575,11 @@ class LoggerStrategy:
         raise NotImplementedError
 
 class FileLoggerStrategy(LoggerStrategy):
-    """Strategy for logging messages to a file."""
+    """Strategy for logging messages to a file.
+    
+    The file is opened on the first message and kept open; each message is
+    flushed so that it is visible in the file as soon as log() returns.
+    """
     def __init__(self, filename):
         """Initialize the file logger.
         
@@ -69,6 +587,8 @@ class FileLoggerStrategy(LoggerStrategy):
             filename (str): Path to the log file
         """
         self.filename = filename
+        self._file = None
+        self._lock = threading.Lock()
 
     def log(self, message, level):
         """Log a message to a file with the specified level.
@@ -77,13 +597,109 @@ class FileLoggerStrategy(LoggerStrategy):
             message (str): The message to log
             level (str): The logging level
         """
-        with open(self.filename, 'a', encoding='utf-8') as file:
-            file.write(f"{level}: {message}\n")
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.filename, 'a', encoding='utf-8')
+            self._file.write(f"{level}: {message}\n")
+            self._file.flush()
             
     def clear_logs(self):
         """Clear the log file."""
-        with open(self.filename, 'w', encoding='utf-8') as file:
-            pass
+        with self._lock:
+            if self._file is not None:
+                self._file.truncate(0)
+            else:
+                with open(self.filename, 'w', encoding='utf-8'):
+                    pass
+
+    def close(self):
+        """Close the log file; the next message opens it again."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+# Sentinel telling the QueuedFileLoggerStrategy writer thread to stop
+_STOP = object()
+
+class QueuedFileLoggerStrategy(LoggerStrategy):
+    """Strategy handing messages to a background thread that writes them to a file.
+    
+    log() only puts the message on a queue, so the caller never waits for
+    formatting or disk I/O. The writer thread keeps the file open, writes
+    messages through a buffer and flushes at most every ``flush_interval``
+    seconds while busy and as soon as the queue is empty.
+    """
+    def __init__(self, filename, flush_interval=0.5):
+        """Open the log file and start the writer thread.
+        
+        Args:
+            filename (str): Path to the log file
+            flush_interval (float): Longest time buffered messages wait while the queue is busy
+        """
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._file = open(filename, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._write_loop, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def log(self, message, level):
+        """Queue a message for the log file.
+        
+        Args:
+            message (str): The message to log
+            level (str): The logging level
+        """
+        self._queue.put((level, message))
+
+    def _write_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            with self._lock:
+                if isinstance(item, tuple):
+                    self._file.write(f"{item[0]}: {item[1]}\n")
+                    if not self._queue.empty() and time.monotonic() - last_flush < self.flush_interval:
+                        continue
+                self._file.flush()
+                last_flush = time.monotonic()
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def flush(self, timeout=None):
+        """Wait until every message queued so far is written to the file.
+        
+        Args:
+            timeout (float): Seconds to wait at most, None to wait until done
+            
+        Returns:
+            bool: True if the messages were written in time
+        """
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def clear_logs(self):
+        """Clear the log file, including messages queued before the call."""
+        self.flush()
+        with self._lock:
+            self._file.truncate(0)
+
+    def close(self):
+        """Write the queued messages, stop the writer thread and close the file."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._file.close()
 
 class ConsoleLoggerStrategy(LoggerStrategy):
     """Strategy for logging messages to the console."""
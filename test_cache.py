@@ -0,0 +1,81 @@
+"""Test module for the memoization result cache."""
+import numpy as np
+
+from cache import MISSING, ResultCache, normalize_args
+from calculator import PluginManager
+from command import AddCommand, DivideCommand
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted when full."""
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 3
+    assert stats['misses'] == 1
+
+def test_ttl_expiry():
+    """Test that entries expire after the configured time-to-live."""
+    now = [0.0]
+    cache = ResultCache(max_size=4, ttl=10, clock=lambda: now[0])
+    cache.put('a', 1)
+    now[0] = 9.9
+    assert cache.get('a') == 1
+    now[0] = 10.0
+    assert cache.get('a') is MISSING
+    assert cache.stats()['expirations'] == 1
+
+def test_errors_not_cached_by_default():
+    """Test that error results are only cached when configured."""
+    cache = ResultCache()
+    assert not cache.put('a', "Error: Invalid number")
+    assert cache.get('a') is MISSING
+    cache = ResultCache(cache_errors=True)
+    assert cache.put('a', "Error: Invalid number")
+    assert cache.get('a') == "Error: Invalid number"
+
+def test_normalize_args():
+    """Test argument normalization for cache keys."""
+    assert normalize_args(('2',)) == normalize_args((' 2.0 ',))
+    assert normalize_args((2,)) != normalize_args((2.0,)) != normalize_args(('2',))
+    assert normalize_args((0.0,)) != normalize_args((-0.0,))
+    assert normalize_args((' PI ',)) == ('pi',)
+    assert normalize_args(([1, 2],)) is None
+
+def test_plugin_results_cached():
+    """Test that pure plugin commands are served from the cache."""
+    cache = ResultCache(max_size=8)
+    manager = PluginManager(cache=cache)
+    assert manager.execute_command('scientific', 'power', '2', '3') == 8.0
+    assert manager.execute_command('scientific', 'power', '2.0', '3') == 8.0
+    assert cache.stats()['hits'] == 1
+    assert "Error" in manager.execute_command('scientific', 'sqrt', -1)
+    assert "Error" in manager.execute_command('scientific', 'sqrt', -1)
+    assert len(cache) == 1
+
+def test_array_results_not_cached():
+    """Test that array results are not cached, so mutating one cannot change later results."""
+    cache = ResultCache(max_size=8)
+    manager = PluginManager(cache=cache)
+    values = np.asarray(manager.execute_command('scientific', 'sqrt', (4.0, 9.0))[0])
+    values[0] = 99
+    values = np.asarray(manager.execute_command('scientific', 'sqrt', (4.0, 9.0))[0])
+    assert values.tolist() == [2.0, 3.0]
+    assert len(cache) == 0
+
+def test_arithmetic_results_cached(data_facade):
+    """Test that cached arithmetic still records every calculation."""
+    cache = ResultCache(max_size=8)
+    assert AddCommand(data_facade, 2, 3, cache).execute() == 5
+    assert AddCommand(data_facade, 2, 3, cache).execute() == 5
+    result = AddCommand(data_facade, 2.0, 3.0, cache).execute()
+    assert result == 5.0 and isinstance(result, float)
+    assert DivideCommand(data_facade, 1, 0, cache).execute() == "Error: Division by zero"
+    assert cache.stats()['hits'] == 1
+    assert len(data_facade.data) == 3
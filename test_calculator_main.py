@@ -5,7 +5,8 @@ Contains integration tests for basic operations, plugin system, and history mana
 import io
 import unittest.mock
 import pytest
-from calculator import PluginManager, main
+from calculator import PluginManager, main, run_batch, build_registry, process_line
+from command import EXIT
 
 def test_plugin_manager_initialization():
     """Test the initialization of PluginManager class."""
@@ -104,3 +105,43 @@ def test_plugin_error_handling():
         assert "Plugin 'nonexistent' not found" in output
         assert "Command 'invalid_command' not found" in output
         assert "Error: Invalid input format" in output
+
+def test_batch_mode_matches_repl():
+    """Test that batch mode prints the same result lines as the REPL."""
+    inputs = [
+        'add 2 3',
+        'DIVIDE 5 0',
+        '  multiply 1.5 2  ',
+        'add x 2',
+        'modulo 1 2',
+        'use_plugin scientific sqrt 16',
+        'use_plugin scientific',
+        'map_plugin scientific power 2,3 9,0.5',
+        'save_history_to_csv',
+        '',
+    ]
+    with unittest.mock.patch('builtins.input', side_effect=inputs + ['exit']), \
+         unittest.mock.patch('sys.stdout', new=io.StringIO()) as fake_out:
+        main()
+        repl_lines = fake_out.getvalue().splitlines()[-len(inputs):]
+
+    stream_in = io.BytesIO(('\n'.join(inputs + ['exit', 'add 1 1']) + '\n').encode())
+    stream_out, stream_err = io.StringIO(), io.StringIO()
+    lines, errors = run_batch(stream_in, stream_out, stream_err, chunk_size=7)
+    assert stream_out.getvalue().splitlines() == repl_lines
+    assert lines == len(inputs)
+    assert errors == 6
+    assert "lines/s" in stream_err.getvalue()
+
+def test_command_registry_dispatch(history_manager, plugin_manager):
+    """Test keyword dispatch through the registry, including plugin keywords."""
+    registry = build_registry(history_manager, plugin_manager)
+    assert 'add' in registry
+    assert 'sqrt' in registry
+    assert process_line('add 2 3', registry) == "Result: 5.0"
+    assert process_line('sqrt 16', registry) == "Result: 4.0"
+    assert process_line('map_plugin scientific sqrt 16 -1', registry) == \
+        "Results: 4.0, Error: Cannot calculate square root of negative number"
+    assert process_line('view_history now', registry).startswith("Error: Invalid view_history command format")
+    assert process_line('modulo 1 2', registry).startswith("Error: Invalid operation")
+    assert process_line('exit', registry) is EXIT
@@ -1,7 +1,10 @@
 """Test module for calculator operations."""
-from calculator import add, subtract, multiply, divide
+import numpy as np
+import pytest
+from calculator import add, subtract, multiply, divide, calculate_batch, build_registry, process_line
 from command import (
-    AddCommand, SubtractCommand, MultiplyCommand, DivideCommand
+    AddCommand, SubtractCommand, MultiplyCommand, DivideCommand, ArithmeticCommand,
+    BINARY_OPERATIONS, execute_binary
 )
 
 def test_basic_operations():
@@ -48,4 +51,57 @@ def test_divide_by_zero_command(data_facade):
     """Test DivideCommand handling of division by zero."""
     cmd = DivideCommand(data_facade, 5, 0)
     assert cmd.execute() == "Error: Division by zero"
-    
\ No newline at end of file
+    
+def test_calculate_batch(data_facade):
+    """Test vectorized batch arithmetic and its single bulk history append."""
+    results, errors = calculate_batch('multiply', [1, 2, 3], [4, 5, 6], data_facade)
+    assert results.tolist() == [4.0, 10.0, 18.0]
+    assert not errors.any()
+    assert len(data_facade.data) == 3
+    assert data_facade.data['operation'].tolist() == ['multiply'] * 3
+
+def test_calculate_batch_division_by_zero(data_facade):
+    """Test that division by zero is masked per element and not recorded."""
+    results, errors = calculate_batch('divide', np.array([6.0, 5.0, 9.0]), [2, 0, 3], data_facade)
+    assert errors.tolist() == [False, True, False]
+    assert results[0] == 3.0 and results[2] == 3.0
+    assert np.isnan(results[1])
+    assert data_facade.data['result'].tolist() == [3.0, 3.0]
+
+def test_calculate_batch_scalar_operands(data_facade):
+    """Test that scalar operands are a one-element batch and are broadcast against arrays."""
+    results, errors = calculate_batch('add', 1, 2, data_facade)
+    assert results.tolist() == [3.0] and errors.tolist() == [False]
+    results, _ = calculate_batch('subtract', [5, 6], 1, data_facade)
+    assert results.tolist() == [4.0, 5.0]
+    assert data_facade.data['result'].tolist() == [3.0, 4.0, 5.0]
+
+def test_calculate_batch_invalid_operation(data_facade):
+    """Test that an unknown batch operation is rejected."""
+    with pytest.raises(ValueError):
+        calculate_batch('modulo', [1], [2], data_facade)
+
+def test_arithmetic_command_table(data_facade):
+    """Test the parametrized command and its compact, dict-free instances."""
+    cmd = ArithmeticCommand(data_facade, 'multiply', 4, 3)
+    assert cmd.execute() == 12 and cmd.result == 12
+    assert not hasattr(cmd, '__dict__')
+    assert not hasattr(AddCommand(data_facade, 1, 2), '__dict__')
+    assert set(BINARY_OPERATIONS) == {'add', 'subtract', 'multiply', 'divide'}
+    with pytest.raises(ValueError):
+        ArithmeticCommand(data_facade, 'modulo', 1, 2)
+
+def test_execute_binary(data_facade):
+    """Test executing an operation without a command object."""
+    assert execute_binary(data_facade, 'subtract', 5, 3) == 2
+    assert execute_binary(data_facade, 'divide', 5, 0) == "Error: Division by zero"
+    assert data_facade.data['operation'].tolist() == ['subtract']
+
+def test_arithmetic_lines_skip_command_objects(history_manager, plugin_manager, monkeypatch):
+    """Test that calculation lines run through registry handlers, not Command objects."""
+    registry = build_registry(history_manager, plugin_manager)
+    assert registry.handler('add') is not None
+    monkeypatch.setattr(ArithmeticCommand, '__init__', None)
+    assert process_line('divide 9 3', registry) == "Result: 3.0"
+    assert process_line('divide 9 0', registry) == "Result: Error: Division by zero"
+    assert process_line('add 1', registry).startswith("Error: Invalid input format")
@@ -0,0 +1,71 @@
+"""Test module for the infix expression evaluator."""
+
+import numpy as np
+import pytest
+from calculator import build_registry, process_line
+from expression import ExpressionEvaluator, ExpressionError
+
+@pytest.fixture
+def evaluator(plugin_manager):
+    """Create an evaluator with the scientific plugin's functions.
+
+    Returns:
+        ExpressionEvaluator: Evaluator with an empty compiled-expression cache.
+    """
+    return ExpressionEvaluator(plugin_manager)
+
+def test_evaluate_operators_and_functions(evaluator):
+    """Test precedence, power, unary minus and plugin/arithmetic function calls."""
+    assert evaluator.evaluate("(2+3)*sqrt(16)") == 20.0
+    assert evaluator.evaluate("2 + 3 * 4 ^ 2") == 50.0
+    assert evaluator.evaluate("-2 ** 2 + 7 // 2 + 7 % 4") == 2.0
+    assert evaluator.evaluate("add(1, multiply(2, 3)) + power(2, 3)") == 15.0
+
+def test_variable_bindings_reuse_compiled_expression(evaluator):
+    """Test that a repeated expression is compiled once and evaluated per binding."""
+    assert evaluator.evaluate("x * y + 1", {'x': 2, 'y': 3}) == 7.0
+    assert evaluator.evaluate("x * y + 1", {'x': 4, 'y': 5}) == 21.0
+    assert evaluator.cache.stats()['misses'] == 1
+    compiled = evaluator.compile("x * y + 1")
+    assert compiled.variables == ('x', 'y')
+    assert compiled.evaluate_many([(1, 1), (2, 0.5), (3, 'a')])[:2] == [2.0, 2.0]
+
+def test_errors_are_reported(evaluator):
+    """Test that invalid expressions and failed evaluations return error messages."""
+    assert evaluator.evaluate("1 / (2 - 2)") == "Error: Division by zero"
+    assert evaluator.evaluate("sqrt(-1)") == "Error: Cannot calculate square root of negative number"
+    assert evaluator.evaluate("x + 1") == "Error: No value for variable 'x'"
+    assert evaluator.evaluate("nope(1)") == "Error: Unknown function 'nope'"
+    assert evaluator.evaluate("2 ** 99999") == "Error: Numeric overflow"
+    for text in ("__import__('os')", "x.real", "[1, 2]", "'text'", "1 +"):
+        with pytest.raises(ExpressionError):
+            evaluator.compile(text)
+
+def test_cache_evicts_least_recently_used(plugin_manager):
+    """Test that the compiled-expression cache is bounded."""
+    from cache import ResultCache  # pylint: disable=import-outside-toplevel
+    evaluator = ExpressionEvaluator(plugin_manager, ResultCache(max_size=2))
+    for text in ("1 + 1", "2 + 2", "3 + 3"):
+        evaluator.evaluate(text)
+    assert len(evaluator.cache) == 2
+    assert evaluator.cache.stats()['evictions'] == 1
+
+def test_eval_command(history_manager, plugin_manager):
+    """Test the eval REPL command with and without variable bindings."""
+    registry = build_registry(history_manager, plugin_manager)
+    assert process_line("eval (2 + 3) * sqrt(x) with x=16", registry) == "Result: 20.0"
+    assert process_line("eval 10 / 4", registry) == "Result: 2.5"
+    assert process_line("eval x with x=a", registry).startswith("Error: Invalid eval command format")
+
+def test_evaluate_columns_vectorized(evaluator):
+    """Test evaluating over arrays, with per-row errors and plugin array variants."""
+    columns = {'num1': np.array([1.0, 4.0, 9.0]), 'num2': np.array([1.0, 0.0, -1.0])}
+    values, errors = evaluator.evaluate_columns("sqrt(num1) / num2 + 1", columns)
+    assert values[0] == 2.0 and values[2] == -2.0
+    assert errors.tolist() == [False, True, False]
+    values, errors = evaluator.evaluate_columns("sqrt(num2)", columns)
+    assert errors.tolist() == [False, False, True]
+    values, _ = evaluator.evaluate_columns("2 * 3", columns)
+    assert values.tolist() == [6.0, 6.0, 6.0]
+    with pytest.raises(ExpressionError):
+        evaluator.evaluate_columns("num1 + x", columns)
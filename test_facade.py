@@ -1,7 +1,11 @@
 """Test module for data facade functionality."""
 import os
+from datetime import datetime
 import pytest
 from factory import DataFacade
+from strategy import (
+    CSVHistoryStrategy, NPZHistoryStrategy, SQLiteHistoryStrategy, history_strategy_for
+)
 
 @pytest.fixture(name='facade')
 def fixture_data_facade():
@@ -127,3 +131,56 @@ def test_multiple_records(facade):
     data = facade.view_data()
     for op, _, _, _ in operations:
         assert op in data
+
+@pytest.mark.parametrize("extension", ['.npz', '.parquet', '.feather', '.db'])
+def test_save_load_binary_formats(facade, tmp_path, extension):
+    """Test round-tripping history through the typed binary formats."""
+    if extension in ('.parquet', '.feather'):
+        pytest.importorskip('pyarrow')
+    facade.add_record('add', 2, 3, 5)
+    facade.add_record('divide', 7, 2, 3.5)
+    test_file = tmp_path / f"history{extension}"
+    assert "successfully" in facade.save_to_csv(str(test_file))
+    facade.clear_data()
+    assert "successfully" in facade.load_from_csv(str(test_file))
+    data = facade.data
+    assert data['operation'].tolist() == ['add', 'divide']
+    assert data['result'].tolist() == [5.0, 3.5]
+    assert data['result'].dtype == 'float64'
+    assert data['timestamp'].dtype.kind == 'M'
+
+def test_failed_sqlite_save_keeps_database(facade, tmp_path):
+    """Test that a save failing mid-write leaves the previous database in place."""
+    database = str(tmp_path / "history.db")
+    facade.add_record('add', 2, 3, 5)
+    assert "successfully" in facade.save_to_csv(database)
+    facade.add_record('multiply', object(), 2, 4)
+    assert "Error" in facade.save_to_csv(database)
+    assert not os.path.exists(database + ".partial")
+    facade.clear_data()
+    assert "successfully" in facade.load_from_csv(database)
+    assert facade.data['operation'].tolist() == ['add']
+
+def test_history_strategy_selection():
+    """Test that history strategies are chosen by file extension."""
+    assert isinstance(history_strategy_for('h.csv'), CSVHistoryStrategy)
+    assert isinstance(history_strategy_for('h.NPZ'), NPZHistoryStrategy)
+    assert isinstance(history_strategy_for('h.txt'), CSVHistoryStrategy)
+    assert isinstance(history_strategy_for('h.sqlite'), SQLiteHistoryStrategy)
+
+def test_query_history_database(facade, tmp_path):
+    """Test filtered, time-windowed and paginated queries of an SQLite history."""
+    for minute in range(5):
+        facade.store.append('add', minute, 1, minute + 1, datetime(2024, 10, 23, 20, minute))
+        facade.store.append('multiply', minute, 2, minute * 2, datetime(2024, 10, 23, 20, minute, 30))
+    test_file = str(tmp_path / "history.db")
+    facade.save_to_csv(test_file)
+
+    rows = SQLiteHistoryStrategy().query(test_file, 'multiply', start='2024-10-23 20:01',
+                                         end=datetime(2024, 10, 23, 20, 4))
+    assert rows['num1'].tolist() == [1.0, 2.0, 3.0]
+    page = facade.query_history(test_file, 'add', page=2, page_size=2)
+    assert "Page 2: 2 records, more available" in page
+    assert "Page 3: 1 records" in facade.query_history(test_file, 'add', page=3, page_size=2)
+    assert facade.query_history(test_file, 'divide') == "No matching records"
+    assert "Error" in facade.query_history(str(tmp_path / "history.csv"))
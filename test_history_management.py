@@ -1,7 +1,12 @@
 """Test module for history management functionality."""
 
 import os
-from command import SaveHistoryCommand, LoadHistoryCommand, ViewHistoryCommand, ClearHistoryCommand
+import pandas as pd
+from command import (
+    SaveHistoryCommand, LoadHistoryCommand, ViewHistoryCommand, ClearHistoryCommand,
+    CompactHistoryCommand, ExportHistoryCommand, AppendRecordsEdit
+)
+from calculator import PluginManager, build_registry, process_line
 
 def test_save_history_command(sample_history_data, test_csv_file):
     """Test saving history data to a CSV file."""
@@ -47,3 +52,238 @@ def test_invalid_file_operations(history_manager):
     cmd = SaveHistoryCommand(history_manager, "/invalid/path/file.csv")
     result = cmd.execute()
     assert "Error" in result
+
+def test_chunked_load_history_command(history_manager, tmp_path):
+    """Test loading a history file in bounded chunks through LoadHistoryCommand."""
+    for i in range(25):
+        history_manager.add_record('add', i, 1, i + 1)
+    history_file = str(tmp_path / "history.csv")
+    SaveHistoryCommand(history_manager, history_file).execute()
+    history_manager.clear_data()
+    result = LoadHistoryCommand(history_manager, history_file, chunksize=10).execute()
+    assert "successfully" in result
+    assert history_manager.facade.data['num1'].tolist() == [float(i) for i in range(25)]
+    LoadHistoryCommand(history_manager, history_file, chunksize=10, append=True).execute()
+    assert len(history_manager.facade.data) == 50
+
+def test_iter_history_without_loading(history_manager, tmp_path):
+    """Test streaming a history file chunk by chunk without touching the store."""
+    history_file = tmp_path / "history.csv"
+    history_file.write_text(
+        "timestamp,operation,num1,num2,result\n"
+        "2024-10-23 20:06:49.299196,add,1.0,2.0,3.0\n"
+        "2024-10-23 20:06:52.850854,subtract,oops,3.0,-1.0\n"
+        "2024-10-23 20:07:00.402757,multiply,2.0,3.0,6.0\n", encoding='utf-8')
+    chunks = list(history_manager.iter_history(str(history_file), chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0]['num1'].dtype == 'float64'
+    assert chunks[0]['num1'].isna().tolist() == [False, True]
+    assert history_manager.view_data() == "No data available"
+
+def test_chunked_load_rejects_missing_columns(history_manager, tmp_path):
+    """Test that chunked loading validates the history columns."""
+    history_file = tmp_path / "bad.csv"
+    history_file.write_text("a,b\n1,2\n", encoding='utf-8')
+    result = history_manager.load_from_csv(str(history_file), chunksize=10)
+    assert "Error" in result
+    assert "missing columns" in result
+
+def test_failed_chunked_load_keeps_history(history_manager, tmp_path):
+    """Test that a chunked load failing mid-file or on a missing file leaves the history as it was."""
+    for i in range(5):
+        history_manager.add_record('add', i, 1, i + 1)
+    history_file = tmp_path / "history.csv"
+    history_file.write_text(
+        "timestamp,operation,num1,num2,result\n"
+        "2024-10-23 20:06:49.299196,add,1.0,2.0,3.0\n"
+        "2024-10-23 20:06:52.850854,subtract,2.0,3.0,-1.0\n"
+        '2024-10-23 20:07:00.402757,multiply,"2.0,3.0,6.0\n', encoding='utf-8')
+    for filename in (str(history_file), str(tmp_path / "missing.csv")):
+        assert "Error" in history_manager.load_from_csv(filename, chunksize=2)
+        assert history_manager.facade.data['num1'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+def test_incremental_save_appends_new_records(history_manager, tmp_path):
+    """Test that incremental saves only append records added since the last save."""
+    history_file = str(tmp_path / "history.csv")
+    history_manager.add_record('add', 1, 2, 3)
+    assert "successfully" in SaveHistoryCommand(history_manager, history_file, incremental=True).execute()
+    history_manager.add_record('multiply', 2, 3, 6)
+    history_manager.add_record('subtract', 5, 3, 2)
+    result = SaveHistoryCommand(history_manager, history_file, incremental=True, fsync=True).execute()
+    assert "2 new records appended" in result
+    with open(history_file, encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 4
+    assert lines[0] == "timestamp,operation,num1,num2,result"
+    assert "0 new records appended" in history_manager.save_to_csv(history_file, incremental=True)
+
+def test_incremental_save_after_chunked_load(history_manager, tmp_path):
+    """Test that a chunked load marks the file so the next save only appends."""
+    history_file = str(tmp_path / "history.csv")
+    for value in range(5):
+        history_manager.add_record('add', value, 1, value + 1)
+    history_manager.save_to_csv(history_file)
+    history_manager.load_from_csv(history_file, chunksize=2)
+    history_manager.add_record('multiply', 2, 3, 6)
+    assert "1 new records appended" in history_manager.save_to_csv(history_file, incremental=True)
+    with open(history_file, encoding='utf-8') as file:
+        assert len(file.read().splitlines()) == 7
+
+def test_incremental_save_rewrites_after_clear(history_manager, tmp_path):
+    """Test that an incremental save falls back to a rewrite when history diverged."""
+    history_file = str(tmp_path / "history.csv")
+    history_manager.add_record('add', 1, 2, 3)
+    history_manager.save_to_csv(history_file, incremental=True)
+    history_manager.clear_data()
+    history_manager.add_record('divide', 6, 3, 2)
+    result = history_manager.save_to_csv(history_file, incremental=True)
+    assert "appended" not in result
+    LoadHistoryCommand(history_manager, history_file).execute()
+    assert history_manager.facade.data['operation'].tolist() == ['divide']
+
+def test_compact_history_command(history_manager, tmp_path):
+    """Test that compaction rewrites the file from the in-memory history."""
+    history_file = tmp_path / "history.csv"
+    history_manager.add_record('add', 1, 2, 3)
+    history_manager.save_to_csv(str(history_file), incremental=True)
+    with open(history_file, 'a', encoding='utf-8') as file:
+        file.write("garbage\n")
+    assert "successfully" in CompactHistoryCommand(history_manager, str(history_file)).execute()
+    assert "garbage" not in history_file.read_text(encoding='utf-8')
+
+def test_query_history_command(history_manager, tmp_path):
+    """Test the query_history REPL command against an SQLite history."""
+    database = str(tmp_path / "history.db")
+    history_manager.add_record('add', 1, 2, 3)
+    history_manager.add_record('divide', 6, 3, 2)
+    history_manager.add_record('add', 4, 5, 9)
+    SaveHistoryCommand(history_manager, database).execute()
+    registry = build_registry(history_manager, PluginManager())
+
+    output = process_line(f"query_history add size 1 page 2 db {database}", registry)
+    assert "9.0" in output and "Page 2: 1 records" in output
+    output = process_line(f"query_history all from 2000-01-01t00:00 db {database}", registry)
+    assert "Page 1: 3 records" in output
+    assert "Invalid query_history" in process_line("query_history add page 0", registry)
+    assert "ISO formatted" in process_line("query_history from yesterday", registry)
+
+def test_view_history_slices(history_manager):
+    """Test head/tail/page views of the history."""
+    for i in range(100):
+        history_manager.add_record('add', i, 1, i + 1)
+    registry = build_registry(history_manager, PluginManager())
+
+    output = process_line("view_history head 3", registry)
+    assert "Showing records 0-2 of 100" in output
+    assert "Showing records 97-99 of 100" in process_line("view_history tail 3", registry)
+    assert "Showing records 10-14 of 100" in process_line("view_history page 3 size 5", registry)
+    assert process_line("view_history", registry) == str(history_manager.facade.data)
+    assert "No records in range" in process_line("view_history page 9", registry)
+    assert "Invalid view_history" in process_line("view_history tail 0", registry)
+
+def test_export_history_in_chunks(history_manager, tmp_path):
+    """Test that a chunked export writes aligned lines for every record."""
+    for i in range(25):
+        history_manager.add_record('multiply', i, 2, i * 2)
+    export_file = tmp_path / "history.txt"
+    result = ExportHistoryCommand(history_manager, str(export_file), chunksize=10).execute()
+    assert "successfully (25 records)" in result
+    lines = export_file.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 26
+    assert lines[0].split() == ['timestamp', 'operation', 'num1', 'num2', 'result']
+    assert len({len(line) for line in lines[1:]}) == 1
+    assert lines[-1].split()[0] == '24'
+
+def test_undo_redo_records(history_manager):
+    """Test undoing and redoing new records one calculation at a time."""
+    registry = build_registry(history_manager, PluginManager())
+    process_line('add 1 2', registry)
+    process_line('multiply 2 3', registry)
+    assert process_line('undo', registry) == "Undid 1 record (1 records in history)"
+    assert "multiply" not in history_manager.view_data()
+    assert process_line('redo', registry) == "Redid 1 record (2 records in history)"
+    assert history_manager.get_stats()['operations']['multiply']['count'] == 1
+    process_line('undo', registry)
+    process_line('subtract 5 1', registry)
+    assert process_line('redo', registry) == "Nothing to redo"
+    assert history_manager.facade.data['operation'].tolist() == ['add', 'subtract']
+
+def test_undo_clear_and_load(history_manager, tmp_path):
+    """Test that clears and loads are undone as a whole from snapshots."""
+    for i in range(10):
+        history_manager.add_record('add', i, 1, i + 1)
+    history_file = str(tmp_path / "history.csv")
+    SaveHistoryCommand(history_manager, history_file).execute()
+    history_manager.add_record('divide', 8, 2, 4)
+
+    ClearHistoryCommand(history_manager).execute()
+    assert history_manager.undo() == "Undid clear (11 records in history)"
+    LoadHistoryCommand(history_manager, history_file).execute()
+    assert len(history_manager.facade.store) == 10
+    assert history_manager.undo().startswith("Undid load of")
+    assert history_manager.facade.data['operation'].tolist()[-1] == 'divide'
+    history_manager.redo()
+    assert len(history_manager.facade.store) == 10
+
+def test_undo_redo_chain_across_clear_and_load(history_manager, tmp_path):
+    """Test that records added after a clear or load can be redone after undoing past it."""
+    registry = build_registry(history_manager, PluginManager())
+    history_file = str(tmp_path / "history.csv")
+    for reset in ('clear_history', f'load_history_from_csv {history_file}'):
+        process_line('add 1 1', registry)
+        SaveHistoryCommand(history_manager, history_file).execute()
+        process_line(reset, registry)
+        process_line('add 2 2', registry)
+        process_line('add 3 3', registry)
+        for _ in range(3):
+            assert process_line('undo', registry).startswith("Undid")
+        for _ in range(3):
+            assert process_line('redo', registry).startswith("Redid")
+        assert history_manager.facade.data['num1'].tolist()[-2:] == [2.0, 3.0]
+        history_manager.clear_data()
+
+    # Rows overwritten behind the undo stack's back: redo fails but keeps its entry
+    history_manager.add_record('add', 1, 1, 2)
+    history_manager.add_record('add', 2, 2, 4)
+    history_manager.undo_stack.clear()
+    history_manager.undo_stack.push(AppendRecordsEdit(history_manager.facade.store, 0, 2))
+    history_manager.undo()
+    history_manager.facade.store.append('add', 5, 5, 10)
+    assert process_line('redo', registry).startswith("Error: Cannot redo")
+    assert history_manager.undo_stack.redo_count == 1
+
+def test_undo_depth_is_bounded(history_manager):
+    """Test that only the configured number of changes can be undone."""
+    history_manager.set_undo_depth(3)
+    try:
+        for i in range(5):
+            history_manager.add_record('add', i, 1, i + 1)
+        assert len(history_manager.undo_stack) == 3
+        while history_manager.undo() != "Nothing to undo":
+            pass
+        assert len(history_manager.facade.store) == 2
+        history_manager.set_undo_depth(0)
+        history_manager.add_record('add', 9, 1, 10)
+        assert history_manager.undo() == "Nothing to undo"
+    finally:
+        history_manager.set_undo_depth(100)
+
+def test_eval_and_verify_history(history_manager, tmp_path):
+    """Test vectorized expressions over history columns and detecting corrupted results."""
+    registry = build_registry(history_manager, PluginManager())
+    for line in ('add 1 2', 'divide 9 3', 'multiply 2 4', 'subtract 1 5'):
+        process_line(line, registry)
+    assert process_line('eval_history num1 * num2', registry) == (
+        "Evaluated over 4 records, 0 errors\nmin 2, mean 10.5, max 27\nvalues: 2, 27, 8, 5")
+    assert "2 errors" in process_line('eval_history result / (num1 - 1)', registry)
+    assert process_line('eval_history num3', registry).startswith("Error: Unknown column 'num3'")
+    assert process_line('verify_history', registry) == "Verified 4 of 4 records: all results match"
+
+    history_file = tmp_path / "history.csv"
+    SaveHistoryCommand(history_manager, str(history_file)).execute()
+    frame = pd.read_csv(history_file)
+    frame.loc[2, 'result'] = 9.0
+    frame.to_csv(history_file, index=False)
+    LoadHistoryCommand(history_manager, str(history_file)).execute()
+    assert process_line('verify_history', registry) == \
+        "Verified 4 of 4 records: 1 mismatched results (rows 2)"
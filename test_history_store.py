@@ -0,0 +1,121 @@
+"""Test module for the columnar history store."""
+import numpy as np
+import pytest
+import pandas as pd
+from history_store import HistoryStore, COLUMNS
+
+def test_append_and_materialize():
+    """Test that appended records are returned in a DataFrame with history columns."""
+    store = HistoryStore()
+    store.append('add', 2.0, 3.0, 5.0)
+    store.append('divide', 6.0, 2.0, 3.0)
+    frame = store.to_frame()
+    assert list(frame.columns) == COLUMNS
+    assert list(frame['operation']) == ['add', 'divide']
+    assert frame['result'].dtype == np.float64
+    assert frame['result'].tolist() == [5.0, 3.0]
+
+def test_geometric_growth():
+    """Test that buffers grow geometrically and keep earlier records."""
+    store = HistoryStore(capacity=4)
+    for i in range(100):
+        store.append('add', i, 1, i + 1)
+    assert len(store) == 100
+    assert store.capacity == 128
+    assert store.to_frame()['num1'].tolist() == [float(i) for i in range(100)]
+
+def test_non_numeric_values_promote_column():
+    """Test that non-numeric values are kept instead of being coerced."""
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    store.append(None, 'not_number', None, 'not_number')
+    frame = store.to_frame()
+    assert frame['num1'].tolist() == [1, 'not_number']
+    assert frame['num2'].tolist()[1] is None
+    assert frame['operation'][0] == 'add'
+    assert pd.isna(frame['operation'][1])
+
+def test_frame_cache_invalidated_on_append():
+    """Test that the materialized frame is rebuilt after a mutation."""
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    first = store._cached_frame()
+    assert store._cached_frame() is first
+    store.append('add', 2, 2, 4)
+    assert len(store.to_frame()) == 2
+
+def test_to_frame_returns_a_copy():
+    """Test that modifying a materialized frame does not change later reads."""
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    frame = store.to_frame()
+    frame.loc[0, 'result'] = 99
+    frame['operation'] = 'mutated'
+    assert store.to_frame()['result'].tolist() == [3]
+    assert store.to_frame()['operation'].tolist() == ['add']
+    assert store.snapshot()[0]['result'].tolist() == [3]
+
+def test_load_frame_round_trip():
+    """Test replacing the store contents from a DataFrame."""
+    frame = pd.DataFrame({
+        'timestamp': ['2024-10-23 20:06:49.299196', '2024-10-23 20:06:52.850854'],
+        'operation': ['add', 'subtract'],
+        'num1': [1.0, 2.0],
+        'num2': [2.0, 3.0],
+        'result': [3.0, -1.0],
+    })
+    store = HistoryStore()
+    store.append('multiply', 1, 1, 1)
+    store.load_frame(frame)
+    loaded = store.to_frame()
+    assert len(loaded) == 2
+    assert loaded['operation'].tolist() == ['add', 'subtract']
+    assert str(loaded['timestamp'][0]) == '2024-10-23 20:06:49.299196'
+    store.append('add', 5, 5, 10)
+    assert store.to_frame()['operation'].tolist() == ['add', 'subtract', 'add']
+
+def test_extend_bulk_append():
+    """Test appending a batch of records with a single call."""
+    store = HistoryStore(capacity=2)
+    store.append('add', 1, 1, 2)
+    store.extend('subtract', np.arange(5.0), np.ones(5), np.arange(5.0) - 1)
+    frame = store.to_frame()
+    assert len(store) == 6
+    assert frame['operation'].tolist() == ['add'] + ['subtract'] * 5
+    assert frame['result'].tolist()[1:] == [-1.0, 0.0, 1.0, 2.0, 3.0]
+
+def test_truncate_and_untruncate():
+    """Test that truncated records are dropped in O(1) and can be brought back until overwritten."""
+    store = HistoryStore()
+    for i in range(5):
+        store.append('add', i, 1, i + 1)
+    generation = store.generation
+    store.truncate(3)
+    assert len(store) == 3
+    assert store.generation == generation + 1
+    store.untruncate(5)
+    assert store.to_frame()['num1'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    store.truncate(2)
+    store.append('subtract', 9, 1, 8)
+    with pytest.raises(ValueError):
+        store.untruncate(4)
+    assert store.to_frame()['operation'].tolist() == ['add', 'add', 'subtract']
+
+def test_snapshot_is_copy_on_write():
+    """Test that snapshots share buffers until a covered row would be overwritten."""
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    store.append('add', 2, 2, 4)
+    snapshot = store.checkpoint()
+    buffer = store._numbers['num1']
+    store.append('multiply', 3, 3, 9)
+    assert store._numbers['num1'] is buffer
+    store.truncate(1)
+    store.append('divide', 8, 2, 4)
+    assert store._numbers['num1'] is not buffer
+
+    store.clear()
+    store.restore(snapshot)
+    frame = store.to_frame()
+    assert frame['operation'].tolist() == ['add', 'add']
+    assert frame['num1'].tolist() == [1.0, 2.0]
@@ -0,0 +1,70 @@
+"""Test module for latency instrumentation and profiling hooks."""
+
+import pstats
+import pytest
+from calculator import build_registry, process_line
+from instrumentation import COMMAND, PLUGIN, STAGE, LatencyHistogram, metrics, profiled
+
+@pytest.fixture
+def enabled_metrics():
+    """Enable the process-wide metrics for one test, starting empty.
+
+    Returns:
+        Metrics: The enabled registry, disabled and reset again afterwards.
+    """
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+def test_histogram_percentiles():
+    """Test that percentiles fall within the bucket resolution of the exact values."""
+    histogram = LatencyHistogram()
+    for value in range(1, 10001):
+        histogram.record(value * 1000)
+    summary = histogram.summary()
+    assert summary['count'] == 10000
+    assert summary['min'] == 1000 and summary['max'] == 10_000_000
+    for percent in (50, 95, 99):
+        assert summary[f'p{percent}'] == pytest.approx(percent * 100_000, rel=0.07)
+    assert LatencyHistogram().percentile(50) is None
+
+def test_stats_command_reports_stages_commands_and_plugins(enabled_metrics, history_manager, plugin_manager):
+    """Test that process_line records every stage and the stats command lists them."""
+    registry = build_registry(history_manager, plugin_manager)
+    for line in ('add 1 2', 'use_plugin scientific sqrt 16', 'view_history', 'bogus 1 2'):
+        process_line(line, registry)
+    snapshot = enabled_metrics.snapshot()
+    assert snapshot[(COMMAND, 'add')]['count'] == 1
+    assert snapshot[(COMMAND, '(unknown)')]['count'] == 1
+    assert snapshot[(PLUGIN, 'scientific.sqrt')]['count'] == 1
+    assert snapshot[(STAGE, 'add_record')]['count'] == 1
+    assert snapshot[(STAGE, 'parse')]['count'] == 3
+    assert snapshot[(STAGE, 'execute')]['count'] == 3
+
+    output = process_line('stats', registry)
+    assert output.splitlines()[0].split()[-5:] == ['mean', 'p50', 'p95', 'p99', 'max']
+    assert 'plugin scientific.sqrt' in output and 'command view_history' in output
+    assert process_line('stats reset', registry) == "Latency statistics reset"
+    assert process_line('stats', registry).startswith("latency (us)")
+    assert process_line('stats now', registry).startswith("Error: Invalid stats command")
+
+def test_disabled_metrics_record_nothing(history_manager, plugin_manager):
+    """Test that nothing is recorded while instrumentation is disabled."""
+    metrics.reset()
+    registry = build_registry(history_manager, plugin_manager)
+    assert process_line('add 1 2', registry) == "Result: 3.0"
+    assert metrics.snapshot() == {}
+    assert process_line('stats', registry) == "Instrumentation is disabled (set CALC_METRICS=1 to enable it)"
+
+def test_profiled_writes_profile(tmp_path, history_manager, plugin_manager):
+    """Test that profiled() writes cProfile stats readable by pstats."""
+    path = tmp_path / 'session.prof'
+    registry = build_registry(history_manager, plugin_manager)
+    with profiled(str(path)):
+        process_line('multiply 3 4', registry)
+    stats = pstats.Stats(str(path))
+    assert any(function == 'process_line' for _, _, function in stats.stats)
+    with profiled(None) as profiler:
+        assert profiler is None
@@ -1,7 +1,10 @@
 """Test module for logging system functionality."""
 import os
+import logging
+import threading
+from logging.handlers import QueueHandler
 from singleton import Logger
-from strategy import FileLoggerStrategy, ConsoleLoggerStrategy
+from strategy import FileLoggerStrategy, ConsoleLoggerStrategy, QueuedFileLoggerStrategy
 
 def test_logger_singleton():
     """Test that Logger follows the singleton pattern."""
@@ -37,3 +40,55 @@ def test_console_logger_strategy(capsys):
     logger.log(test_message, "INFO")
     captured = capsys.readouterr()
     assert test_message in captured.out
+
+def test_file_logger_keeps_file_open(tmp_path):
+    """Test that the file logger reuses one handle and clear_logs empties the file."""
+    log_file = tmp_path / "calc.log"
+    strategy = FileLoggerStrategy(str(log_file))
+    strategy.log("first", "INFO")
+    handle = strategy._file
+    strategy.log("second", "ERROR")
+    assert strategy._file is handle
+    assert log_file.read_text(encoding='utf-8') == "INFO: first\nERROR: second\n"
+    strategy.clear_logs()
+    strategy.log("third", "INFO")
+    strategy.close()
+    assert log_file.read_text(encoding='utf-8') == "INFO: third\n"
+
+def test_queued_file_logger_strategy(tmp_path):
+    """Test that queued messages are written in order by the background thread."""
+    log_file = tmp_path / "queued.log"
+    strategy = QueuedFileLoggerStrategy(str(log_file), flush_interval=10)
+    for i in range(1000):
+        strategy.log(f"message {i}", "INFO")
+    assert strategy.flush(timeout=5)
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert lines == [f"INFO: message {i}" for i in range(1000)]
+    strategy.clear_logs()
+    strategy.log("after clear", "WARNING")
+    strategy.close()
+    assert log_file.read_text(encoding='utf-8') == "WARNING: after clear\n"
+
+def test_logging_queue_defers_formatting():
+    """Test that with the queue enabled records reach the handlers via the listener thread."""
+    class Recorder(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+
+        def emit(self, record):
+            self.records.append((threading.current_thread().name, self.format(record)))
+
+    root = logging.getLogger()
+    recorder = Recorder()
+    root.addHandler(recorder)
+    logger = Logger()
+    try:
+        logger.enable_queue()
+        logging.getLogger('calc.test').warning("value %s", 42)
+    finally:
+        logger.disable_queue()
+        root.removeHandler(recorder)
+    assert [message for _, message in recorder.records] == ["value 42"]
+    assert recorder.records[0][0] != threading.current_thread().name
+    assert all(not isinstance(handler, QueueHandler) for handler in root.handlers)
@@ -0,0 +1,80 @@
+"""Test module for running CPU-bound plugin commands in worker processes."""
+
+import pytest
+from calculator import PluginManager
+from plugin_pool import PluginProcessPool
+
+@pytest.fixture(scope='module')
+def process_pool():
+    """Create a two-worker pool shared by the tests in this module.
+
+    Yields:
+        PluginProcessPool: A warm pool with the scientific plugin imported.
+    """
+    pool = PluginProcessPool(['scientific'], workers=2)
+    yield pool
+    pool.shutdown()
+
+def test_pool_call_matches_inline(process_pool):
+    """Test that commands run in a worker give the same results as inline."""
+    assert process_pool.call('scientific', 'prime_count', (1000,)) == 168
+    assert process_pool.call('scientific', 'power', (2, 10)) == 1024.0
+    values, errors = process_pool.call('scientific', 'sqrt', ([4, -1],), array=True)
+    assert values[0] == 2.0 and errors.tolist() == [False, True]
+
+def test_call_many_batches_in_order(process_pool):
+    """Test that batched calls return results in argument order, one task per chunk."""
+    batches = process_pool.stats['batches']
+    results = process_pool.call_many('scientific', 'prime_count', [(n,) for n in range(0, 1000, 10)],
+                                     chunksize=30)
+    assert results[:5] == [0, 4, 8, 10, 12]
+    assert len(results) == 100
+    assert process_pool.stats['batches'] == batches + 4
+
+    results = process_pool.call_many('scientific', 'sqrt', [(9,), ('x',)])
+    assert results == [3.0, "Error: Invalid number"]
+
+def test_timeout_cancels_and_restarts(process_pool):
+    """Test that a call over its timeout reports an error and the pool recovers."""
+    restarts = process_pool.stats['restarts']
+    result = process_pool.call('scientific', 'prime_count', (10 ** 8,), timeout=0.05)
+    assert "timed out after 0.05s" in result
+    assert process_pool.stats['restarts'] == restarts + 1
+    assert process_pool.call('scientific', 'prime_count', (100,)) == 25
+
+def test_worker_processes_fallback(caplog):
+    """Test that a restart terminates nothing when the executor exposes no process table."""
+    assert PluginProcessPool._worker_processes(object()) == []
+    assert "Cannot terminate plugin workers" in caplog.text
+
+def test_cancel_queued_call(process_pool):
+    """Test that a submitted call that has not started can be cancelled."""
+    # More calls than workers plus the executor's call queue, so the last one waits
+    running = [process_pool.submit('scientific', 'prime_count', (3 * 10 ** 6,)) for _ in range(8)]
+    queued = process_pool.submit('scientific', 'prime_count', (10,))
+    assert queued.cancel()
+    assert "was cancelled" in process_pool.wait(queued)
+    assert all(future.result() == 216816 for future in running)
+
+def test_manager_routes_cpu_bound_commands():
+    """Test that only commands declared CPU-bound go to the process pool."""
+    manager = PluginManager(workers=1)
+    try:
+        assert ('scientific', 'prime_count') in manager.cpu_bound_commands
+        assert manager.execute_command('scientific', 'prime_count', 100) == 25
+        assert manager.execute_command('scientific', 'sqrt', 16) == 4.0
+        assert manager.process_pool.stats['calls'] == 1
+        assert manager.execute_command('scientific', 'prime_count', 'x') == "Error: Invalid number"
+    finally:
+        manager.disable_process_pool()
+    assert manager.execute_command('scientific', 'prime_count', 100) == 25
+
+def test_execute_many_chunks_across_workers():
+    """Test that execute_many spreads CPU-bound calls over the pool in chunks."""
+    manager = PluginManager(workers=2)
+    try:
+        results = manager.execute_many('scientific', 'prime_count', range(0, 2000, 10), chunksize=16)
+        assert list(results) == [manager.plugins['scientific'].prime_count(n) for n in range(0, 2000, 10)]
+        assert manager.process_pool.stats['batches'] == 13
+    finally:
+        manager.disable_process_pool()
@@ -1,8 +1,11 @@
 """Test module for the plugin system of the calculator application."""
 
+import itertools
 import logging
 import math
-from calculator import PluginManager
+import numpy as np
+import pytest
+from calculator import PluginManager, read_plugin_manifest
 from plugins.scientific import ScientificCalculator
 
 def test_plugin_manager_initialization(plugin_manager):
@@ -133,3 +136,124 @@ def test_plugin_logging(caplog):
     # Verify log messages were created
     assert len(caplog.records) > 0
     assert any(record.levelname == 'INFO' for record in caplog.records)
+
+def test_command_index_built_once(plugin_manager, monkeypatch):
+    """Test that executing commands uses the cached index instead of get_commands."""
+    scientific = plugin_manager.plugins['scientific']
+    assert plugin_manager.command_index[('scientific', 'sqrt')] == scientific.sqrt
+    calls = []
+    monkeypatch.setattr(scientific, 'get_commands', lambda: calls.append(1) or {})
+    for _ in range(3):
+        assert plugin_manager.execute_command('scientific', 'sqrt', 16) == 4.0
+    assert not calls
+    assert plugin_manager.lookup_stats['lookups'] == 3
+    assert plugin_manager.lookup_stats['misses'] == 0
+
+def test_command_index_invalidation(plugin_manager):
+    """Test that registering a plugin rebuilds the read-only index."""
+    class EchoPlugin:
+        """Minimal plugin used to exercise index invalidation."""
+        def get_commands(self):
+            """Return the echo command."""
+            return {'echo': lambda value: value}
+
+        def get_description(self):
+            """Return plugin description."""
+            return "Echo plugin"
+
+    builds = plugin_manager.lookup_stats['index_builds']
+    plugin_manager.register_plugin('echo', EchoPlugin())
+    assert plugin_manager.execute_command('echo', 'echo', 'hi') == 'hi'
+    assert plugin_manager.lookup_stats['index_builds'] == builds + 1
+    assert "Echo plugin" in plugin_manager.list_plugins()
+    with pytest.raises(TypeError):
+        plugin_manager.command_index[('echo', 'other')] = None
+
+def test_manifest_matches_plugin():
+    """Test that the scientific plugin manifest lists its real commands."""
+    manifest = read_plugin_manifest('plugins/scientific.py')
+    calc = ScientificCalculator()
+    assert manifest['commands'] == list(calc.get_commands())
+    assert manifest['description'] == calc.get_description()
+
+def test_lazy_plugin_loading():
+    """Test that lazy mode lists plugins from manifests and imports on first use."""
+    manager = PluginManager(lazy=True)
+    assert 'scientific' not in manager.plugins
+    assert 'scientific' in manager.manifests
+    assert "sqrt" in manager.list_plugins()
+    assert manager.execute_command('scientific', 'sqrt', 16) == 4.0
+    assert 'scientific' in manager.plugins
+    assert 'scientific' not in manager.manifests
+
+def test_scientific_array_commands():
+    """Test vectorized scientific commands and their per-element error masks."""
+    calc = ScientificCalculator()
+    values, errors = calc.sqrt_array([16, -1, 'invalid', None, '9'])
+    assert errors.tolist() == [False, True, True, True, False]
+    assert values[0] == 4.0 and values[4] == 3.0
+    assert np.isnan(values[1:4]).all()
+    values, errors = calc.power_array(np.array([2.0, 10.0]), [3, 400])
+    assert values[0] == 8.0
+    assert errors.tolist() == [False, True]
+    values, errors = calc.sin_array(np.array([0.0, math.pi / 2]))
+    assert np.allclose(values, [0.0, 1.0])
+    assert not errors.any()
+
+def test_array_arguments_route_to_vectorized_commands(plugin_manager):
+    """Test that execute_command uses the vectorized variant for array arguments."""
+    values, errors = plugin_manager.execute_command('scientific', 'cos', np.array([0.0, math.pi]))
+    assert np.allclose(values, [1.0, -1.0])
+    assert not errors.any()
+    values, errors = plugin_manager.execute_command('scientific', 'power', [2, 3], 2)
+    assert values.tolist() == [4.0, 9.0]
+    assert plugin_manager.execute_command('scientific', 'sqrt', 16) == 4.0
+
+def test_execute_many_matches_execute_command(plugin_manager):
+    """Test that batch results match single calls, errors included."""
+    args = [16, '9', -1, 'invalid', 0.25]
+    results = list(plugin_manager.execute_many('scientific', 'sqrt', args))
+    assert results == [plugin_manager.execute_command('scientific', 'sqrt', arg) for arg in args]
+    results = list(plugin_manager.execute_many('scientific', 'power', [(2, 3), ('x', 1), (2,)]))
+    assert results[:2] == [8.0, "Error: Invalid numbers"]
+    assert results[2].startswith("Error executing command")
+    results = list(plugin_manager.execute_many('scientific', 'sin', [0, math.pi / 2]))
+    assert np.allclose(results, [0.0, 1.0])
+    assert list(plugin_manager.execute_many('scientific', 'missing', [1, 2])) == \
+        ["Command 'missing' not found in plugin 'scientific'"] * 2
+
+def test_execute_many_prefers_batch_commands(plugin_manager):
+    """Test that a plugin's native batch implementation is used and called once."""
+    class Doubler:
+        def __init__(self):
+            self.batches = 0
+            self.calls = 0
+
+        def get_description(self):
+            return "Doubles numbers"
+
+        def get_commands(self):
+            return {'double': self.double}
+
+        def get_batch_commands(self):
+            return {'double': self.double_batch}
+
+        def double(self, number):
+            self.calls += 1
+            return number * 2
+
+        def double_batch(self, arg_tuples):
+            self.batches += 1
+            return (number * 2 for (number,) in arg_tuples)
+
+    plugin = Doubler()
+    plugin_manager.register_plugin('doubler', plugin)
+    assert list(plugin_manager.execute_many('doubler', 'double', range(5))) == [0, 2, 4, 6, 8]
+    assert (plugin.batches, plugin.calls) == (1, 0)
+
+def test_execute_many_is_lazy(plugin_manager):
+    """Test that results stream from an unbounded argument iterator."""
+    results = plugin_manager.execute_many('scientific', 'power', ((n, 2) for n in itertools.count()))
+    assert list(itertools.islice(results, 10000))[-1] == 9999.0 ** 2
+    results = plugin_manager.execute_many('scientific', 'prime_count', itertools.count())
+    assert list(itertools.islice(results, 12)) == [0, 0, 0, 1, 2, 2, 3, 3, 4, 4, 4, 4]
@@ -0,0 +1,156 @@
+"""Tests for the asyncio calculator server."""
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from calculator import PluginManager, build_registry
+from server import CalculatorServer, CalculatorClient
+
+
+def serve(history_manager, scenario):
+    """Run ``scenario(server, port)`` against a server on a free localhost port."""
+    async def main():
+        plugin_manager = PluginManager()
+        server = CalculatorServer(build_registry(history_manager, plugin_manager), plugin_manager)
+        _, port = await server.start('127.0.0.1', 0)
+        try:
+            return await scenario(server, port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_pipelined_requests_answer_in_order(history_manager, tmp_path):
+    """Test that pipelined requests on one connection are answered in request order."""
+    async def scenario(server, port):
+        client = await CalculatorClient.connect(port=port)
+        futures = [client.send({'line': f"add {i} 1"}) for i in range(100)]
+        futures.append(client.send({'line': f"save_history_to_csv {tmp_path / 'history.csv'}"}))
+        futures.append(client.send({'line': 'view_history tail 1'}))
+        responses = await asyncio.gather(*futures)
+        await client.close()
+        return responses
+
+    responses = serve(history_manager, scenario)
+    assert [r['id'] for r in responses] == list(range(1, 103))
+    assert all(r['ok'] for r in responses)
+    assert responses[5]['result'] == "Result: 6.0"
+    assert "successfully" in responses[100]['result']
+    assert "100.0" in responses[101]['result']
+    assert len(history_manager.facade.store) == 100
+
+
+def test_plugin_and_invalid_requests(history_manager):
+    """Test plugin calls through the executor and error responses."""
+    async def scenario(server, port):
+        client = await CalculatorClient.connect(port=port)
+        plugin = await client.request({'plugin': 'scientific', 'command': 'sqrt', 'args': [16]})
+        array = await client.request({'plugin': 'scientific', 'command': 'sqrt', 'args': [[4, 9]]})
+        missing = await client.request({'plugin': 'missing', 'command': 'sqrt', 'args': [4]})
+        invalid = await client.line('add two 3')
+        client._writer.write(b'{not json\n')
+        malformed = await client.request({'line': 'add 1 2'})
+        await client.close()
+        return plugin, array, missing, invalid, malformed
+
+    plugin, array, missing, invalid, malformed = serve(history_manager, scenario)
+    assert plugin == {'id': 1, 'ok': True, 'result': 4.0}
+    assert array['ok'] and '2.' in array['result'] and '3.' in array['result']
+    assert not missing['ok'] and "not found" in missing['result']
+    assert invalid.startswith("Error")
+    assert malformed['ok'] and "3.0" in malformed['result']
+
+
+def test_exit_closes_connection(history_manager):
+    """Test that the exit command is answered and the connection is closed."""
+    async def scenario(server, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"id": 1, "line": "exit"}\n')
+        await writer.drain()
+        response = await reader.readline()
+        closed = await reader.readline()
+        writer.close()
+        return response, closed
+
+    response, closed = serve(history_manager, scenario)
+    assert b'Goodbye' in response
+    assert closed == b''
+
+
+def test_many_concurrent_connections(history_manager):
+    """Test hundreds of clients issuing requests concurrently."""
+    async def scenario(server, port):
+        async def session(index):
+            client = await CalculatorClient.connect(port=port)
+            results = await asyncio.gather(*(client.send({'line': f"multiply {index} {i}"})
+                                             for i in range(10)))
+            await client.close()
+            return results
+
+        sessions = await asyncio.gather(*(session(index) for index in range(200)))
+        return sessions, server.requests
+
+    sessions, requests = serve(history_manager, scenario)
+    assert requests == 2000
+    assert all(r['ok'] for results in sessions for r in results)
+    assert len(history_manager.facade.store) == 2000
+
+
+def test_calculation_not_blocked_by_large_load(history_manager, tmp_path, monkeypatch):
+    """Test that one client's add returns while another client loads a large file."""
+    history_file = str(tmp_path / "large.csv")
+    values = np.arange(200_000, dtype=np.float64)
+    history_manager.add_records('add', values, values, values * 2)
+    history_manager.save_to_csv(history_file)
+    history_manager.clear_data()
+    reading, release = threading.Event(), threading.Event()
+    read = history_manager.facade.read
+    def slow_read(*args):
+        reading.set()
+        release.wait(5)
+        return read(*args)
+    monkeypatch.setattr(history_manager.facade, 'read', slow_read)
+
+    async def scenario(server, port):
+        loader = await CalculatorClient.connect(port=port)
+        calculator = await CalculatorClient.connect(port=port)
+        load = loader.send({'line': f"load_history_from_csv {history_file}"})
+        await asyncio.get_running_loop().run_in_executor(None, reading.wait, 5)
+        start = time.perf_counter()
+        result = await asyncio.wait_for(calculator.line('add 1 2'), 2)
+        elapsed = time.perf_counter() - start
+        loading = not load.done()
+        release.set()
+        loaded = await load
+        await loader.close()
+        await calculator.close()
+        return result, elapsed, loading, loaded
+
+    result, elapsed, loading, loaded = serve(history_manager, scenario)
+    assert result == "Result: 3.0"
+    assert loading and elapsed < 1
+    assert "successfully" in loaded['result']
+    assert len(history_manager.facade.store) == 200_000
+
+
+def test_unix_socket_path_must_be_a_socket(history_manager, tmp_path):
+    """Test that a stale socket is replaced but a regular file is never removed."""
+    path = str(tmp_path / "calc.sock")
+
+    async def start_twice():
+        plugin_manager = PluginManager()
+        for _ in range(2):
+            server = CalculatorServer(build_registry(history_manager, plugin_manager), plugin_manager)
+            await server.start(path=path)
+            await server.close()
+
+    asyncio.run(start_twice())
+    regular = tmp_path / "data.txt"
+    regular.write_text("keep me", encoding='utf-8')
+    server = CalculatorServer(build_registry(history_manager, PluginManager()), PluginManager())
+    with pytest.raises(FileExistsError):
+        asyncio.run(server.start(path=str(regular)))
+    assert regular.read_text(encoding='utf-8') == "keep me"
@@ -0,0 +1,66 @@
+"""Test module for incrementally maintained history statistics."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats import HistoryStats, format_stats
+from calculator import PluginManager, build_registry, process_line
+
+def test_running_aggregates():
+    """Test per-operation aggregates of single and batched records."""
+    stats = HistoryStats()
+    stats.record('add', 3.0, datetime(2024, 10, 23, 20, 0))
+    stats.record('add', 7, datetime(2024, 10, 23, 20, 1))
+    stats.record('power', 'x')
+    stats.record_many('multiply', np.array([2.0, np.nan, 6.0]), datetime(2024, 10, 23, 20, 2))
+    snapshot = stats.snapshot()
+    assert snapshot['operations']['add'] == {'count': 2, 'sum': 10.0, 'mean': 5.0, 'min': 3.0, 'max': 7.0}
+    assert snapshot['operations']['power']['mean'] is None
+    assert snapshot['operations']['multiply']['count'] == 3
+    assert snapshot['operations']['multiply']['mean'] == 4.0
+    assert snapshot['total'] == 6
+    assert snapshot['per_minute'] == pytest.approx(3.0)
+
+def test_recompute_matches_incremental():
+    """Test that the groupby recomputation agrees with the running aggregates."""
+    incremental = HistoryStats()
+    rows = [('add', 1.0), ('divide', 0.5), ('add', 4.0), ('divide', -2.0)]
+    for operation, result in rows:
+        incremental.record(operation, result, datetime(2024, 10, 23))
+    recomputed = HistoryStats()
+    recomputed.recompute(pd.DataFrame({
+        'timestamp': [datetime(2024, 10, 23)] * 4,
+        'operation': [operation for operation, _ in rows],
+        'result': [result for _, result in rows],
+    }))
+    assert recomputed.snapshot()['operations'] == incremental.snapshot()['operations']
+
+def test_sliding_rate():
+    """Test that the operations rate only covers the last window."""
+    now = [100.0]
+    stats = HistoryStats(window=60, clock=lambda: now[0])
+    for _ in range(30):
+        stats.record('add', 1.0)
+    now[0] = 130.0
+    stats.record_many('add', np.ones(30))
+    assert stats.rate() == pytest.approx(1.0)
+    now[0] = 165.0
+    assert stats.rate() == pytest.approx(0.5)
+    assert "Last 60s: 0.50 ops/s" in format_stats(stats.snapshot())
+
+def test_history_stats_command(history_manager, tmp_path):
+    """Test history_stats after incremental updates and after a load."""
+    registry = build_registry(history_manager, PluginManager())
+    process_line("add 1 2", registry)
+    process_line("multiply 2 3", registry)
+    output = process_line("history_stats", registry)
+    assert "Total: 2 records" in output
+    history_file = str(tmp_path / "history.csv")
+    history_manager.add_record('add', 5, 5, 10)
+    history_manager.save_to_csv(history_file)
+    history_manager.clear_data()
+    assert process_line("history_stats", registry).startswith("No data available")
+    history_manager.load_from_csv(history_file)
+    assert history_manager.get_stats()['operations']['add']['sum'] == 13.0
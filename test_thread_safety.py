@@ -0,0 +1,117 @@
+"""Test module for concurrent use of the history subsystem."""
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from command import AddCommand
+from singleton import SingletonMeta
+
+THREADS = 16
+PER_THREAD = 500
+
+@pytest.fixture
+def fast_switching():
+    """Switch threads far more often than usual to provoke interleavings."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def run_threads(target, count=THREADS):
+    """Run ``target(index)`` in ``count`` threads released together."""
+    barrier = threading.Barrier(count)
+    def worker(index):
+        barrier.wait()
+        target(index)
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_singleton_created_once(fast_switching):
+    """Test that racing threads all get the same, once-initialized instance."""
+    created = []
+    class Probe(metaclass=SingletonMeta):
+        def __init__(self):
+            time.sleep(0.01)
+            created.append(self)
+    instances = []
+    run_threads(lambda index: instances.append(Probe()))
+    assert len(created) == 1
+    assert all(instance is created[0] for instance in instances)
+
+def test_no_lost_records(history_manager, fast_switching):
+    """Test that concurrent AddCommand executions record every calculation."""
+    def add(index):
+        for i in range(PER_THREAD):
+            AddCommand(history_manager, index, i).execute()
+    run_threads(add)
+    data = history_manager.facade.data
+    assert len(data) == THREADS * PER_THREAD
+    pairs = set(zip(data['num1'], data['num2']))
+    assert pairs == {(float(t), float(i)) for t in range(THREADS) for i in range(PER_THREAD)}
+    assert history_manager.get_stats()['operations']['add']['count'] == THREADS * PER_THREAD
+
+def test_incremental_saves_during_writes(history_manager, fast_switching, tmp_path):
+    """Test that saves racing with appends neither drop nor duplicate rows."""
+    history_file = str(tmp_path / "history.csv")
+    done = threading.Event()
+    def work(index):
+        if index == 0:
+            while not done.is_set():
+                history_manager.save_to_csv(history_file, incremental=True)
+            return
+        for i in range(PER_THREAD // 5):
+            history_manager.add_record('add', index, i, index + i)
+        if index == 1:
+            done.set()
+    run_threads(work, 8)
+    done.set()
+    history_manager.save_to_csv(history_file, incremental=True)
+    saved = pd.read_csv(history_file)
+    assert len(saved) == len(history_manager.facade.store)
+    assert not saved.duplicated(['num1', 'num2']).any()
+
+def record_from_another_thread(history_manager):
+    """Add a record in a new thread and fail unless it completes promptly."""
+    writer = threading.Thread(target=history_manager.add_record, args=('multiply', 2.0, 3.0, 6.0))
+    writer.start()
+    writer.join(timeout=5)
+    assert not writer.is_alive(), "add_record blocked behind file I/O"
+
+def test_load_reads_file_without_blocking_writers(history_manager, tmp_path, monkeypatch):
+    """Test that new records are added while a history file is being read."""
+    history_file = str(tmp_path / "history.csv")
+    history_manager.add_record('add', 1.0, 2.0, 3.0)
+    history_manager.save_to_csv(history_file)
+    read = history_manager.facade.read
+    def read_while_writing(*args):
+        record_from_another_thread(history_manager)
+        return read(*args)
+    monkeypatch.setattr(history_manager.facade, 'read', read_while_writing)
+    assert "successfully" in history_manager.load_from_csv(history_file, append=True)
+    assert history_manager.facade.data['operation'].tolist() == ['add', 'multiply', 'add']
+
+def test_checkpoint_save_writes_without_blocking_writers(history_manager, tmp_path, monkeypatch):
+    """Test that records added during a checkpoint save stay in the write-ahead log."""
+    history_file = str(tmp_path / "history.csv")
+    history_manager.enable_wal(str(tmp_path / "history.wal"), 'flush', checkpoint=history_file)
+    try:
+        history_manager.add_record('add', 1.0, 2.0, 3.0)
+        write = history_manager.facade.write
+        def write_while_writing(*args):
+            record_from_another_thread(history_manager)
+            return write(*args)
+        monkeypatch.setattr(history_manager.facade, 'write', write_while_writing)
+        assert "successfully" in history_manager.save_to_csv(history_file)
+        assert len(pd.read_csv(history_file)) == 1
+        assert history_manager.wal.records == 1
+        history_manager.facade.clear_data()  # simulate losing the in-memory history
+        assert "1 records replayed" in history_manager.load_from_csv(history_file)
+        assert history_manager.facade.data['operation'].tolist() == ['add', 'multiply']
+    finally:
+        history_manager.disable_wal()
@@ -0,0 +1,157 @@
+"""Test module for the history write-ahead log."""
+import io
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import calculator
+from command import LoadHistoryCommand, SaveHistoryCommand
+from wal import MAGIC, WriteAheadLog, encode_record, read_log
+
+@pytest.fixture
+def wal_manager(history_manager, tmp_path):
+    """HistoryManager with a write-ahead log checkpointed to a temporary file."""
+    history_manager.enable_wal(str(tmp_path / "history.wal"), 'flush',
+                               checkpoint=str(tmp_path / "history.csv"))
+    yield history_manager
+    history_manager.disable_wal()
+
+def test_log_round_trip(tmp_path):
+    """Test that single records, odd values and batches survive a reopen."""
+    path = str(tmp_path / "history.wal")
+    timestamp = datetime(2024, 10, 23, 20, 6, 49, 299196)
+    wal = WriteAheadLog(path, 'none')
+    wal.append(timestamp, 'add', 1.0, 2.0, 3.0)
+    wal.append(timestamp, 'power', 2, 'x', None)
+    wal.append_batch(timestamp, 'multiply', np.arange(3.0), np.arange(3.0), np.arange(3.0) ** 2)
+    wal.close()
+
+    entries, _ = read_log(path)
+    assert entries[0] == ('record', (timestamp, 'add', 1.0, 2.0, 3.0))
+    assert entries[1] == ('record', (timestamp, 'power', 2, 'x', None))
+    kind, (_, operation, _, _, result) = entries[2]
+    assert (kind, operation, result.tolist()) == ('batch', 'multiply', [0.0, 1.0, 4.0])
+    assert WriteAheadLog(path, 'none').records == 5
+
+def test_torn_tail_is_dropped(tmp_path):
+    """Test that a partially written record is ignored and truncated on reopen."""
+    path = tmp_path / "history.wal"
+    entry = encode_record(datetime.now(), 'add', 1.0, 2.0, 3.0)
+    path.write_bytes(MAGIC + entry + entry[:-3])
+    assert len(read_log(str(path))[0]) == 1
+    wal = WriteAheadLog(str(path), 'fsync')
+    assert wal.records == 1
+    wal.close()
+    assert path.stat().st_size == len(MAGIC) + len(entry)
+
+def test_truncate_keeps_entries_after_position(tmp_path):
+    """Test that a partial truncate keeps later entries and stale positions drop nothing."""
+    path = str(tmp_path / "history.wal")
+    timestamp = datetime(2024, 10, 23, 20, 6, 49)
+    wal = WriteAheadLog(path, 'none')
+    wal.append(timestamp, 'add', 1.0, 2.0, 3.0)
+    position = wal.position()
+    wal.append_batch(timestamp, 'multiply', np.arange(2.0), np.arange(2.0), np.arange(2.0))
+    wal.truncate(position)
+    assert wal.records == 2
+    wal.truncate(position)
+    assert wal.records == 2
+    wal.append(timestamp, 'subtract', 5.0, 3.0, 2.0)
+    wal.close()
+    assert [fields[1] for _, fields in read_log(path)[0]] == ['multiply', 'subtract']
+
+def test_async_flush_by_background_thread(tmp_path):
+    """Test that the background thread writes buffered records on its own."""
+    path = str(tmp_path / "history.wal")
+    wal = WriteAheadLog(path, 'async', flush_interval=0.01)
+    wal.append(datetime.now(), 'add', 1.0, 2.0, 3.0)
+    for _ in range(200):
+        if read_log(path)[0]:
+            break
+        time.sleep(0.01)
+    assert len(read_log(path)[0]) == 1
+    wal.close()
+
+def test_invalid_durability(tmp_path):
+    """Test that unknown durability levels are rejected."""
+    with pytest.raises(ValueError):
+        WriteAheadLog(str(tmp_path / "history.wal"), 'sometimes')
+
+def test_load_history_replays_unsaved_records(wal_manager, tmp_path):
+    """Test crash recovery: unsaved records come back when the checkpoint is loaded."""
+    history_file = str(tmp_path / "history.csv")
+    wal_manager.add_record('add', 1, 2, 3)
+    SaveHistoryCommand(wal_manager, history_file).execute()
+    assert wal_manager.wal.records == 0
+    wal_manager.add_record('multiply', 2.0, 3.0, 6.0)
+    wal_manager.add_records('subtract', np.array([5.0]), np.array([3.0]), np.array([2.0]))
+    wal_manager.facade.clear_data()  # simulate losing the in-memory history
+
+    result = LoadHistoryCommand(wal_manager, history_file).execute()
+    assert "2 records replayed" in result
+    assert wal_manager.facade.data['operation'].tolist() == ['add', 'multiply', 'subtract']
+
+def test_clear_history_truncates_log(wal_manager, tmp_path):
+    """Test that cleared records are not resurrected by a replay."""
+    wal_manager.add_record('add', 1.0, 2.0, 3.0)
+    wal_manager.clear_data()
+    result = wal_manager.load_from_csv(str(tmp_path / "history.csv"))
+    assert "0 records replayed" in result
+    assert len(wal_manager.facade.store) == 0
+
+def test_undo_and_redo_are_logged(wal_manager, tmp_path):
+    """Test that a replay after undo/redo gives the history as it was, without a checkpoint save."""
+    history_file = tmp_path / "history.csv"
+    wal_manager.add_record('add', 1.0, 2.0, 3.0)
+    wal_manager.add_record('multiply', 2.0, 3.0, 6.0)
+    wal_manager.add_record('subtract', 5.0, 3.0, 2.0)
+    assert wal_manager.undo() == "Undid 1 record (2 records in history)"
+    assert wal_manager.undo() == "Undid 1 record (1 records in history)"
+    assert wal_manager.redo() == "Redid 1 record (2 records in history)"
+    assert not history_file.exists()
+    assert [kind for kind, _ in read_log(wal_manager.wal.path)[0]][-3:] == ['truncate', 'truncate', 'untruncate']
+    wal_manager.facade.clear_data()  # simulate losing the in-memory history
+    assert "3 records replayed" in wal_manager.load_from_csv(str(history_file))
+    assert wal_manager.facade.data['operation'].tolist() == ['add', 'multiply']
+
+def test_undo_of_clear_checkpoints_the_log(wal_manager, tmp_path):
+    """Test that undoing a clear, which the log cannot express, saves the checkpoint."""
+    history_file = str(tmp_path / "history.csv")
+    wal_manager.add_record('add', 1.0, 2.0, 3.0)
+    wal_manager.clear_data()
+    assert wal_manager.undo().startswith("Undid clear")
+    assert wal_manager.wal.entries == 0
+    wal_manager.facade.clear_data()
+    wal_manager.load_from_csv(history_file)
+    assert wal_manager.facade.data['operation'].tolist() == ['add']
+
+def test_undo_after_recovery_keeps_recovered_records(wal_manager, tmp_path):
+    """Test that the startup recovery is not undoable, so undo cannot discard it."""
+    wal_manager.add_record('add', 1.0, 2.0, 3.0)
+    wal_manager.add_record('multiply', 2.0, 3.0, 6.0)
+    wal_manager.facade.clear_data()  # simulate a restart
+    wal_manager.undo_stack.clear()
+    assert "2 records replayed" in wal_manager.recover()
+    assert wal_manager.undo() == "Nothing to undo"
+    assert wal_manager.wal.records == 2
+    wal_manager.facade.clear_data()
+    wal_manager.recover()
+    assert wal_manager.facade.data['operation'].tolist() == ['add', 'multiply']
+
+def test_batch_mode_logs_and_recovers(history_manager, tmp_path, monkeypatch):
+    """Test that --batch logs new records to CALC_WAL and recovers them on the next run."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(calculator, 'WAL_PATH', str(tmp_path / "history.wal"))
+    stream_err = io.StringIO()
+    calculator.run_batch(io.BytesIO(b'add 1 2\nmultiply 2 3\n'), io.StringIO(), stream_err)
+    assert history_manager.wal is None
+    assert len(read_log(str(tmp_path / "history.wal"))[0]) == 2
+    assert "replayed" not in stream_err.getvalue()
+
+    history_manager.facade.clear_data()  # simulate a new process
+    stream_out, stream_err = io.StringIO(), io.StringIO()
+    calculator.run_batch(io.BytesIO(b'view_history\n'), stream_out, stream_err)
+    assert "No saved history in history.csv (2 records replayed" in stream_err.getvalue()
+    assert 'multiply' in stream_out.getvalue()
@@ -0,0 +1,334 @@
+"""Write-ahead log module for crash-safe calculation history.
+
+Every record added to the history is also appended to a compact binary log,
+and undoing or redoing added records is logged as a small marker that
+truncates the history to a size or brings truncated records back. Writes are buffered and, depending on the durability level, flushed by a
+background thread on size/time thresholds or synchronously. After a crash the
+log is replayed on top of the last saved history file.
+
+Log layout: an 8-byte magic header followed by records of the form
+``kind (u8) | payload length (u32) | crc32 (u32) | payload``. A torn or corrupt
+tail (e.g. from a crash mid-write) ends the replay and is truncated away.
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CALCWAL1'
+_HEADER = struct.Struct('<BII')
+_SINGLE = struct.Struct('<q3d')
+_BATCH = struct.Struct('<qI')
+_SIZE = struct.Struct('<q')
+_EPOCH = datetime(1970, 1, 1)
+
+# Record kinds
+_KIND_SINGLE = 0   # one record with float operands: timestamp, num1, num2, result, operation
+_KIND_JSON = 1     # one record with arbitrary values, JSON encoded
+_KIND_BATCH = 2    # many records of one operation sharing a timestamp, float64 arrays
+_KIND_TRUNCATE = 3    # undo: keep only the first ``size`` records
+_KIND_UNTRUNCATE = 4  # redo: bring truncated records back up to ``size`` records
+_MARKER_KINDS = {'truncate': _KIND_TRUNCATE, 'untruncate': _KIND_UNTRUNCATE}
+
+# Durability levels, from fastest to safest:
+#   none   - buffered in memory, written when the buffer fills and on flush/close
+#   async  - a background thread writes and fsyncs every flush_interval seconds or
+#            once flush_bytes are buffered
+#   flush  - written to the OS on every record (survives a process crash)
+#   fsync  - written and fsynced on every record (survives power loss)
+DURABILITY_LEVELS = ('none', 'async', 'flush', 'fsync')
+
+
+def _to_micros(timestamp):
+    """Convert a datetime to microseconds since the epoch."""
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros):
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def _json_value(value):
+    """Convert values json cannot encode (e.g. numpy scalars) for the log."""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def encode_record(timestamp, operation, num1, num2, result):
+    """Encode one history record as a log entry.
+
+    Args:
+        timestamp (datetime): Time of the calculation
+        operation (str): Operation name
+        num1, num2, result: Operands and result
+
+    Returns:
+        bytes: The encoded entry including its header
+    """
+    if all(isinstance(value, float) for value in (num1, num2, result)) and isinstance(operation, str):
+        kind = _KIND_SINGLE
+        payload = _SINGLE.pack(_to_micros(timestamp), num1, num2, result) + operation.encode('utf-8')
+    else:
+        kind = _KIND_JSON
+        payload = json.dumps([_to_micros(timestamp), operation, num1, num2, result],
+                             default=_json_value).encode('utf-8')
+    return _HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def encode_batch(timestamp, operation, num1, num2, result):
+    """Encode a batch of records for one operation as a single log entry.
+
+    Args:
+        timestamp (datetime): Time shared by the batch
+        operation (str): Operation name
+        num1, num2, result: Equal-length float arrays
+
+    Returns:
+        bytes: The encoded entry including its header
+    """
+    columns = [np.ascontiguousarray(values, dtype='<f8') for values in (num1, num2, result)]
+    name = operation.encode('utf-8')
+    payload = b''.join([_BATCH.pack(_to_micros(timestamp), len(columns[0])),
+                        struct.pack('<H', len(name)), name] + [column.tobytes() for column in columns])
+    return _HEADER.pack(_KIND_BATCH, len(payload), zlib.crc32(payload)) + payload
+
+
+def encode_marker(kind, size):
+    """Encode an undo ('truncate') or redo ('untruncate') of added records.
+
+    Args:
+        kind (str): 'truncate' or 'untruncate'
+        size (int): Number of records the history holds afterwards
+
+    Returns:
+        bytes: The encoded entry including its header
+    """
+    payload = _SIZE.pack(size)
+    return _HEADER.pack(_MARKER_KINDS[kind], len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode(kind, payload):
+    """Decode one entry into ('record' | 'batch' | 'truncate' | 'untruncate', fields)."""
+    if kind == _KIND_SINGLE:
+        micros, num1, num2, result = _SINGLE.unpack_from(payload)
+        operation = payload[_SINGLE.size:].decode('utf-8')
+        return 'record', (_from_micros(micros), operation, num1, num2, result)
+    if kind == _KIND_JSON:
+        micros, operation, num1, num2, result = json.loads(payload.decode('utf-8'))
+        return 'record', (_from_micros(micros), operation, num1, num2, result)
+    if kind == _KIND_BATCH:
+        micros, count = _BATCH.unpack_from(payload)
+        offset = _BATCH.size
+        (name_length,) = struct.unpack_from('<H', payload, offset)
+        offset += 2
+        operation = payload[offset:offset + name_length].decode('utf-8')
+        offset += name_length
+        columns = []
+        for _ in range(3):
+            columns.append(np.frombuffer(payload, dtype='<f8', count=count, offset=offset))
+            offset += 8 * count
+        return 'batch', (_from_micros(micros), operation, *columns)
+    if kind in (_KIND_TRUNCATE, _KIND_UNTRUNCATE):
+        return 'truncate' if kind == _KIND_TRUNCATE else 'untruncate', _SIZE.unpack_from(payload)
+    raise ValueError(f"Unknown write-ahead log record kind {kind}")
+
+
+def _read_entries(data, offset):
+    """Decode the intact entries of ``data`` from ``offset`` on.
+
+    Returns:
+        tuple: (entries, offset after the last intact entry)
+    """
+    entries = []
+    while offset + _HEADER.size <= len(data):
+        kind, length, crc = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        entries.append(_decode(kind, payload))
+        offset = start + length
+    return entries, offset
+
+
+def _count_records(entries):
+    return sum(1 if kind == 'record' else len(fields[4]) for kind, fields in entries
+               if kind in ('record', 'batch'))
+
+
+def read_log(path):
+    """Read every intact entry of a log file.
+
+    Args:
+        path (str): Path to the log
+
+    Returns:
+        tuple: (entries, valid_length) where entries is a list of decoded
+        ('record' | 'batch' | 'truncate' | 'untruncate', fields) tuples and
+        valid_length is the byte offset after the last intact entry
+    """
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, 'rb') as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a calculator write-ahead log")
+    entries, offset = _read_entries(data, len(MAGIC))
+    if offset < len(data):
+        logger.warning("Ignoring %d bytes of torn or corrupt data at the end of %s",
+                       len(data) - offset, path)
+    return entries, offset
+
+
+class WriteAheadLog:
+    """Append-only binary log of history records with buffered, background flushing."""
+
+    def __init__(self, path, durability='async', flush_interval=0.05, flush_bytes=1 << 16):
+        """Open (or create) the log.
+
+        Args:
+            path (str): Path of the log file
+            durability (str): One of DURABILITY_LEVELS
+            flush_interval (float): Seconds between background flushes ('async')
+            flush_bytes (int): Buffered bytes that trigger a flush ('none', 'async')
+        """
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Invalid durability '{durability}'. Use one of: {', '.join(DURABILITY_LEVELS)}")
+        self.path = path
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        entries, valid_length = read_log(path)
+        # Records not yet checkpointed, including those left by a previous run
+        self.records = _count_records(entries)
+        # Entries not yet checkpointed: records, batches and undo/redo markers
+        self.entries = len(entries)
+        # Incremented by every truncate, so that positions taken before one are stale
+        self._epoch = 0
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')  # pylint: disable=consider-using-with
+        if valid_length == 0:
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+        else:
+            self._file.truncate(valid_length)
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+        self._thread = None
+        if durability == 'async':
+            self._thread = threading.Thread(target=self._flush_loop, name='wal-flusher', daemon=True)
+            self._thread.start()
+
+    def append(self, timestamp, operation, num1, num2, result):
+        """Log one history record."""
+        self._write(encode_record(timestamp, operation, num1, num2, result), 1)
+
+    def append_batch(self, timestamp, operation, num1, num2, result):
+        """Log a batch of records of one operation."""
+        self._write(encode_batch(timestamp, operation, num1, num2, result), len(result))
+
+    def append_marker(self, kind, size):
+        """Log an undo ('truncate') or redo ('untruncate') leaving ``size`` records."""
+        self._write(encode_marker(kind, size), 0)
+
+    def _write(self, entry, count):
+        with self._lock:
+            if self._closed:
+                raise ValueError("Write-ahead log is closed")
+            self._buffer += entry
+            self.records += count
+            self.entries += 1
+            if self.durability in ('flush', 'fsync'):
+                self._flush_locked(self.durability == 'fsync')
+            elif len(self._buffer) >= self.flush_bytes:
+                if self.durability == 'none':
+                    self._flush_locked(False)
+                else:
+                    self._wakeup.set()
+
+    def _flush_locked(self, sync):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._closed:
+                    self._flush_locked(True)
+
+    def flush(self, sync=True):
+        """Write buffered entries to the file, fsyncing by default."""
+        with self._lock:
+            self._flush_locked(sync)
+
+    def replay(self):
+        """Return the entries currently in the log (flushing buffered ones first)."""
+        self.flush(sync=False)
+        return read_log(self.path)[0]
+
+    def position(self):
+        """Return the current end of the log, to pass to ``truncate`` later.
+
+        Returns:
+            tuple: Opaque position covering every entry logged so far
+        """
+        with self._lock:
+            return self._epoch, self._file.tell() + len(self._buffer)
+
+    def truncate(self, position=None):
+        """Drop the entries logged before ``position``, e.g. once the history
+        they describe has been saved (checkpoint).
+
+        Entries logged after ``position`` are kept. A position taken before
+        another truncate is stale and drops nothing.
+
+        Args:
+            position: Result of ``position()``, or None to drop every entry
+        """
+        with self._lock:
+            if position is None:
+                kept = b''
+            else:
+                epoch, offset = position
+                if epoch != self._epoch:
+                    return
+                self._flush_locked(False)
+                self._file.seek(offset)
+                kept = self._file.read()
+            self._buffer.clear()
+            self._file.seek(len(MAGIC))
+            self._file.write(kept)
+            self._file.truncate()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            entries = _read_entries(kept, 0)[0] if kept else []
+            self.records = _count_records(entries)
+            self.entries = len(entries)
+            self._epoch += 1
+
+    def close(self):
+        """Flush remaining entries, stop the background thread and close the file."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked(True)
+            self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._file.close()